@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Union
+from asyncpg import Pool
 
 from app.services.pairing_service import compare_for_trade
 from app.schemas.compare import ComparePayload, AwaitingPayload
 from app.core.config import settings
+from app.api.v1.deps import get_db
 
 router = APIRouter(prefix="/v1/trades", tags=["compare"])
 
 @router.get("/{trade_id}/compare", response_model=Union[ComparePayload, AwaitingPayload])
-def get_compare(trade_id: int):
+async def get_compare(trade_id: int, db: Pool = Depends(get_db)):
     if not settings.FEATURE_MODULE3:
         raise HTTPException(status_code=404, detail="Module 3 disabled")
-    payload = compare_for_trade(trade_id)
+    payload = await compare_for_trade(db, trade_id)
     return payload
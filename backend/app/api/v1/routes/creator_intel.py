@@ -1,9 +1,11 @@
 # backend/app/api/v1/routes/creator_intel.py
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from asyncpg import Pool
 from supabase import create_client
 from app.core.config import settings
 from app.services.creator_intel import recompute_creator
+from app.api.v1.deps import get_db
 
 # Align with the rest of the API and avoid double segments
 router = APIRouter(prefix="/v1/creators", tags=["creator_intel"])
@@ -59,9 +61,8 @@ def get_creator_intel(pubkey: str):  # ✅ Fix 1: use str, not string
 
 
 @router.post("/{pubkey}/intel/recompute")
-def api_recompute_creator(pubkey: str):
-    # NOTE: If this writes through Supabase, it likely needs the service-role key.
-    return recompute_creator(pubkey)
+async def api_recompute_creator(pubkey: str, db: Pool = Depends(get_db)):
+    return await recompute_creator(db, pubkey)
 
 
 @router.get("/leaderboard")
@@ -1,10 +1,21 @@
 # app/api/v1/routes/kpis.py
-from fastapi import APIRouter
-from app.services.kpi_cache import current_kpis
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.services.kpi_cache import current_kpis, WINDOWS, BREAKDOWNS
 
 # ✅ Prefix handles /v1/kpis, don’t repeat it in path
 router = APIRouter(prefix="/v1/kpis", tags=["kpis"])
 
 @router.get("")  # or @router.get("/")
-async def get_kpis():
-    return current_kpis()
+async def get_kpis(
+    window: Optional[str] = Query(None, description="Time window: 15s | 1m | 5m | 1h (default: last 1000 events)"),
+    breakdown: Optional[str] = Query(None, description="creator | wallet (time windows only)"),
+    top: int = Query(20, ge=1, le=500),
+):
+    if window is not None and window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        raise HTTPException(status_code=400, detail=f"breakdown must be one of {', '.join(BREAKDOWNS)}")
+    if breakdown is not None and window is None:
+        raise HTTPException(status_code=400, detail="breakdown requires a window")
+    return current_kpis(window=window, breakdown=breakdown, top=top)
@@ -9,6 +9,9 @@ from fastapi import APIRouter, Depends
 from asyncpg import Pool
 from datetime import datetime, timedelta
 from app.api.v1.deps import get_db
+from app.services.compare_cache import compare_cache
+from app.services.bus import bus
+from app.utils.tx_cache import get_cache
 
 router = APIRouter(prefix="/v1/system", tags=["system"])
 
@@ -23,6 +26,9 @@ async def get_system_metrics(db: Pool = Depends(get_db)):
       - pending_alerts
       - token_count
       - last_trade_ts
+      - compare_cache (hit/miss/eviction counters, this API process)
+      - sse (subscribers, published frames, client lag)
+      - tx_cache (size and per-kind hit rates, all processes on this host)
     """
     now = datetime.utcnow()
     since_24h = now - timedelta(hours=24)
@@ -59,6 +65,7 @@ async def get_system_metrics(db: Pool = Depends(get_db)):
         # --- Token metadata ---
         token_count = await conn.fetchval("SELECT COUNT(*) FROM tokens;")
 
+    tx_cache = get_cache()
     return {
         "timestamp": now.isoformat() + "Z",
         "trades_today": trades_today or 0,
@@ -68,4 +75,7 @@ async def get_system_metrics(db: Pool = Depends(get_db)):
         "pending_alerts": pending_alerts or 0,
         "token_count": token_count or 0,
         "last_trade_ts": last_trade_ts.isoformat() + "Z" if last_trade_ts else None,
+        "compare_cache": compare_cache.stats(),
+        "sse": bus.stats(),
+        "tx_cache": await tx_cache.disk_stats() if tx_cache is not None else None,
     }
@@ -1,27 +1,87 @@
 # app/api/v1/routes/pairs.py
-from fastapi import APIRouter, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
+from asyncpg import Pool
 
+from app.api.v1.deps import get_db
 from app.core.config import settings
+from app.services import rebuild_jobs
 from app.services.pairing_service import force_pair, rebuild_pairs
 
 # ✅ Router handles the version segment
 router = APIRouter(prefix="/v1", tags=["pairs"])
 
+def _job_or_404(job_id: str) -> rebuild_jobs.RebuildJob:
+    job = rebuild_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Rebuild job not found")
+    return job
+
 @router.post("/trades/{trade_id}/pair")
-def pair_trade(trade_id: int):
+async def pair_trade(trade_id: int, db: Pool = Depends(get_db)):
     if not settings.FEATURE_MODULE3:
         return {"ok": False, "error": "Module 3 disabled"}
-    res = force_pair(trade_id)
+    res = await force_pair(db, trade_id)
     return {"ok": True, **res}
 
 @router.post("/pairs/rebuild")
-def rebuild(
-    limit: int = Query(200, ge=1, le=5000),
+async def rebuild(
+    limit: int = Query(200, ge=1, le=100000),
     since: Optional[str] = Query(None, description="ISO timestamp lower bound"),
     until: Optional[str] = Query(None, description="ISO timestamp upper bound"),
+    db: Pool = Depends(get_db),
 ):
+    """
+    Start a background rebuild. Poll /v1/pairs/rebuild/{job_id} or follow
+    /v1/pairs/rebuild/{job_id}/stream (SSE) for progress.
+    """
     if not settings.FEATURE_MODULE3:
         return {"ok": False, "error": "Module 3 disabled"}
-    res = rebuild_pairs(limit, since, until)
-    return {"ok": True, **res}
+    res = await rebuild_pairs(db, limit, since, until)
+    return {"ok": res["started"], **res}
+
+@router.get("/pairs/rebuild")
+async def list_rebuilds():
+    return {"ok": True, "jobs": rebuild_jobs.list_jobs()}
+
+@router.get("/pairs/rebuild/{job_id}")
+async def rebuild_status(job_id: str):
+    return {"ok": True, **_job_or_404(job_id).snapshot()}
+
+@router.post("/pairs/rebuild/{job_id}/cancel")
+async def rebuild_cancel(job_id: str):
+    job = _job_or_404(job_id)
+    job.cancel()
+    return {"ok": True, **job.snapshot()}
+
+@router.post("/pairs/rebuild/{job_id}/resume")
+async def rebuild_resume(job_id: str):
+    """Continue a cancelled/failed job from its first unfinished chunk."""
+    job = _job_or_404(job_id)
+    other = rebuild_jobs.running()
+    if other is not None and other is not job:
+        return {"ok": False, "error": "Another rebuild is running", **other.snapshot()}
+    resumed = job.resume()
+    return {"ok": resumed, **job.snapshot()}
+
+@router.get("/pairs/rebuild/{job_id}/stream")
+async def rebuild_stream(job_id: str, request: Request):
+    """SSE: one `progress` event per completed chunk, ends when the job stops."""
+    job = _job_or_404(job_id)
+
+    async def event_generator():
+        async for snap in job.progress():
+            if await request.is_disconnected():
+                break
+            yield f"event: progress\ndata: {json.dumps(snap, separators=(',', ':'))}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
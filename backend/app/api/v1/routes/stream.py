@@ -1,27 +1,50 @@
 # backend/app/api/v1/routes/stream.py
 import uuid
 import asyncio
-from fastapi import APIRouter, Request
+from typing import Optional
+from fastapi import APIRouter, Header, Query, Request
 from fastapi.responses import StreamingResponse
 
 from app.core.config import settings
-from app.services.bus import bus
+from app.services.bus import bus, make_filter
 
 router = APIRouter(prefix="/v1/stream", tags=["stream"])
 
 def _client_id() -> str:
     return f"cli_{uuid.uuid4().hex}"
 
+def _event_id(v: Optional[str]) -> Optional[int]:
+    try:
+        return int(v) if v not in (None, "") else None
+    except ValueError:
+        return None
+
 @router.get("")  # final URL: /v1/stream
-async def sse_stream(request: Request):
+async def sse_stream(
+    request: Request,
+    wallet: Optional[str] = Query(None, description="Comma-separated copy wallet labels"),
+    creator: Optional[str] = Query(None, description="Comma-separated creators"),
+    token: Optional[str] = Query(None, description="Comma-separated token mints"),
+    min_score: Optional[float] = Query(None, description="Minimum execution_score"),
+    max_score: Optional[float] = Query(None, description="Maximum execution_score"),
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id (first connect)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
     """
     Server-Sent Events endpoint.
     - Content-Type: text/event-stream
     - Auto heartbeats
-    - Client auto-reconnect friendly
+    - Client auto-reconnect friendly: events carry `id:`; the browser sends
+      Last-Event-ID on reconnect and retained events after it are replayed
+    - Optional server-side filters (wallet, creator, token, min/max score)
     """
     client_id = _client_id()
-    gen = bus.sse_stream(client_id, heartbeat_seconds=settings.SSE_HEARTBEAT_SECONDS)
+    gen = bus.sse_stream(
+        client_id,
+        heartbeat_seconds=settings.SSE_HEARTBEAT_SECONDS,
+        last_event_id=_event_id(last_event_id_header) if last_event_id_header else _event_id(last_event_id),
+        match=make_filter(wallet, creator, token, min_score, max_score),
+    )
 
     async def event_generator():
         try:
@@ -5,6 +5,7 @@ Reports live health and runtime information for Oculus backend.
 """
 
 import os
+import json
 from datetime import datetime
 from typing import Dict, Any
 
@@ -36,6 +37,29 @@ async def _check_db(request: Request) -> bool:
         return False
 
 
+async def _worker_stats(request: Request) -> Dict[str, Any]:
+    """Scheduler counters each worker process publishes (migration 0013)."""
+    try:
+        db: Pool = request.app.state.db  # type: ignore[attr-defined]
+        rows = await db.fetch(
+            """
+            select worker_name, last_ok_at, stats
+            from system_worker_heartbeats
+            where stats is not null
+            order by worker_name
+            """
+        )
+    except Exception:
+        return {}
+    return {
+        r["worker_name"]: {
+            "published_at": r["last_ok_at"].isoformat() if r["last_ok_at"] else None,
+            "loops": json.loads(r["stats"]) if isinstance(r["stats"], str) else r["stats"],
+        }
+        for r in rows
+    }
+
+
 @router.get("/status")
 async def system_status(request: Request) -> Dict[str, Any]:
     """
@@ -45,6 +69,7 @@ async def system_status(request: Request) -> Dict[str, Any]:
       - DB connectivity
       - worker feature flags
       - last worker heartbeats (if populated)
+      - per-worker scheduler counters, by worker process
     """
     db_ok = await _check_db(request)
 
@@ -63,6 +88,7 @@ async def system_status(request: Request) -> Dict[str, Any]:
         "database": "connected" if db_ok else "error",
         "workers": worker_flags,
         "last_updates": _last_updates,
+        "worker_stats": await _worker_stats(request) if db_ok else {},
         "started_at": _started_at,
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
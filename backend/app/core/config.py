@@ -3,8 +3,10 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import AliasChoices, Field
 
 
 class Settings(BaseSettings):
@@ -30,11 +32,35 @@ class Settings(BaseSettings):
     MOCK_EVENTS_ENABLED: bool = Field(default=False, env="MOCK_EVENTS_ENABLED")
     MOCK_EVENTS_HZ: float = Field(default=1.0, env="MOCK_EVENTS_HZ")
 
+    # SSE broadcaster (/v1/stream)
+    SSE_HEARTBEAT_SECONDS: int = Field(default=15, env="SSE_HEARTBEAT_SECONDS")
+    # Frames kept in the shared ring; a client further behind is lag-marked
+    SSE_RING_SIZE: int = Field(default=4096, env="SSE_RING_SIZE")
+    # lag: skip ahead with an `event: lag` frame | drop: end the stream
+    SSE_SLOW_CLIENT: str = Field(default="lag", env="SSE_SLOW_CLIENT")
+
     # ------------------------------------------------------------------
     # Database
     # ------------------------------------------------------------------
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
 
+    # ------------------------------------------------------------------
+    # Pipeline wake-ups (LISTEN/NOTIFY, migration 0004)
+    # ------------------------------------------------------------------
+    # When on, workers and the SSE stream wake on NOTIFY; polling stays as
+    # a fallback sweep. pydantic-settings v2 ignores env=, so the
+    # OCULUS_-prefixed names are read through validation_alias.
+    PIPELINE_NOTIFY_ENABLED: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("OCULUS_PIPELINE_NOTIFY", "PIPELINE_NOTIFY_ENABLED"),
+    )
+    # LISTEN needs a session connection (direct / session pooler, not
+    # pgBouncer transaction mode). Falls back to the main DSN.
+    NOTIFY_DSN: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("OCULUS_NOTIFY_DSN", "NOTIFY_DSN"),
+    )
+
     # ------------------------------------------------------------------
     # Pairing Settings
     # ------------------------------------------------------------------
@@ -49,6 +75,16 @@ class Settings(BaseSettings):
 
     FEATURE_WORKER_PAIRING: bool = Field(default=True, env="FEATURE_WORKER_PAIRING")
 
+    # /v1/trades/{id}/compare cache (LRU + TTL). AWAITING results expire
+    # fast so a freshly paired trade shows up without an invalidation.
+    COMPARE_CACHE_MAX_ENTRIES: int = Field(default=5000, env="COMPARE_CACHE_MAX_ENTRIES")
+    COMPARE_CACHE_TTL_MS: int = Field(default=30000, env="COMPARE_CACHE_TTL_MS")
+    COMPARE_CACHE_AWAITING_TTL_MS: int = Field(default=3000, env="COMPARE_CACHE_AWAITING_TTL_MS")
+
+    # /v1/pairs/rebuild background jobs
+    REBUILD_CHUNK_SIZE: int = Field(default=250, env="REBUILD_CHUNK_SIZE")
+    REBUILD_CONCURRENCY: int = Field(default=4, env="REBUILD_CONCURRENCY")
+
     # ------------------------------------------------------------------
     # Ladder Worker
     # ------------------------------------------------------------------
@@ -63,6 +99,14 @@ class Settings(BaseSettings):
     SCORING_BATCH_SIZE: int = Field(default=200, env="SCORING_BATCH_SIZE")
     SCORING_INTERVAL_MS: int = Field(default=5000, env="SCORING_INTERVAL_MS")
 
+    # services/baselines.py: per-scope quantile sketches. A token / creator
+    # scope is used for a metric once it has MIN_SAMPLE_* samples of it,
+    # otherwise the pair falls back to token, then global.
+    BASELINE_MIN_SAMPLE_TOKEN: int = Field(default=100, env="BASELINE_MIN_SAMPLE_TOKEN")
+    BASELINE_MIN_SAMPLE_CREATOR: int = Field(default=100, env="BASELINE_MIN_SAMPLE_CREATOR")
+    BASELINE_MAX_SCOPES: int = Field(default=2000, env="BASELINE_MAX_SCOPES")
+    BASELINE_WARM_ROWS: int = Field(default=20000, env="BASELINE_WARM_ROWS")
+
     FEATURE_WORKER_SCORING: bool = Field(default=True, env="FEATURE_WORKER_SCORING")
 
     # ------------------------------------------------------------------
@@ -90,6 +134,47 @@ class Settings(BaseSettings):
         default=True, env="FEATURE_WORKER_CREATOR_INTEL"
     )
 
+    # ------------------------------------------------------------------
+    # Normalizers / Creator Intel cadence
+    # ------------------------------------------------------------------
+    NORMALIZER_COPY_INTERVAL_MS: int = Field(
+        default=2000, env="NORMALIZER_COPY_INTERVAL_MS"
+    )
+    NORMALIZER_CREATOR_INTERVAL_MS: int = Field(
+        default=5000, env="NORMALIZER_CREATOR_INTERVAL_MS"
+    )
+    CREATOR_INTEL_INTERVAL_MS: int = Field(
+        default=60000, env="CREATOR_INTEL_INTERVAL_MS"
+    )
+    CREATOR_INTEL_JOBS_INTERVAL_MS: int = Field(
+        default=5000, env="CREATOR_INTEL_JOBS_INTERVAL_MS"
+    )
+
+    # ------------------------------------------------------------------
+    # Worker Scheduler
+    # ------------------------------------------------------------------
+    # Idle passes multiply a worker's interval up to this factor
+    WORKER_MAX_BACKOFF: float = Field(default=8.0, env="WORKER_MAX_BACKOFF")
+    # Parallel run_once loops per worker (override per worker: <PREFIX>_CONCURRENCY)
+    WORKER_CONCURRENCY: int = Field(default=1, env="WORKER_CONCURRENCY")
+    WORKER_STATS_LOG_SEC: float = Field(default=60.0, env="WORKER_STATS_LOG_SEC")
+
+    # ------------------------------------------------------------------
+    # Solana RPC (Helius) - shared fetcher in app/utils/solana_rpc.py
+    # ------------------------------------------------------------------
+    HELIUS_RPC_URL: str = Field(default="", env="HELIUS_RPC_URL")
+    # Sustained requests/sec and burst; match the Helius plan's RPC limit
+    HELIUS_RPC_RPS: float = Field(default=10.0, env="HELIUS_RPC_RPS")
+    HELIUS_RPC_BURST: float = Field(default=0.0, env="HELIUS_RPC_BURST")  # 0 = same as RPS
+    HELIUS_RPC_CONCURRENCY: int = Field(default=16, env="HELIUS_RPC_CONCURRENCY")
+    HELIUS_RPC_MAX_RETRIES: int = Field(default=4, env="HELIUS_RPC_MAX_RETRIES")
+    HELIUS_RPC_BATCH_SIZE: int = Field(default=20, env="HELIUS_RPC_BATCH_SIZE")  # <=1 = one POST per call
+
+    # Persistent tx/block cache (app/utils/tx_cache.py), one SQLite file per host
+    TX_CACHE_ENABLED: bool = Field(default=True, env="TX_CACHE_ENABLED")
+    TX_CACHE_PATH: str = Field(default=".cache/helius_tx.sqlite3", env="TX_CACHE_PATH")
+    TX_CACHE_MAX_MB: float = Field(default=512.0, env="TX_CACHE_MAX_MB")
+
     # ------------------------------------------------------------------
     # Misc
     # ------------------------------------------------------------------
@@ -1,36 +1,120 @@
 # backend/app/db/sql.py
-from typing import Optional, Dict, Any, List, Tuple, Sequence
-import os
+from typing import Optional, Dict, Any, List, Tuple, Sequence, Iterable
+from datetime import datetime, date
+from decimal import Decimal
+import json
+import re
 
-from supabase import create_client, Client
+from asyncpg import Pool
 
 
 # ---------------------------------------------------------------------------
-# Supabase client bootstrap (direct from environment)
+# asyncpg data access (shared pool on app.state.db / the worker pool)
+#
+# Every helper takes the pool as its first argument and runs parameterized
+# statements over asyncpg's extended protocol. Named statement caching stays
+# off at the pool level (statement_cache_size=0) so this is safe behind
+# pgBouncer in transaction mode.
 # ---------------------------------------------------------------------------
 
-def sb() -> Client:
-    """
-    Return a Supabase client using environment variables.
+_IDENT = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _json_default(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return str(v)
+
+
+def _record(row) -> Optional[Dict[str, Any]]:
+    return dict(row) if row is not None else None
+
+
+def _columns(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    cols: List[str] = []
+    for r in rows:
+        for k in r.keys():
+            if k not in cols:
+                if not _IDENT.match(k):
+                    raise ValueError(f"invalid column name: {k!r}")
+                cols.append(k)
+    return cols
 
-    Required:
-      - SUPABASE_URL
-      - SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY
+
+def _upsert_sql(table: str, conflict: str, cols: List[str]) -> str:
+    """
+    Set-based upsert of a JSON array of row objects. Only the columns
+    present in the payload are written (PostgREST upsert semantics), and
+    Postgres does the per-column type coercion via jsonb_populate_recordset.
     """
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
+    col_list = ", ".join(cols)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != conflict)
+    action = f"do update set {updates}" if updates else "do nothing"
+    return (
+        f"insert into {table} ({col_list}) "
+        f"select {col_list} from jsonb_populate_recordset(null::{table}, $1::jsonb) "
+        f"on conflict ({conflict}) {action}"
+    )
 
-    if not url or not key:
-        raise RuntimeError("Supabase credentials missing: SUPABASE_URL or key env vars not set")
 
-    return create_client(url, key)
+async def _upsert_rows(
+    db: Pool, table: str, conflict: str, rows: Iterable[Dict[str, Any]]
+) -> Tuple[bool, Optional[str]]:
+    batch = [r for r in rows if r]
+    if not batch:
+        return True, None
+    try:
+        sql = _upsert_sql(table, conflict, _columns(batch))
+        await db.execute(sql, json.dumps(batch, default=_json_default))
+        return True, None
+    except Exception as e:
+        return False, str(e)
 
 
 # ---------------------------------------------------------------------------
 # READ HELPERS
 # ---------------------------------------------------------------------------
 
-def fetch_copy_trade(copy_trade_id: int) -> Optional[Dict[str, Any]]:
+COPY_TRADES = """
+select
+  tl.id, tl.timestamp, tl.token_mint, tl.side::text as side,
+  tl.invested_sol, tl.received_qty, tl.pnl_percent,
+  tx.slot       as tx_slot,
+  tx.block_time as tx_block_time
+from trades_ledger tl
+left join lateral (
+  select t.slot, t.block_time
+  from trades_transactions t
+  where t.trades_fk = tl.id
+  order by t.slot desc nulls last
+  limit 1
+) tx on true
+where tl.id = any($1::bigint[])
+"""
+
+SOURCE_TRADES = """
+select
+  id, event_ts, event_slot, price, route,
+  tip_lamports, cu_used, cu_price_micro_lamports
+from source_trades
+where id = any($1::uuid[])
+"""
+
+
+async def fetch_copy_trades(db: Pool, copy_trade_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Batch variant of fetch_copy_trade: {copy_trade_id: row} for every id
+    that exists, in one round trip.
+    """
+    if not copy_trade_ids:
+        return {}
+    rows = await db.fetch(COPY_TRADES, list(copy_trade_ids))
+    return {r["id"]: dict(r) for r in rows}
+
+
+async def fetch_copy_trade(db: Pool, copy_trade_id: int) -> Optional[Dict[str, Any]]:
     """
     Fetch a trades_ledger row plus the latest trades_transactions row
     for a given copy trade.
@@ -39,43 +123,22 @@ def fetch_copy_trade(copy_trade_id: int) -> Optional[Dict[str, Any]]:
       - trades_ledger:
           id, timestamp, token_mint, side, invested_sol, received_qty, pnl_percent
       - trades_transactions:
-          slot, block_time (joined via trades_fk = trades_ledger.id)
+          slot, block_time (joined via trades_fk = trades_ledger.id),
+          returned as tx_slot / tx_block_time
     """
-    client = sb()
+    rows = await fetch_copy_trades(db, [copy_trade_id])
+    return rows.get(copy_trade_id)
 
-    # trades_ledger
-    tl_rows = (
-        client.table("trades_ledger")
-        .select(
-            "id, timestamp, token_mint, side, invested_sol, received_qty, pnl_percent"
-        )
-        .eq("id", copy_trade_id)
-        .limit(1)
-        .execute()
-        .data
-    )
-    if not tl_rows:
-        return None
-    tl = tl_rows[0]
-
-    # latest transaction for this trade (slot + block_time; optional)
-    tx_rows = (
-        client.table("trades_transactions")
-        .select("slot, block_time")
-        .eq("trades_fk", copy_trade_id)
-        .order("slot", desc=True)
-        .limit(1)
-        .execute()
-        .data
-    )
-    tx = tx_rows[0] if tx_rows else {}
 
-    tl["tx_slot"] = tx.get("slot")
-    tl["tx_block_time"] = tx.get("block_time")
-    return tl
+async def fetch_source_trades(db: Pool, source_ids: Sequence[Any]) -> Dict[str, Dict[str, Any]]:
+    """Batch variant of fetch_source_trade: {str(source_id): row}."""
+    if not source_ids:
+        return {}
+    rows = await db.fetch(SOURCE_TRADES, [str(s) for s in source_ids])
+    return {str(r["id"]): dict(r) for r in rows}
 
 
-def fetch_source_trade(source_id: str) -> Optional[Dict[str, Any]]:
+async def fetch_source_trade(db: Pool, source_id: Any) -> Optional[Dict[str, Any]]:
     """
     Fetch a source_trades row by id.
 
@@ -83,95 +146,68 @@ def fetch_source_trade(source_id: str) -> Optional[Dict[str, Any]]:
       id, event_ts, event_slot, price, route,
       tip_lamports, cu_used, cu_price_micro_lamports
     """
-    client = sb()
-    rows = (
-        client.table("source_trades")
-        .select(
-            "id, event_ts, event_slot, price, route, "
-            "tip_lamports, cu_used, cu_price_micro_lamports"
-        )
-        .eq("id", source_id)
-        .limit(1)
-        .execute()
-        .data
-    )
-    return rows[0] if rows else None
+    rows = await fetch_source_trades(db, [source_id])
+    return rows.get(str(source_id))
 
 
-def fetch_compare_row(copy_trade_id: int) -> Optional[Dict[str, Any]]:
+async def fetch_compare_row(db: Pool, copy_trade_id: int) -> Optional[Dict[str, Any]]:
     """
     Read one row from the v_trade_compare view for the given copy trade id.
 
     This is used by:
       - app/services/pairing_service.compare_for_trade
     """
-    client = sb()
-    res = (
-        client.table("v_trade_compare")
-        .select("*")
-        .eq("copy_id", copy_trade_id)
-        .limit(1)
-        .execute()
+    row = await db.fetchrow(
+        "select * from v_trade_compare where copy_id = $1 limit 1", copy_trade_id
     )
-    rows = res.data or []
-    return rows[0] if rows else None
+    return _record(row)
 
 
 # ---------------------------------------------------------------------------
 # RPC / NEAREST SOURCE HELPERS
 # ---------------------------------------------------------------------------
 
-def nearest_source_for_copy(copy_trade_id: int, window_s: int) -> Optional[str]:
+async def nearest_source_for_copy(db: Pool, copy_trade_id: int, window_s: int) -> Optional[str]:
     """
-    RPC bridge to public.fn_nearest_source_for_copy(copy_id bigint).
+    Call public.fn_nearest_source_for_copy(copy_id bigint) directly.
 
     NOTE:
-    - The DB function expects EXACTLY one argument named `copy_id`.
-    - It returns a rowset (list) with columns including `source_id`.
+    - The DB function expects EXACTLY one argument (`copy_id`).
+    - It returns a rowset with columns including `source_id`.
     - This helper normalizes to a single UUID string (source_id) or None.
 
     The `window_s` parameter is kept only for backwards compatibility with
-    callers; the RPC itself doesn't currently use it.
+    callers; the function itself doesn't currently use it.
     """
-    client = sb()
     try:
-        res = client.rpc(
-            "fn_nearest_source_for_copy",
-            {"copy_id": copy_trade_id},
-        ).execute()
-
-        data: Any = getattr(res, "data", None)
-
-        # supabase-py returns a list of rows; be defensive:
-        if isinstance(data, Sequence) and not isinstance(data, (str, bytes)) and len(data) > 0:
-            row = data[0]
-            if isinstance(row, dict):
-                return row.get("source_id")
+        row = await db.fetchrow(
+            "select source_id from fn_nearest_source_for_copy($1) limit 1",
+            copy_trade_id,
+        )
+        if row is None or row["source_id"] is None:
             return None
-        if isinstance(data, dict):
-            return data.get("source_id")
-        return None
-
+        return str(row["source_id"])
     except Exception:
-        # On any RPC failure (404, arg mismatch, etc.), just return None so the
-        # caller can fall back to "AWAITING_MATCH" without crashing.
+        # On any failure (missing function, arg mismatch, etc.), just return
+        # None so the caller can fall back to "AWAITING_MATCH" without crashing.
         return None
 
 
-def call_nearest_source(copy_trade_id: int, window_s: int) -> Optional[str]:
+async def call_nearest_source(db: Pool, copy_trade_id: int, window_s: int) -> Optional[str]:
     """
     Backwards-compatible alias used by some older code.
 
     Delegates to nearest_source_for_copy().
     """
-    return nearest_source_for_copy(copy_trade_id, window_s)
+    return await nearest_source_for_copy(db, copy_trade_id, window_s)
 
 
 # ---------------------------------------------------------------------------
 # JOB SELECTION HELPERS (for rebuilds / tooling)
 # ---------------------------------------------------------------------------
 
-def select_recent_copy_ids(
+async def select_recent_copy_ids(
+    db: Pool,
     limit: int = 200,
     since_iso: Optional[str] = None,
     until_iso: Optional[str] = None,
@@ -181,20 +217,19 @@ def select_recent_copy_ids(
 
     Filters by timestamp if since_iso / until_iso are provided.
     """
-    client = sb()
-    q = (
-        client.table("trades_ledger")
-        .select("id,timestamp")
-        .order("timestamp", desc=True)
+    rows = await db.fetch(
+        """
+        select id
+        from trades_ledger
+        where ($1::text is null or timestamp >= $1::text::timestamptz)
+          and ($2::text is null or timestamp <= $2::text::timestamptz)
+        order by timestamp desc
+        limit $3
+        """,
+        since_iso,
+        until_iso,
+        limit or None,
     )
-    if since_iso:
-        q = q.gte("timestamp", since_iso)
-    if until_iso:
-        q = q.lte("timestamp", until_iso)
-    if limit:
-        q = q.limit(limit)
-
-    rows = q.execute().data or []
     return [r["id"] for r in rows]
 
 
@@ -202,7 +237,17 @@ def select_recent_copy_ids(
 # WRITE / UPSERT HELPERS
 # ---------------------------------------------------------------------------
 
-def upsert_trade_pair(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+async def upsert_trade_pairs(db: Pool, rows: Iterable[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+    """
+    Upsert many trade_pairs rows by copy_trade_id (PK) in one statement.
+
+    Only columns present in the payloads are written.
+    Returns (ok, error_message).
+    """
+    return await _upsert_rows(db, "trade_pairs", "copy_trade_id", rows)
+
+
+async def upsert_trade_pair(db: Pool, payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Upsert into trade_pairs by copy_trade_id (PK).
 
@@ -216,35 +261,29 @@ def upsert_trade_pair(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
 
     Returns (ok, error_message).
     """
-    client = sb()
-    try:
-        client.table("trade_pairs").upsert(
-            payload,
-            on_conflict="copy_trade_id",
-        ).execute()
-        return True, None
-    except Exception as e:
-        return False, str(e)
+    return await upsert_trade_pairs(db, [payload])
 
 
-def upsert_source_trade(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+async def upsert_source_trades(db: Pool, rows: Iterable[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+    """Batch variant of upsert_source_trade (on conflict id)."""
+    return await _upsert_rows(db, "source_trades", "id", rows)
+
+
+async def upsert_source_trade(db: Pool, payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Insert or update a row in source_trades by id.
 
     The exact columns in `payload` should match your source_trades schema.
     """
-    client = sb()
-    try:
-        client.table("source_trades").upsert(
-            payload,
-            on_conflict="id",
-        ).execute()
-        return True, None
-    except Exception as e:
-        return False, str(e)
+    return await upsert_source_trades(db, [payload])
 
 
-def upsert_ladder_snapshot(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+async def upsert_ladder_snapshots(db: Pool, rows: Iterable[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+    """Batch variant of upsert_ladder_snapshot (on conflict pair_id)."""
+    return await _upsert_rows(db, "ladder_snapshots", "pair_id", rows)
+
+
+async def upsert_ladder_snapshot(db: Pool, payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
     """
     Upsert a ladder_snapshots row keyed by pair_id.
 
@@ -255,12 +294,4 @@ def upsert_ladder_snapshot(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]
       cu_p50, cu_p66, cu_p90,
       tip_grade, cu_grade, hist, status, computed_at
     """
-    client = sb()
-    try:
-        client.table("ladder_snapshots").upsert(
-            payload,
-            on_conflict="pair_id",
-        ).execute()
-        return True, None
-    except Exception as e:
-        return False, str(e)
+    return await upsert_ladder_snapshots(db, [payload])
@@ -1,51 +1,244 @@
 # app/jobs/creator_intel_worker.py
+"""
+Creator-intel job runner (queue: migration 0011).
+
+- enqueue(db, creators, reason): one statement; duplicates coalesce per
+  creator (an already-queued creator only gets its version bumped)
+- run_once(db): re-queues due retries, leases up to JOB_BATCH queued
+  creators (skip locked + work_leases, so several runners split the
+  queue), recomputes them JOB_CONCURRENCY at a time and acknowledges the
+  whole batch with one statement each for successes and failures
+- failures go to jobs_creator_intel_retry with exponential back-off
+  (RETRY_BASE_SEC * 2**attempts, capped at RETRY_MAX_SEC); after
+  MAX_ATTEMPTS the row stays there for inspection and is not retried
+
+worker_manager drains the queue in-process (workers.creator_intel_worker.
+CreatorIntelJobs, next to the enqueuer); the standalone runner below is
+for extra capacity or a deployment without worker_manager:
+
+  python -m app.jobs.creator_intel_worker               # run the queue
+  python -m app.jobs.creator_intel_worker --enqueue-all # nightly: all active creators
+"""
+import os
+import sys
 import time
-from supabase import create_client
-from ..core.config import settings
+import asyncio
+import logging
+from typing import Dict, List, Sequence
+
+import asyncpg
+from asyncpg import Pool
+
 from ..services.creator_intel import recompute_creator
+from ..utils.work_claims import LEASE_SEC, SHARD, WORKER_ID, release
+
+log = logging.getLogger("creator_intel_jobs")
+
+STAGE = "creator_intel"  # work_leases stage (literal in CLAIM_JOBS)
+
+JOB_BATCH = int(os.getenv("CREATOR_INTEL_JOB_BATCH", "200"))
+JOB_CONCURRENCY = max(1, int(os.getenv("CREATOR_INTEL_JOB_CONCURRENCY", "16")))
+IDLE_SLEEP_SEC = float(os.getenv("CREATOR_INTEL_JOB_IDLE_SEC", "5"))
+RETRY_BASE_SEC = float(os.getenv("CREATOR_INTEL_RETRY_BASE_SEC", "30"))
+RETRY_MAX_SEC = float(os.getenv("CREATOR_INTEL_RETRY_MAX_SEC", "3600"))
+MAX_ATTEMPTS = int(os.getenv("CREATOR_INTEL_MAX_ATTEMPTS", "8"))
+
+ENQUEUE = """
+insert into jobs_creator_intel_queue (creator_pubkey, reason)
+select distinct c, $2::text from unnest($1::text[]) as c where c is not null
+on conflict (creator_pubkey) do update
+set version = jobs_creator_intel_queue.version + 1,
+    reason  = excluded.reason
+"""
+
+ENQUEUE_ACTIVE = """
+insert into jobs_creator_intel_queue (creator_pubkey, reason)
+select source_wallet_pubkey, $1::text from creators where is_active
+on conflict (creator_pubkey) do update
+set version = jobs_creator_intel_queue.version + 1,
+    reason  = excluded.reason
+"""
+
+# Due retries go back to the queue; next_attempt_at = null marks them as
+# queued (attempts are kept until the creator succeeds)
+REQUEUE_DUE = """
+with due as (
+  update jobs_creator_intel_retry
+  set next_attempt_at = null,
+      updated_at = now()
+  where next_attempt_at <= now()
+    and attempts < $1
+  returning creator_pubkey, reason
+)
+insert into jobs_creator_intel_queue (creator_pubkey, reason)
+select creator_pubkey, coalesce(reason, 'retry') from due
+on conflict (creator_pubkey) do nothing
+"""
+
+CLAIM_JOBS = """
+with candidates as (
+  select q.creator_pubkey, q.version, q.reason
+  from jobs_creator_intel_queue q
+  where oculus_shard(q.creator_pubkey, $2) = $3
+    and not exists (
+      select 1
+      from work_leases wl
+      where wl.stage = 'creator_intel'
+        and wl.item_key = q.creator_pubkey
+        and wl.expires_at > now()
+    )
+  order by q.queued_at
+  limit $1
+  for no key update of q skip locked
+),
+leased as (
+  insert into work_leases (stage, item_key, owner, expires_at)
+  select 'creator_intel', creator_pubkey, $4, now() + make_interval(secs => $5)
+  from candidates
+  on conflict (stage, item_key) do update
+  set owner = excluded.owner,
+      expires_at = excluded.expires_at
+  where work_leases.expires_at <= now()
+  returning item_key
+)
+select c.creator_pubkey, c.version, c.reason
+from candidates c
+join leased l on l.item_key = c.creator_pubkey
+"""
+
+# Done: drop the queue row unless it was re-enqueued meanwhile (newer
+# version), and clear any retry state
+ACK_DONE = """
+with done as (
+  select * from unnest($1::text[], $2::int[]) as d(creator_pubkey, version)
+),
+cleared as (
+  delete from jobs_creator_intel_retry r
+  using done
+  where r.creator_pubkey = done.creator_pubkey
+)
+delete from jobs_creator_intel_queue q
+using done
+where q.creator_pubkey = done.creator_pubkey
+  and q.version = done.version
+"""
+
+ACK_FAILED = """
+with failed as (
+  select * from unnest($1::text[], $2::int[], $3::text[], $4::text[]) as f(creator_pubkey, version, reason, error)
+),
+retry as (
+  insert into jobs_creator_intel_retry as r (creator_pubkey, reason, attempts, next_attempt_at, last_error)
+  select creator_pubkey, reason, 1, now() + make_interval(secs => $5::float8), error
+  from failed
+  on conflict (creator_pubkey) do update
+  set attempts        = r.attempts + 1,
+      next_attempt_at = now() + make_interval(secs => least($6::float8, $5::float8 * power(2, r.attempts))),
+      last_error      = excluded.last_error,
+      reason          = excluded.reason,
+      updated_at      = now()
+)
+delete from jobs_creator_intel_queue q
+using failed
+where q.creator_pubkey = failed.creator_pubkey
+  and q.version = failed.version
+"""
+
+
+async def enqueue(db: Pool, creators: Sequence[str], reason: str = "manual") -> None:
+    if creators:
+        await db.execute(ENQUEUE, list(creators), reason)
+
 
-def _sb():
-    url = settings.SUPABASE_URL
-    key = settings.SUPABASE_ANON_KEY
-    if not url or not key:
-        raise RuntimeError("Missing SUPABASE_URL / SUPABASE_ANON_KEY")
-    return create_client(url, key)
-
-def pop_queue_batch(limit=50):
-    return (_sb().table("jobs_creator_intel_queue")
-              .select("*").order("queued_at", desc=False).limit(limit)
-              .execute().data) or []
-
-def delete_row(row):
-    (_sb().table("jobs_creator_intel_queue")
-        .delete()
-        .eq("creator_pubkey", row["creator_pubkey"])
-        .eq("queued_at", row["queued_at"])
-        .execute())
-
-def enqueue_all_active_creators():
-    creators = (_sb().table("creators")
-                  .select("source_wallet_pubkey")
-                  .eq("is_active", True).execute().data) or []
-    payload = [{"creator_pubkey": c["source_wallet_pubkey"], "reason": "daily"} for c in creators]
-    if payload:
-        _sb().table("jobs_creator_intel_queue").insert(payload).execute()
-
-def run_loop(sleep_sec=5):
-    while True:
-        batch = pop_queue_batch()
-        if not batch:
-            time.sleep(sleep_sec)
-            continue
-        for row in batch:
-            cp = row["creator_pubkey"]
+async def enqueue_all_active_creators(db: Pool, reason: str = "daily") -> None:
+    await db.execute(ENQUEUE_ACTIVE, reason)
+
+
+async def _recompute_all(db: Pool, jobs: List[asyncpg.Record]) -> Dict[str, str]:
+    """Recompute every claimed creator, JOB_CONCURRENCY at a time; returns {creator: error}."""
+    sem = asyncio.Semaphore(JOB_CONCURRENCY)
+    errors: Dict[str, str] = {}
+
+    async def _one(creator: str) -> None:
+        async with sem:
             try:
-                recompute_creator(cp)
+                await recompute_creator(db, creator)
             except Exception as e:
-                # TODO: log error to failed jobs table if desired
-                pass
-            finally:
-                delete_row(row)
+                errors[creator] = f"{type(e).__name__}: {e}"[:500]
+
+    await asyncio.gather(*(_one(j["creator_pubkey"]) for j in jobs))
+    return errors
+
+
+async def run_once(db: Pool) -> int:
+    """One claim / recompute / acknowledge pass; returns creators processed."""
+    await db.execute(REQUEUE_DUE, MAX_ATTEMPTS)
+    jobs = await db.fetch(CLAIM_JOBS, JOB_BATCH, *SHARD, WORKER_ID, LEASE_SEC)
+    if not jobs:
+        return 0
+
+    t0 = time.perf_counter()
+    errors = await _recompute_all(db, jobs)
+    done = [j for j in jobs if j["creator_pubkey"] not in errors]
+    failed = [j for j in jobs if j["creator_pubkey"] in errors]
+
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            if done:
+                await conn.execute(
+                    ACK_DONE,
+                    [j["creator_pubkey"] for j in done],
+                    [j["version"] for j in done],
+                )
+            if failed:
+                await conn.execute(
+                    ACK_FAILED,
+                    [j["creator_pubkey"] for j in failed],
+                    [j["version"] for j in failed],
+                    [j["reason"] for j in failed],
+                    [errors[j["creator_pubkey"]] for j in failed],
+                    RETRY_BASE_SEC,
+                    RETRY_MAX_SEC,
+                )
+    await release(db, STAGE, [j["creator_pubkey"] for j in jobs])
+
+    log.info(
+        "creator intel: %d recomputed, %d failed in %.2fs",
+        len(done), len(failed), time.perf_counter() - t0,
+    )
+    return len(jobs)
+
+
+async def run_loop(dsn: str) -> None:
+    pool = await asyncpg.create_pool(
+        dsn, min_size=1, max_size=JOB_CONCURRENCY + 2, statement_cache_size=0,
+    )
+    try:
+        while True:
+            if await run_once(pool) == 0:
+                await asyncio.sleep(IDLE_SLEEP_SEC)
+    finally:
+        await pool.close()
+
+
+async def _enqueue_all(dsn: str) -> None:
+    conn = await asyncpg.connect(dsn, statement_cache_size=0)
+    try:
+        await conn.execute(ENQUEUE_ACTIVE, "daily")
+    finally:
+        await conn.close()
+
+
+def main(argv: Sequence[str]) -> None:
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL not set in environment.")
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    if "--enqueue-all" in argv:
+        asyncio.run(_enqueue_all(dsn))
+    else:
+        asyncio.run(run_loop(dsn))
+
 
 if __name__ == "__main__":
-    run_loop()
+    main(sys.argv[1:])
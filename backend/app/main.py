@@ -43,9 +43,13 @@ from .api.v1.routes.metrics import router as metrics_router
 # Optional stream drivers (mock or DB-backed)
 from .services.mock_events import run_mock_event_loop
 try:
-    from .services.db_stream import run_db_stream
+    from .services.db_stream import run_db_stream, wake as wake_db_stream
 except Exception:
     run_db_stream = None  # type: ignore
+    wake_db_stream = None  # type: ignore
+from .services.pg_notify import PgNotifyListener, CH_TRADES_LEDGER, CH_TRADE_PAIRS
+from .services import rebuild_jobs
+from .services.compare_cache import CH_COMPARE_INVALIDATE, on_notify as on_compare_invalidate
 
 app = FastAPI(title="Oculus API", version="0.3")
 
@@ -89,6 +93,8 @@ def root():
             "/v1/trades/{id}/ladder",
             "/v1/trades/{id}/pair",
             "/v1/pairs/rebuild",
+            "/v1/pairs/rebuild/{job_id}",
+            "/v1/pairs/rebuild/{job_id}/stream",
             "/v1/wallets/ops",
             "/v1/alerts",
             "/v1/rules",
@@ -107,6 +113,7 @@ def healthz():
 # --- Background stream task handles ---
 _stop_evt: asyncio.Event | None = None
 _task: asyncio.Task | None = None
+_notify_task: asyncio.Task | None = None
 
 @app.on_event("startup")
 async def on_startup():
@@ -114,7 +121,7 @@ async def on_startup():
     - Initialize asyncpg pool on app.state.db
     - Start either DB-backed stream or mock stream task
     """
-    global _stop_evt, _task
+    global _stop_evt, _task, _notify_task
 
     # 1) Create DB pool
     DSN = (
@@ -150,30 +157,52 @@ async def on_startup():
     loop = asyncio.get_event_loop()
     if getattr(settings, "STREAM_SOURCE", "mock") == "db":
         if run_db_stream is None:
-            raise RuntimeError("DB stream selected but Supabase client is unavailable. `pip install supabase`")
-        _task = loop.create_task(run_db_stream(_stop_evt))
+            raise RuntimeError("DB stream selected but app.services.db_stream failed to import (check OCULUS_* table settings)")
+        _task = loop.create_task(run_db_stream(_stop_evt, app.state.db))
         print("[STARTUP] DB stream started")
     else:
         _task = loop.create_task(run_mock_event_loop(hz=1.0, stop_event=_stop_evt))
         print("[STARTUP] Mock stream started")
 
+    # 3) Optional NOTIFY: DB stream wake-ups (polling stays as fallback) and
+    #    compare-cache invalidations published by the workers
+    if getattr(settings, "PIPELINE_NOTIFY_ENABLED", False):
+        listener = PgNotifyListener(getattr(settings, "NOTIFY_DSN", None) or DSN)
+        listener.on(CH_COMPARE_INVALIDATE, on_compare_invalidate)
+        if getattr(settings, "STREAM_SOURCE", "mock") == "db" and wake_db_stream is not None:
+            listener.on(CH_TRADES_LEDGER, wake_db_stream)
+            listener.on(CH_TRADE_PAIRS, wake_db_stream)
+        _notify_task = loop.create_task(listener.run(_stop_evt))
+        print("[STARTUP] NOTIFY listener enabled")
+
 @app.on_event("shutdown")
 async def on_shutdown():
     """
     - Stop stream task
     - Close asyncpg pool
     """
-    global _stop_evt, _task
+    global _stop_evt, _task, _notify_task
 
     # Stop background task
     if _stop_evt is not None:
         _stop_evt.set()
+    if _notify_task is not None:
+        try:
+            await asyncio.wait_for(_notify_task, timeout=3.0)
+        except Exception:
+            _notify_task.cancel()
     if _task is not None:
         try:
             await asyncio.wait_for(_task, timeout=3.0)
         except Exception:
             _task.cancel()
 
+    # Let background rebuilds stop at a chunk boundary
+    try:
+        await asyncio.wait_for(rebuild_jobs.shutdown(), timeout=5.0)
+    except Exception:
+        pass
+
     # Close DB
     pool = getattr(app.state, "db", None)  # type: ignore[attr-defined]
     if pool is not None:
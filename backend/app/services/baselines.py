@@ -1,68 +1,166 @@
 # backend/app/services/baselines.py
-from __future__ import annotations
-import asyncio, time
-from typing import Any, Dict, Optional
-from supabase import create_client
+"""
+Execution-score baselines (tip / CU price / landing / timing percentiles).
+
+One set of streaming quantile sketches (utils/kll.py) per scope:
+  ("global", None)       every scored pair
+  ("token", token_mint)  pairs on that mint
+  ("creator", pubkey)    pairs copying that creator (trades_ledger.wallet_target_id)
+
+- observe(rows): the scoring worker feeds every pair it scores, so the
+  sketches follow the stream without any percentile query
+- get(token_mint, creator): sync, in-memory; each baseline comes from the
+  creator scope if it has MIN_SAMPLE_CREATOR samples of that metric, else
+  the token scope if it has MIN_SAMPLE_TOKEN, else global
+- warm(pool): seeds the sketches from the most recently scored pairs once
+  per process, so a restart does not score against empty baselines
+
+Token / creator scopes are kept in an LRU capped at BASELINE_MAX_SCOPES.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from asyncpg import Pool
+
 from ..core.config import settings
+from ..utils.kll import KllSketch
+
+log = logging.getLogger("baselines")
+
+MIN_SAMPLE_CREATOR = settings.BASELINE_MIN_SAMPLE_CREATOR
+MIN_SAMPLE_TOKEN = settings.BASELINE_MIN_SAMPLE_TOKEN
+
+GLOBAL_K = 200
+SCOPE_K = 48  # token / creator scopes: many of them, less accuracy needed
+
+# metric -> input column (execution_score.SCORE_INPUTS name)
+METRICS = ("tip_per_cu", "cu_price_micro_lamports", "delta_slots_landed", "delta_ms_event", "price_drift_pct")
+
+# baseline key -> (metric, quantile); keys are what compute_subscores reads
+BASELINE_KEYS: Dict[str, Tuple[str, float]] = {
+    "tip_per_cu_p50": ("tip_per_cu", 0.50),
+    "cu_price_p50": ("cu_price_micro_lamports", 0.50),
+    "delta_slots_landed_p95": ("delta_slots_landed", 0.95),
+    "delta_ms_event_p50": ("delta_ms_event", 0.50),
+    "delta_ms_event_p95": ("delta_ms_event", 0.95),
+    "price_drift_p50": ("price_drift_pct", 0.50),
+}
+
+# Same inputs as scoring_worker.COMPARE_ROWS, most recently paired first
+WARM_ROWS = """
+select
+  cp.token_mint,
+  cp.wallet_target_id                                               as creator,
+  p.delta_slots_landed,
+  p.delta_ms_event,
+  abs(p.price_drift)::float8                                        as price_drift_pct,
+  tx.tip_lamports::float8 / nullif(tx.cu_used, 0)                   as tip_per_cu,
+  (tx.priority_fee_lamports * 1e6 / nullif(tx.cu_used, 0))::float8  as cu_price_micro_lamports
+from trade_pairs p
+join trades_ledger cp
+  on cp.id = p.copy_trade_id
+left join trades_transactions tx
+  on tx.tx_signature = cp.tx_signature
+where p.execution_score is not null
+order by p.paired_at desc
+limit $1
+"""
+
+Scope = Tuple[str, Optional[str]]
+GLOBAL: Scope = ("global", None)
+
+
+class _ScopeSketches:
+    def __init__(self, k: int):
+        self.sketches = {m: KllSketch(k=k) for m in METRICS}
+        self.quantiles: Dict[str, Optional[float]] = {}  # baseline key -> value, reset on update
+
+    def update(self, row: Mapping[str, Any]) -> None:
+        for m in METRICS:
+            v = row.get(m)
+            if v is not None:
+                self.sketches[m].update(v)
+        self.quantiles.clear()
+
+    def count(self, metric: str) -> int:
+        return self.sketches[metric].n
+
+    def value(self, key: str) -> Optional[float]:
+        if key not in self.quantiles:
+            metric, q = BASELINE_KEYS[key]
+            self.quantiles[key] = self.sketches[metric].quantile(q)
+        return self.quantiles[key]
 
-REFRESH_SECONDS = 10
-MIN_SAMPLE_CREATOR = 100
-MIN_SAMPLE_TOKEN = 100
 
 class BaselineCache:
-    def __init__(self) -> None:
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._ts: float = 0.0
-        self._lock = asyncio.Lock()
-        url, key = settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY
-        self.sb = create_client(url, key)
-
-    async def _fetch_scope(self, where: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        # One SQL to compute percentiles for recent 500 pairs with known landed/tip/cu
-        sql = f"""
-        with recent as (
-          select tp.*, 
-                 vcl.tip_lamports, vcl.cu_used, vcl.cu_price_micro_lamports, 
-                 (abs(vtc.copy_price - vtc.source_price) / nullif(vtc.source_price,0)) as price_drift_pct,
-                 vtc.delta_slots_landed, vtc.delta_ms_event
-          from trade_pairs tp
-          left join v_copy_tx_landed vcl on vcl.copy_trade_id = tp.copy_trade_id
-          left join v_trade_compare  vtc on vtc.copy_id = tp.copy_trade_id
-          {where}
-          order by tp.paired_at desc
-          limit 500
-        )
-        select
-          percentile_disc(0.50) within group (order by (tip_lamports / greatest(cu_used,1))) as tip_per_cu_p50,
-          percentile_disc(0.50) within group (order by cu_price_micro_lamports) as cu_price_p50,
-          percentile_disc(0.95) within group (order by delta_slots_landed) as delta_slots_landed_p95,
-          percentile_disc(0.50) within group (order by delta_ms_event) as delta_ms_event_p50,
-          percentile_disc(0.95) within group (order by delta_ms_event) as delta_ms_event_p95,
-          percentile_disc(0.50) within group (order by price_drift_pct) as price_drift_p50
-        from recent;
+    def __init__(self, max_scopes: int = settings.BASELINE_MAX_SCOPES):
+        self.max_scopes = max(1, max_scopes)
+        self._global = _ScopeSketches(GLOBAL_K)
+        self._scopes: "OrderedDict[Scope, _ScopeSketches]" = OrderedDict()
+        self._warm_lock = asyncio.Lock()
+        self._warmed = False
+        self.evictions = 0
+
+    def _scope(self, key: Scope, create: bool) -> Optional[_ScopeSketches]:
+        s = self._scopes.get(key)
+        if s is not None:
+            self._scopes.move_to_end(key)
+        elif create:
+            s = self._scopes[key] = _ScopeSketches(SCOPE_K)
+            if len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+                self.evictions += 1
+        return s
+
+    def observe(self, rows: Iterable[Mapping[str, Any]]) -> None:
         """
-        res = self.sb.rpc("exec_sql", {"sql": sql, "params": params}).execute()  # If you don’t have exec_sql RPC, see note below
-        if not res.data or not isinstance(res.data, list):
-            return {}
-        row = res.data[0] or {}
-        return {k: (row.get(k) if row.get(k) is not None else None) for k in [
-            "tip_per_cu_p50","cu_price_p50","delta_slots_landed_p95","delta_ms_event_p50","delta_ms_event_p95","price_drift_p50"
-        ]}
-
-    async def _refresh_locked(self) -> None:
-        # global
-        global_scope = await self._fetch_scope("where tp.execution_score is not null", {})
-        self._cache["global"] = global_scope
-
-        # token-level (only if enough samples)
-        # You can expand this on-demand. For now, just keep global. Token/creator scopes can be added later.
-
-        self._ts = time.time()
-
-    async def get(self) -> Dict[str, Any]:
-        async with self._lock:
-            if time.time() - self._ts > REFRESH_SECONDS:
-                await self._refresh_locked()
-            return self._cache.get("global", {})
+        Add scored pairs to the global, token and creator sketches.
+
+        - rows: mappings with METRICS inputs (None = unknown) plus
+          token_mint / creator (None = no such scope)
+        """
+        for r in rows:
+            self._global.update(r)
+            if r.get("token_mint"):
+                self._scope(("token", r["token_mint"]), True).update(r)
+            if r.get("creator"):
+                self._scope(("creator", r["creator"]), True).update(r)
+
+    def get(self, token_mint: Optional[str] = None, creator: Optional[str] = None) -> Dict[str, Optional[float]]:
+        """Baselines for one pair, falling back per metric: creator -> token -> global."""
+        chain = []
+        if creator:
+            s = self._scope(("creator", creator), False)
+            if s is not None:
+                chain.append((s, MIN_SAMPLE_CREATOR))
+        if token_mint:
+            s = self._scope(("token", token_mint), False)
+            if s is not None:
+                chain.append((s, MIN_SAMPLE_TOKEN))
+
+        out: Dict[str, Optional[float]] = {}
+        for key, (metric, _) in BASELINE_KEYS.items():
+            scope = next((s for s, min_n in chain if s.count(metric) >= min_n), self._global)
+            out[key] = scope.value(key)
+        return out
+
+    async def warm(self, db: Pool) -> None:
+        """Seed the sketches from the last BASELINE_WARM_ROWS scored pairs (once)."""
+        if self._warmed:
+            return
+        async with self._warm_lock:
+            if self._warmed:
+                return
+            rows = await db.fetch(WARM_ROWS, settings.BASELINE_WARM_ROWS)
+            self.observe(dict(r) for r in rows)
+            self._warmed = True
+            log.info("baselines warmed from %d scored pairs (%d token/creator scopes)", len(rows), len(self._scopes))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"global_n": self._global.count("tip_per_cu"), "scopes": len(self._scopes), "evictions": self.evictions}
+
 
 baseline_cache = BaselineCache()
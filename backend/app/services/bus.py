@@ -1,64 +1,272 @@
 import asyncio
 import json
 import time
-from typing import AsyncIterator, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+# Frames coalesced into one chunk per wake-up (bounds a lagging client's write)
+MAX_FRAMES_PER_CHUNK = 256
+
+
+Predicate = Callable[[Dict], bool]
+
+
+class _Client:
+    __slots__ = ("cursor", "match", "sent", "lagged", "lag_events", "connected_at")
+
+    def __init__(self, cursor: int, match: Optional[Predicate] = None):
+        self.cursor = cursor  # next seq this client will read
+        self.match = match    # server-side filter, evaluated on the payload dict
+        self.sent = 0
+        self.lagged = 0       # frames skipped because the ring overwrote them
+        self.lag_events = 0
+        self.connected_at = time.time()
+
 
 class EventBus:
     """
-    A simple in-memory pub/sub bus using an asyncio.Queue per subscriber.
-    Not for production fanout scale, but perfect for Module 2.1.
+    In-memory SSE broadcaster.
+
+    publish() encodes each event into an SSE frame (bytes) exactly once and
+    appends it to a single fixed-size ring; every subscriber reads the same
+    frames through its own sequence cursor. Publishing never waits on a
+    subscriber: it writes the ring slot and wakes the readers.
+
+    A subscriber that falls more than `buffer_limit` frames behind has been
+    overwritten. With slow_client="lag" it gets an `event: lag` frame with
+    the number of frames it missed and resumes at the oldest retained frame;
+    with slow_client="drop" it gets the lag frame and its stream ends (the
+    EventSource reconnects).
+
+    Frames published with an event_id carry an SSE `id:` line, so the ring
+    doubles as the replay buffer: a client reconnecting with Last-Event-ID
+    resumes right after that id if it is still retained. Per-client
+    filters run against the stored payload dict, so a filtered client
+    skips frames without decoding or re-encoding anything.
     """
-    def __init__(self, buffer_limit: int = 1000):
-        self._subscribers = {}  # subscriber_id -> Queue
-        self._buffer_limit = buffer_limit
-        self._lock = asyncio.Lock()
-
-    async def subscribe(self, subscriber_id: str) -> asyncio.Queue:
-        async with self._lock:
-            q = asyncio.Queue(maxsize=self._buffer_limit)
-            self._subscribers[subscriber_id] = q
-            return q
-
-    async def unsubscribe(self, subscriber_id: str):
-        async with self._lock:
-            self._subscribers.pop(subscriber_id, None)
-
-    async def publish(self, payload: Dict):
-        """Publish a dict; we JSON-encode at the edges."""
+
+    def __init__(self, buffer_limit: int = 1000, slow_client: str = "lag"):
+        self._size = max(1, buffer_limit)
+        self._ring: List[Optional[bytes]] = [None] * self._size
+        self._payloads: List[Optional[Dict]] = [None] * self._size
+        self._ids: List[Optional[int]] = [None] * self._size
+        self._seq = 0  # seq of the next frame to publish
+        self._new: Optional[asyncio.Future] = None  # resolved on the next wake
+        self._wake_pending = False
+        self._subscribers: Dict[str, _Client] = {}
+        self._slow_client = slow_client
+        self.published = 0
+        self.dropped_clients = 0
+
+    # ------------------------------------------------------------------
+    # Publish
+    # ------------------------------------------------------------------
+    @staticmethod
+    def encode(payload: Dict, event_id: Optional[int] = None) -> bytes:
         msg = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
-        # Best-effort broadcast; drop-old if queue full
-        for q in list(self._subscribers.values()):
-            if q.full():
-                # remove one oldest by getting without waiting
-                try:
-                    q.get_nowait()
-                except asyncio.QueueEmpty:
-                    pass
-            await q.put(msg)
-
-    async def sse_stream(self, subscriber_id: str, heartbeat_seconds: int) -> AsyncIterator[str]:
+        if event_id is not None:
+            return f"id: {event_id}\ndata: {msg}\n\n".encode("utf-8")
+        return f"data: {msg}\n\n".encode("utf-8")
+
+    def publish_nowait(self, payload: Dict, event_id: Optional[int] = None) -> int:
         """
-        Async generator that yields Server-Sent Events lines.
-        Sends 'event: ping' heartbeat to keep connections alive.
+        Encode once, append to the ring, wake readers. Returns the frame seq.
+        event_id must increase monotonically (db_stream passes its cursor).
         """
-        queue = await self.subscribe(subscriber_id)
-        last_ping = time.monotonic()
+        seq = self._seq
+        slot = seq % self._size
+        self._ring[slot] = self.encode(payload, event_id)
+        self._payloads[slot] = payload
+        self._ids[slot] = event_id
+        self._seq = seq + 1
+        self.published += 1
+        # one wake per loop iteration, however many frames were published
+        # in it (db_stream publishes a whole tick in one go)
+        if not self._wake_pending and self._new is not None:
+            self._wake_pending = True
+            asyncio.get_running_loop().call_soon(self._wake)
+        return seq
+
+    def _wake(self) -> None:
+        self._wake_pending = False
+        fut, self._new = self._new, None
+        if fut is not None and not fut.done():
+            fut.set_result(None)
 
+    def _waiter(self) -> asyncio.Future:
+        if self._new is None:
+            self._new = asyncio.get_running_loop().create_future()
+        return self._new
+
+    async def publish(self, payload: Dict, event_id: Optional[int] = None) -> int:
+        """Publish a dict; kept async for existing callers."""
+        return self.publish_nowait(payload, event_id)
+
+    async def publish_many(self, items: List[Tuple[Dict, Optional[int]]]) -> int:
+        """Publish (payload, event_id) pairs in order; readers wake once."""
+        for payload, event_id in items:
+            self.publish_nowait(payload, event_id)
+        return self._seq
+
+    # ------------------------------------------------------------------
+    # Subscribe
+    # ------------------------------------------------------------------
+    def _replay_from(self, last_event_id: int) -> Optional[int]:
+        """
+        Seq of the first retained frame with id > last_event_id, or None if
+        frames after it may already have been overwritten.
+        """
+        oldest = max(0, self._seq - self._size)
+        seq = self._seq
+        while seq > oldest:
+            eid = self._ids[(seq - 1) % self._size]
+            if eid is not None and eid <= last_event_id:
+                return seq
+            seq -= 1
+        # nothing retained at or before last_event_id: a gap is only
+        # certain if the ring has wrapped
+        return oldest if self._seq <= self._size else None
+
+    def subscribe(
+        self,
+        subscriber_id: str,
+        last_event_id: Optional[int] = None,
+        match: Optional[Predicate] = None,
+    ) -> _Client:
+        start = self._seq
+        truncated = False
+        if last_event_id is not None:
+            replay = self._replay_from(last_event_id)
+            if replay is None:
+                replay, truncated = max(0, self._seq - self._size), True
+            start = replay
+        client = _Client(start, match)
+        if truncated:
+            client.lag_events += 1
+        self._subscribers[subscriber_id] = client
+        return client
+
+    def unsubscribe(self, subscriber_id: str) -> None:
+        self._subscribers.pop(subscriber_id, None)
+
+    def _read(self, client: _Client) -> List[bytes]:
+        """Frames from the client's cursor to the head (lag frame first if overwritten)."""
+        out: List[bytes] = []
+        oldest = self._seq - self._size
+        if client.cursor < oldest:
+            missed = oldest - client.cursor
+            client.lagged += missed
+            client.lag_events += 1
+            client.cursor = oldest
+            out.append(f"event: lag\ndata: {{\"missed\": {missed}}}\n\n".encode("utf-8"))
+        end = min(self._seq, client.cursor + MAX_FRAMES_PER_CHUNK)
+        match = client.match
+        for seq in range(client.cursor, end):
+            slot = seq % self._size
+            if match is not None and not match(self._payloads[slot]):  # type: ignore[arg-type]
+                continue
+            out.append(self._ring[slot])  # type: ignore[arg-type]
+        client.sent += len(out)
+        client.cursor = end
+        return out
+
+    async def sse_stream(
+        self,
+        subscriber_id: str,
+        heartbeat_seconds: int,
+        last_event_id: Optional[int] = None,
+        match: Optional[Predicate] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Async generator that yields Server-Sent Events bytes.
+        Sleeps until something is published; sends 'event: ping' heartbeats
+        only when idle for heartbeat_seconds. With last_event_id, starts by
+        replaying retained frames after it (an `event: lag` frame first if
+        some were already overwritten).
+        """
+        client = self.subscribe(subscriber_id, last_event_id, match)
         try:
+            if client.lag_events:
+                yield f"event: lag\ndata: {{\"missed\": null, \"since\": {last_event_id}}}\n\n".encode("utf-8")
             while True:
-                try:
-                    msg = await asyncio.wait_for(queue.get(), timeout=1.0)
-                    yield f"data: {msg}\n\n"
-                except asyncio.TimeoutError:
-                    pass
-
-                now = time.monotonic()
-                if now - last_ping >= heartbeat_seconds:
-                    # Heartbeat (clients should ignore)
-                    yield f"event: ping\ndata: {{\"ts\": {int(now)}}}\n\n"
-                    last_ping = now
+                if client.cursor >= self._seq:
+                    # shared future: no per-client task, not cancelled on timeout
+                    done, _ = await asyncio.wait((self._waiter(),), timeout=heartbeat_seconds)
+                    if not done:
+                        # Heartbeat (clients should ignore)
+                        yield f"event: ping\ndata: {{\"ts\": {int(time.time())}}}\n\n".encode("utf-8")
+                    continue
+
+                frames = self._read(client)
+                if not frames:
+                    continue  # everything new was filtered out
+                if frames[0].startswith(b"event: lag") and self._slow_client == "drop":
+                    self.dropped_clients += 1
+                    yield frames[0]
+                    return
+                yield b"".join(frames)
         finally:
-            await self.unsubscribe(subscriber_id)
+            self.unsubscribe(subscriber_id)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict:
+        head = self._seq
+        behind = [head - c.cursor for c in self._subscribers.values()]
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "ring_size": self._size,
+            "max_client_lag": max(behind) if behind else 0,
+            "lagged_frames": sum(c.lagged for c in self._subscribers.values()),
+            "dropped_clients": self.dropped_clients,
+        }
+
+
+def _csv(v: Optional[str]) -> Optional[set]:
+    if not v:
+        return None
+    vals = {x.strip() for x in v.split(",") if x.strip()}
+    return vals or None
+
+
+def make_filter(
+    wallet: Optional[str] = None,
+    creator: Optional[str] = None,
+    token: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+) -> Optional[Predicate]:
+    """
+    Build a payload predicate for sse_stream. wallet/creator/token accept
+    comma-separated values; events without an execution_score fail score
+    bounds. Returns None when no filter is set (fast path).
+    """
+    wallets, creators, tokens = _csv(wallet), _csv(creator), _csv(token)
+    if not (wallets or creators or tokens or min_score is not None or max_score is not None):
+        return None
+
+    def match(evt: Dict[str, Any]) -> bool:
+        if wallets is not None and evt.get("wallet") not in wallets:
+            return False
+        if creators is not None and evt.get("creator") not in creators:
+            return False
+        if tokens is not None and evt.get("token") not in tokens:
+            return False
+        if min_score is not None or max_score is not None:
+            score = evt.get("execution_score")
+            if score is None:
+                return False
+            if min_score is not None and score < min_score:
+                return False
+            if max_score is not None and score > max_score:
+                return False
+        return True
+
+    return match
+
 
 # Singleton bus for the app
-bus = EventBus()
+bus = EventBus(settings.SSE_RING_SIZE, settings.SSE_SLOW_CLIENT)
@@ -0,0 +1,135 @@
+# app/services/compare_cache.py
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from asyncpg import Pool
+
+from ..core.config import settings
+
+log = logging.getLogger("compare_cache")
+
+# Cross-process invalidations (workers -> API), payload = comma-separated ids
+CH_COMPARE_INVALIDATE = "oculus_compare_invalidate"
+_NOTIFY_IDS_PER_MSG = 300  # keeps payloads well under the 8000-byte NOTIFY limit
+
+
+class TTLCache:
+    """
+    Size-bounded LRU with a per-entry TTL.
+
+    get() refreshes recency, set() evicts the least recently used entry
+    once max_entries is reached; expired entries are dropped lazily on read.
+    """
+
+    def __init__(self, max_entries: int, default_ttl_ms: int):
+        self.max_entries = max(1, max_entries)
+        self.default_ttl_ms = default_ttl_ms
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value)
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_ms: Optional[int] = None) -> None:
+        ttl = self.default_ttl_ms if ttl_ms is None else ttl_ms
+        if ttl <= 0:
+            return
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (time.monotonic() + ttl / 1000.0, value)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[Hashable]) -> int:
+        n = 0
+        for k in keys:
+            if self._data.pop(k, None) is not None:
+                n += 1
+        self.invalidations += n
+        return n
+
+    def clear(self) -> None:
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Singleton cache for /v1/trades/{id}/compare (API process)
+compare_cache = TTLCache(
+    max_entries=settings.COMPARE_CACHE_MAX_ENTRIES,
+    default_ttl_ms=settings.COMPARE_CACHE_TTL_MS,
+)
+
+
+def invalidate(copy_trade_ids: Iterable[int]) -> int:
+    """In-process hook: drop cached compare payloads for these trades."""
+    return compare_cache.invalidate(copy_trade_ids)
+
+
+def on_notify(_channel: str, payload: str) -> None:
+    """PgNotifyListener callback for CH_COMPARE_INVALIDATE."""
+    if payload == "reconnect":
+        # anything could have changed while we were disconnected
+        compare_cache.clear()
+        return
+    ids = []
+    for part in payload.split(","):
+        try:
+            ids.append(int(part))
+        except ValueError:
+            continue
+    compare_cache.invalidate(ids)
+
+
+async def publish_invalidation(db: Pool, copy_trade_ids: Iterable[int]) -> None:
+    """
+    Worker hook: tell API processes that these pair rows changed.
+    No-op unless OCULUS_PIPELINE_NOTIFY is on (TTL bounds staleness otherwise).
+    """
+    if not settings.PIPELINE_NOTIFY_ENABLED:
+        return
+    ids = [str(int(i)) for i in copy_trade_ids if i is not None]
+    try:
+        for i in range(0, len(ids), _NOTIFY_IDS_PER_MSG):
+            await db.execute(
+                "select pg_notify($1, $2)",
+                CH_COMPARE_INVALIDATE,
+                ",".join(ids[i:i + _NOTIFY_IDS_PER_MSG]),
+            )
+    except Exception as e:
+        log.warning("compare invalidation notify failed: %r", e)
@@ -0,0 +1,290 @@
+# backend/app/services/creator_agg.py
+"""
+Per-creator daily rollups (creator_daily_agg / creator_daily_token_agg,
+migration 0010) and the 7d / 30d creator-intel windows built from them.
+
+- record_scored_pairs(conn, ids): pair-side increments; called by the
+  scoring worker inside its claiming transaction, so every pair is added
+  exactly once
+- record_rescored_pairs(conn, ids, prev_scores): a re-scored pair only
+  moves its execution score (exec_n / exec_sum) from the old value
+- fetch_days(db, creator, days): the day rows of one creator (<= days rows
+  plus one row per traded token and day)
+- compose_window(days_rows, token_rows, since): merges day buckets into the
+  metrics dict creator_intel used to compute from raw pairs / trades
+
+Source-side columns are maintained by the source_trades triggers; pairs
+scored before the rollups existed are added by migration 0010 itself.
+"""
+
+import math
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import asyncpg
+from asyncpg import Pool
+
+log = logging.getLogger("creator_agg")
+
+# ---- thresholds (same as creator_intel's per-pair rules) ----
+LATE_ENTRY_MS = 1500
+LATE_ENTRY_DRIFT_PCT = 2.0
+CHASE_DRIFT_PCT = 3.0
+
+# Pair-side increments for a set of just-scored pairs, grouped by (creator,
+# day of the source trade). ROI: (n, mean, M2) per group, merged into the
+# stored bucket with Chan's parallel update. Rows are written in key order
+# so concurrent scoring transactions lock buckets in the same order.
+ADD_PAIRS = f"""
+with s as (
+  select
+    st.source_wallet_pubkey                   as creator_pubkey,
+    (st.event_ts at time zone 'utc')::date    as day,
+    st.token_mint,
+    cp.pnl_percent::float8                    as roi,
+    p.delta_ms_event::float8                  as dms,
+    p.price_drift::float8                     as drift,
+    p.execution_score::float8                 as score
+  from trade_pairs p
+  join source_trades st
+    on st.id = p.source_trade_id
+  join trades_ledger cp
+    on cp.id = p.copy_trade_id
+  where p.copy_trade_id = any($1::int8[])
+),
+tok as (
+  insert into creator_daily_token_agg (creator_pubkey, day, token_mint, pair_count)
+  select creator_pubkey, day, token_mint, count(*)
+  from s
+  group by 1, 2, 3
+  order by 1, 2, 3
+  on conflict (creator_pubkey, day, token_mint) do update set
+    pair_count = creator_daily_token_agg.pair_count + excluded.pair_count
+)
+insert into creator_daily_agg as a (
+  creator_pubkey, day, pair_count,
+  roi_n, roi_mean, roi_m2, roi_wins,
+  late_n, late_hits, chase_hits, liq_hits,
+  delta_n, delta_sum, exec_n, exec_sum
+)
+select
+  creator_pubkey,
+  day,
+  count(*),
+  count(roi),
+  coalesce(avg(roi), 0),
+  coalesce(var_pop(roi) * count(roi), 0),
+  count(*) filter (where roi > 0),
+  count(*) filter (where dms is not null or drift is not null),
+  count(*) filter (where dms > {LATE_ENTRY_MS} or drift > {LATE_ENTRY_DRIFT_PCT}),
+  count(*) filter (where drift > {CHASE_DRIFT_PCT} and roi < 0),
+  count(*) filter (where drift > 0 and roi < 0),
+  count(dms),
+  coalesce(sum(dms), 0),
+  count(score),
+  coalesce(sum(score), 0)
+from s
+group by 1, 2
+order by 1, 2
+on conflict (creator_pubkey, day) do update set
+  pair_count = a.pair_count + excluded.pair_count,
+  roi_n      = a.roi_n + excluded.roi_n,
+  roi_mean   = case when a.roi_n + excluded.roi_n = 0 then 0
+                    else a.roi_mean + (excluded.roi_mean - a.roi_mean) * excluded.roi_n / (a.roi_n + excluded.roi_n)::float8 end,
+  roi_m2     = case when a.roi_n + excluded.roi_n = 0 then 0
+                    else a.roi_m2 + excluded.roi_m2
+                         + (excluded.roi_mean - a.roi_mean) ^ 2 * a.roi_n * excluded.roi_n / (a.roi_n + excluded.roi_n)::float8 end,
+  roi_wins   = a.roi_wins + excluded.roi_wins,
+  late_n     = a.late_n + excluded.late_n,
+  late_hits  = a.late_hits + excluded.late_hits,
+  chase_hits = a.chase_hits + excluded.chase_hits,
+  liq_hits   = a.liq_hits + excluded.liq_hits,
+  delta_n    = a.delta_n + excluded.delta_n,
+  delta_sum  = a.delta_sum + excluded.delta_sum,
+  exec_n     = a.exec_n + excluded.exec_n,
+  exec_sum   = a.exec_sum + excluded.exec_sum,
+  updated_at = now()
+"""
+
+# Re-scored pairs: the rest of the pair side is unchanged, only the score
+# moves. Same key order as ADD_PAIRS.
+MOVE_SCORES = """
+with s as (
+  select
+    st.source_wallet_pubkey                   as creator_pubkey,
+    (st.event_ts at time zone 'utc')::date    as day,
+    p.execution_score::float8                 as score,
+    r.prev_score
+  from unnest($1::int8[], $2::float8[]) as r(copy_trade_id, prev_score)
+  join trade_pairs p
+    on p.copy_trade_id = r.copy_trade_id
+  join source_trades st
+    on st.id = p.source_trade_id
+)
+insert into creator_daily_agg as a (creator_pubkey, day, exec_n, exec_sum)
+select creator_pubkey, day,
+       count(score) - count(prev_score),
+       coalesce(sum(score), 0) - coalesce(sum(prev_score), 0)
+from s
+group by 1, 2
+order by 1, 2
+on conflict (creator_pubkey, day) do update set
+  exec_n     = a.exec_n + excluded.exec_n,
+  exec_sum   = a.exec_sum + excluded.exec_sum,
+  updated_at = now()
+"""
+
+FETCH_DAYS = """
+select * from creator_daily_agg
+where creator_pubkey = $1 and day >= $2
+"""
+
+FETCH_TOKEN_DAYS = """
+select day, token_mint, pair_count, first_buy_at, last_sell_at, sell_count, sells_15m, sells_2h
+from creator_daily_token_agg
+where creator_pubkey = $1 and day >= $2
+"""
+
+
+async def record_scored_pairs(conn: asyncpg.Connection, copy_trade_ids: Sequence[int]) -> None:
+    """Add just-scored pairs to their creators' day buckets (call in the scoring transaction)."""
+    if copy_trade_ids:
+        await conn.execute(ADD_PAIRS, list(copy_trade_ids))
+
+
+async def record_rescored_pairs(
+    conn: asyncpg.Connection, copy_trade_ids: Sequence[int], prev_scores: Sequence[Optional[float]]
+) -> None:
+    """Move re-scored pairs' execution scores in their day buckets (call in the scoring transaction)."""
+    if copy_trade_ids:
+        await conn.execute(MOVE_SCORES, list(copy_trade_ids), list(prev_scores))
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def window_start(days: int, today: Optional[date] = None) -> date:
+    """First day bucket of a `days`-day window ending today (UTC)."""
+    return (today or utc_today()) - timedelta(days=days - 1)
+
+
+async def fetch_days(db: Pool, creator_pubkey: str, days: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    since = window_start(days)
+    async with db.acquire() as conn:
+        day_rows = await conn.fetch(FETCH_DAYS, creator_pubkey, since)
+        token_rows = await conn.fetch(FETCH_TOKEN_DAYS, creator_pubkey, since)
+    return [dict(r) for r in day_rows], [dict(r) for r in token_rows]
+
+
+# ---- merging ----
+def _merge_moments(parts: Iterable[Tuple[int, float, float]]) -> Tuple[int, float, float]:
+    """Chan et al. parallel merge of (n, mean, M2) triples."""
+    n, mean, m2 = 0, 0.0, 0.0
+    for nb, mb, m2b in parts:
+        if not nb:
+            continue
+        tot = n + nb
+        delta = mb - mean
+        mean += delta * nb / tot
+        m2 += m2b + delta * delta * n * nb / tot
+        n = tot
+    return n, mean, m2
+
+
+def _std(n: int, m2: float) -> float:
+    """Sample standard deviation (n - 1), 0 below two samples."""
+    return math.sqrt(max(m2, 0.0) / (n - 1)) if n >= 2 else 0.0
+
+
+def _ratio(a: float, b: float) -> float:
+    return a / b if b else 0.0
+
+
+def _clip(x: float, lo: float, hi: float) -> float:
+    return max(lo, min(hi, x))
+
+
+def compose_window(
+    day_rows: Sequence[Mapping[str, Any]],
+    token_rows: Sequence[Mapping[str, Any]],
+    since: date,
+    exec_since: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    Creator-intel metrics over the day buckets >= since.
+
+    - exec_score_avg always covers exec_since (default: since), so a 30d
+      fallback window still reports the 7d execution average
+    """
+    days = [d for d in day_rows if d["day"] >= since]
+    toks = [t for t in token_rows if t["day"] >= since]
+    exec_days = [d for d in day_rows if d["day"] >= (exec_since or since)]
+    s = lambda rows, k: sum(r[k] for r in rows)
+
+    # 1) win rate / ROI (paired only)
+    roi_n, roi_mean, roi_m2 = _merge_moments((d["roi_n"], d["roi_mean"], d["roi_m2"]) for d in days)
+    win_rate = _ratio(s(days, "roi_wins"), roi_n)
+
+    # 2-3) late entries, chases, liquidity reaction
+    pair_count = s(days, "pair_count")
+    late_entry_rate = _ratio(s(days, "late_hits"), s(days, "late_n"))
+    chase_rate = _ratio(s(days, "chase_hits"), pair_count)
+    liquidity_penalty = _ratio(s(days, "liq_hits"), pair_count)
+
+    # 4) execution score
+    exec_score_avg = _ratio(s(exec_days, "exec_sum"), s(exec_days, "exec_n"))
+
+    # 5) position size consistency (creator BUYs)
+    buy_n, buy_mean, buy_m2 = _merge_moments((d["buy_n"], d["buy_size_mean"], d["buy_size_m2"]) for d in days)
+    position_cv = _std(buy_n, buy_m2) / buy_mean if buy_n and buy_mean > 0 else 0.0
+
+    # 6) holds: first BUY to last SELL per token; sell timing (tokens with
+    # both) relative to the first BUY in the window, see migration 0010
+    by_token: Dict[str, List[Mapping[str, Any]]] = {}
+    for t in toks:
+        by_token.setdefault(t["token_mint"], []).append(t)
+    holds_hrs: List[float] = []
+    total_sell_cases = sells_within_15m = sells_after_2h = 0
+    for rows in by_token.values():
+        buys = [t for t in rows if t["first_buy_at"] is not None]
+        sells = [t["last_sell_at"] for t in rows if t["last_sell_at"] is not None]
+        if not buys or not sells:
+            continue
+        anchor = min(buys, key=lambda t: t["first_buy_at"])
+        dt = (max(sells) - anchor["first_buy_at"]).total_seconds() / 3600.0
+        if dt >= 0:
+            holds_hrs.append(dt)
+        for t in rows:
+            total_sell_cases += t["sell_count"]
+            if t["day"] < anchor["day"]:
+                sells_within_15m += t["sell_count"]
+            elif t["day"] == anchor["day"]:
+                sells_within_15m += t["sells_15m"]
+                sells_after_2h += t["sells_2h"]
+            else:
+                sells_after_2h += t["sell_count"]
+    avg_hold_hrs = _ratio(sum(holds_hrs), len(holds_hrs))
+
+    # 7) crowd pressure: late entries, mean delta_ms_event, same-token density
+    scaled_delta = _clip(_ratio(s(days, "delta_sum"), s(days, "delta_n")) / 3000.0, 0.0, 1.0)
+    max_token_pairs = max((sum(t["pair_count"] for t in rows) for rows in by_token.values()), default=0)
+    density = _ratio(max_token_pairs, pair_count)
+    crowd_pressure = _clip(0.5*late_entry_rate + 0.3*scaled_delta + 0.2*density, 0.0, 1.0)
+
+    return {
+        "win_rate": win_rate,
+        "avg_roi_pct": roi_mean if roi_n else 0.0,
+        "roi_std_pct": _std(roi_n, roi_m2),
+        "late_entry_rate": late_entry_rate,
+        "chase_rate": chase_rate,
+        "exec_score_avg": exec_score_avg,
+        "position_cv": position_cv,
+        "avg_hold_hrs": avg_hold_hrs,
+        "crowd_pressure": crowd_pressure,
+        "liquidity_penalty": liquidity_penalty,
+        "trade_count": pair_count,
+        "pct_sold_15m": _ratio(sells_within_15m, total_sell_cases),
+        "pct_sold_after_2h": _ratio(sells_after_2h, total_sell_cases),
+    }
@@ -0,0 +1,187 @@
+# app/services/creator_history.py
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from asyncpg import Pool
+
+from ..utils.helius_client import HeliusClient
+
+log = logging.getLogger("creator_history")
+
+PAGE_SIZE = int(os.getenv("CREATOR_SCAN_PAGE_SIZE", "100"))  # Helius max
+# Pages fetched per creator per scan (forward catch-up + backward depth)
+MAX_PAGES = int(os.getenv("CREATOR_SCAN_MAX_PAGES", "20"))
+
+READ_STATE = """
+select newest_signature, newest_slot, oldest_signature, oldest_slot, history_complete,
+       catchup_before, catchup_head_signature, catchup_head_slot
+from creator_scan_state
+where creator_pubkey = $1
+"""
+
+# Marks only ever widen: concurrent scans of one creator cannot move them back.
+# A new high-water mark closes the gap, so it also ends any catch-up.
+WRITE_STATE = """
+insert into creator_scan_state (
+  creator_pubkey, newest_signature, newest_slot, oldest_signature, oldest_slot, history_complete
+)
+values ($1, $2, $3, $4, $5, $6)
+on conflict (creator_pubkey) do update set
+  newest_signature = case
+    when excluded.newest_slot is not null
+     and excluded.newest_slot >= coalesce(creator_scan_state.newest_slot, -1)
+    then excluded.newest_signature else creator_scan_state.newest_signature end,
+  newest_slot = greatest(creator_scan_state.newest_slot, excluded.newest_slot),
+  oldest_signature = case
+    when excluded.oldest_slot is not null
+     and excluded.oldest_slot <= coalesce(creator_scan_state.oldest_slot, excluded.oldest_slot)
+    then excluded.oldest_signature else creator_scan_state.oldest_signature end,
+  oldest_slot = least(creator_scan_state.oldest_slot, excluded.oldest_slot),
+  history_complete = creator_scan_state.history_complete or excluded.history_complete,
+  catchup_before = case when excluded.newest_slot is null then creator_scan_state.catchup_before end,
+  catchup_head_signature = case when excluded.newest_slot is null then creator_scan_state.catchup_head_signature end,
+  catchup_head_slot = case when excluded.newest_slot is null then creator_scan_state.catchup_head_slot end,
+  updated_at = now()
+"""
+
+# Catch-up that ran out of pages: where to resume paging back from, and the
+# head it started at (the high-water mark once the gap is closed)
+WRITE_CATCHUP = """
+update creator_scan_state
+set catchup_before = $2,
+    catchup_head_signature = $3,
+    catchup_head_slot = $4,
+    updated_at = now()
+where creator_pubkey = $1
+"""
+
+INSERT_HISTORY = """
+insert into creator_history (creator_pubkey, signature, slot, block_time)
+select $1, h.signature, h.slot, h.block_time
+from jsonb_to_recordset($2::jsonb) as h(signature text, slot int8, block_time int8)
+on conflict do nothing
+"""
+
+HISTORY_RANGE = """
+select signature, slot, block_time
+from creator_history
+where creator_pubkey = $1
+  and slot between $2 and $3
+order by slot
+"""
+
+
+def _entries(txs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for tx in txs:
+        sig, slot = tx.get("signature"), tx.get("slot")
+        if sig and slot is not None:
+            out.append({
+                "signature": sig,
+                "slot": slot,
+                "block_time": tx.get("blockTime") or tx.get("timestamp"),
+            })
+    return out
+
+
+class CreatorHistoryScanner:
+    """
+    Signature-paginated history of creator addresses, fetched once and
+    then only incrementally.
+
+    - catch up: page newest-first from the head `until` the high-water
+      mark, advancing it only once the gap is fully closed; a catch-up
+      longer than MAX_PAGES saves its `before` cursor and the head it
+      started at, and the next pass resumes from there
+    - deepen:   page `before` the low-water mark until the history covers
+      the oldest slot asked for (or the creator's first tx)
+    - every page lands in creator_history as (signature, slot); full txs
+      are in the tx cache (HeliusClient seeds it from every page)
+    """
+
+    def __init__(self, db: Pool, helius: HeliusClient):
+        self.db = db
+        self.helius = helius
+        self.pages = 0
+
+    async def _page(
+        self, creator: str, before: Optional[str] = None, until: Optional[str] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """(index entries, more pages follow) or None on failure."""
+        txs = await self.helius.address_txs_page(creator, limit=PAGE_SIZE, before=before, until=until)
+        if txs is None:
+            return None
+        self.pages += 1
+        entries = _entries(txs)
+        if entries:
+            await self.db.execute(INSERT_HISTORY, creator, json.dumps(entries))
+        return entries, len(txs) >= PAGE_SIZE
+
+    async def _save(self, creator: str, newest=None, oldest=None, complete: bool = False) -> None:
+        await self.db.execute(
+            WRITE_STATE, creator,
+            newest["signature"] if newest else None, newest["slot"] if newest else None,
+            oldest["signature"] if oldest else None, oldest["slot"] if oldest else None,
+            complete,
+        )
+
+    async def scan(self, creator: str, min_slot: int) -> None:
+        """Bring the creator's history up to the head and back to min_slot."""
+        state = await self.db.fetchrow(READ_STATE, creator)
+        budget = MAX_PAGES
+
+        if state is None or state["newest_signature"] is None:
+            res = await self._page(creator)
+            budget -= 1
+            if res is None:
+                return
+            head, more = res
+            await self._save(creator, head[0] if head else None, head[-1] if head else None,
+                             complete=not more)
+            state = await self.db.fetchrow(READ_STATE, creator)
+        else:
+            # catch up to the high-water mark
+            mark = state["newest_signature"]
+            before = state["catchup_before"]
+            newest = None
+            if before is not None:
+                newest = {"signature": state["catchup_head_signature"], "slot": state["catchup_head_slot"]}
+            while budget > 0:
+                res = await self._page(creator, before=before, until=mark)
+                budget -= 1
+                if res is None:
+                    return  # gap stays open; retried next pass
+                page, more = res
+                if page and newest is None:
+                    newest = page[0]
+                if not more or not page:
+                    if newest is not None:
+                        await self._save(creator, newest=newest)
+                    break
+                before = page[-1]["signature"]
+            else:
+                if before is not None and newest is not None:
+                    await self.db.execute(WRITE_CATCHUP, creator, before, newest["signature"], newest["slot"])
+                log.warning("creator %s: catch-up exceeded %d pages; will resume next pass", creator, MAX_PAGES)
+
+        # deepen until the history covers min_slot
+        oldest_sig, oldest_slot = state["oldest_signature"], state["oldest_slot"]
+        complete = state["history_complete"]
+        while budget > 0 and not complete and oldest_sig and oldest_slot is not None and oldest_slot > min_slot:
+            res = await self._page(creator, before=oldest_sig)
+            budget -= 1
+            if res is None:
+                return
+            page, more = res
+            complete = not more
+            oldest = page[-1] if page else None
+            await self._save(creator, oldest=oldest, complete=complete)
+            if oldest is None:
+                break
+            oldest_sig, oldest_slot = oldest["signature"], oldest["slot"]
+
+    async def history(self, creator: str, lo_slot: int, hi_slot: int) -> List[Dict[str, Any]]:
+        rows = await self.db.fetch(HISTORY_RANGE, creator, lo_slot, hi_slot)
+        return [dict(r) for r in rows]
@@ -1,76 +1,103 @@
 # app/services/db_stream.py
 import os
+import re
 import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 
-from supabase import create_client, Client
+from asyncpg import Pool
 from ..core.config import settings
 
 from .bus import bus
-from .kpi_cache import record as record_kpi
+from .kpi_cache import record_many as record_kpis
 
 # -------- Env & defaults --------
-# Use environment variables directly (same pattern as sql.py, ladder.py)
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ["SUPABASE_ANON_KEY"]
-
-
 TABLE_COPY = os.getenv("OCULUS_TABLE_TRADES", "oculus_trades_view")
 PK_COPY = os.getenv("OCULUS_COPY_PK_COL", "id")
 
+# Adaptive cadence: re-poll at once while ticks come back full, POLL_MS after
+# a partial tick, and stretch idle sleeps x1.5 up to POLL_MAX_MS.
 POLL_MS = int(os.getenv("OCULUS_DB_POLL_MS", getattr(settings, "DB_POLL_MS", 500)))
+POLL_MAX_MS = int(os.getenv("OCULUS_DB_POLL_MAX_MS", str(max(POLL_MS * 4, 2000))))
 MAX_PER_TICK = int(os.getenv("OCULUS_DB_POLL_MAX_PER_TICK", "250"))
 
 CURSOR_ENABLED = os.getenv("OCULUS_DB_CURSOR_ENABLED", "true").lower() == "true"
 CURSOR_TABLE = os.getenv("OCULUS_DB_CURSOR_TABLE", "oculus_cursor")
-CURSOR_STORAGE = os.getenv("OCULUS_DB_CURSOR_STORAGE", "supabase")  # supabase | memory
+CURSOR_STORAGE = os.getenv("OCULUS_DB_CURSOR_STORAGE", "db")  # db | memory ("supabase" = db)
 STREAM_KEY = os.getenv("OCULUS_DB_CURSOR_STREAM_KEY", "trades_view")
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
 logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
 log = logging.getLogger("db_stream")
 
+# Table / column names come from env and are interpolated into SQL
+_IDENT = re.compile(r"^[a-z_][a-z0-9_]*(\.[a-z_][a-z0-9_]*)?$")
+for _name in (TABLE_COPY, PK_COPY, CURSOR_TABLE):
+    if not _IDENT.match(_name):
+        raise RuntimeError(f"db_stream: invalid identifier {_name!r}")
 
-def _sb() -> Client:
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        raise RuntimeError("SUPABASE_URL / SUPABASE_*_KEY not set")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+# Keyset page: index range scan on the PK, no offset
+POLL_ROWS = f"""
+select *
+from {TABLE_COPY}
+where {PK_COPY} > $1
+order by {PK_COPY}
+limit $2
+"""
 
+READ_CURSOR = f"select last_seen_id from {CURSOR_TABLE} where stream_key = $1"
+
+# never move backwards (several API replicas may share a stream key)
+WRITE_CURSOR = f"""
+insert into {CURSOR_TABLE} (stream_key, last_seen_id)
+values ($1, $2)
+on conflict (stream_key) do update
+set last_seen_id = greatest({CURSOR_TABLE}.last_seen_id, excluded.last_seen_id)
+"""
 
-async def _read_cursor_supabase(sb: Client, stream_key: str) -> int:
-    try:
-        res = sb.table(CURSOR_TABLE).select("last_seen_id").eq("stream_key", stream_key).limit(1).execute()
-        rows = res.data or []
-        return int(rows[0]["last_seen_id"]) if rows else 0
-    except Exception as e:
-        log.warning("cursor read failed; defaulting to 0: %r", e)
-        return 0
 
+# Set by the NOTIFY listener (see main.py) to cut the current poll sleep short
+_wake = asyncio.Event()
 
-async def _write_cursor_supabase(sb: Client, stream_key: str, new_id: int) -> None:
+
+def wake(*_args: Any) -> None:
+    """NOTIFY callback: poll now instead of at the next POLL_MS tick."""
+    _wake.set()
+
+
+async def _sleep(seconds: float) -> None:
+    # _wake is cleared before each tick (see stream loop), not here: a NOTIFY
+    # that arrived while the tick was querying must still end this sleep
     try:
-        payload = {"stream_key": stream_key, "last_seen_id": int(new_id)}
-        # upsert; never move backwards
-        sb.table(CURSOR_TABLE).upsert(payload, on_conflict="stream_key").execute()
-    except Exception as e:
-        log.error("cursor write failed (stream_key=%s new_id=%s): %r", stream_key, new_id, e)
+        await asyncio.wait_for(_wake.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _cursor_in_db() -> bool:
+    return CURSOR_ENABLED and CURSOR_STORAGE in ("db", "supabase")
 
 
-async def _read_cursor(sb: Client) -> int:
-    if not CURSOR_ENABLED:
+async def _read_cursor(db: Pool) -> int:
+    if not _cursor_in_db():
+        # memory fallback (mostly for tests)
+        return 0
+    try:
+        v = await db.fetchval(READ_CURSOR, STREAM_KEY)
+        return int(v) if v is not None else 0
+    except Exception as e:
+        log.warning("cursor read failed; defaulting to 0: %r", e)
         return 0
-    if CURSOR_STORAGE == "supabase":
-        return await _read_cursor_supabase(sb, STREAM_KEY)
-    # memory fallback (mostly for tests)
-    return 0
 
 
-async def _write_cursor(sb: Client, last_id: int) -> None:
-    if not CURSOR_ENABLED:
+async def _write_cursor(db: Pool, last_id: int) -> None:
+    if not _cursor_in_db():
         return
-    if CURSOR_STORAGE == "supabase":
-        await _write_cursor_supabase(sb, STREAM_KEY, last_id)
+    try:
+        await db.execute(WRITE_CURSOR, STREAM_KEY, int(last_id))
+    except Exception as e:
+        log.error("cursor write failed (stream_key=%s new_id=%s): %r", STREAM_KEY, last_id, e)
 
 
 def _coerce_int(v: Any, default: int = 0) -> int:
@@ -87,6 +114,8 @@ def _map_row(r: Dict[str, Any]) -> Dict[str, Any]:
     action = action.upper() if isinstance(action, str) else "BUY"
     token = r.get("mint") or r.get("token_mint") or "NA"
     ts = r.get("ts_iso") or r.get("ts") or r.get("created_at")
+    if isinstance(ts, datetime):
+        ts = ts.isoformat()
 
     score = _coerce_int(r.get("execution_score"), 75)
     copy_slot = _coerce_int(r.get("copy_slot") or r.get("slot"), 0)
@@ -106,69 +135,71 @@ def _map_row(r: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-async def run_db_stream(stop_evt: asyncio.Event) -> None:
+def _next_sleep_ms(fetched: int, idle_ms: float) -> Tuple[float, float]:
+    """(sleep_ms, next idle_ms) for the adaptive cadence."""
+    if fetched >= MAX_PER_TICK:
+        return 0.0, POLL_MS  # burst: drain without sleeping
+    if fetched:
+        return POLL_MS, POLL_MS
+    return idle_ms, min(idle_ms * 1.5, POLL_MAX_MS)
+
+
+async def run_db_stream(stop_evt: asyncio.Event, db: Pool) -> None:
     """
-    Poll new rows from OCULUS_TABLE_TRADES (view), emit to SSE bus, update KPI cache.
-    Adds:
-      - Cursor-based replay via Supabase table (oculus_cursor)
-      - Burst limiting via OCULUS_DB_POLL_MAX_PER_TICK
+    Poll new rows from OCULUS_TABLE_TRADES (view) on the shared asyncpg pool,
+    emit to SSE bus, update KPI cache.
+      - Keyset paging on PK_COPY (where pk > cursor order by pk limit N)
+      - One cursor upsert per non-empty tick (table oculus_cursor)
+      - Whole tick published to the bus / KPI cache in one batch
+      - Adaptive sleep: 0 while burst-capped, POLL_MS after a partial tick,
+        growing to POLL_MAX_MS while idle; NOTIFY wake-ups cut it short
     """
-    sb = _sb()
-    since_id: int = await _read_cursor(sb)  # 0 if disabled / not set
+    since_id: int = await _read_cursor(db)  # 0 if disabled / not set
     log.info(
-        "db_stream start: table=%s pk=%s poll_ms=%s max_per_tick=%s since_id=%s cursor_enabled=%s",
-        TABLE_COPY, PK_COPY, POLL_MS, MAX_PER_TICK, since_id, CURSOR_ENABLED,
+        "db_stream start: table=%s pk=%s poll_ms=%s..%s max_per_tick=%s since_id=%s cursor_enabled=%s",
+        TABLE_COPY, PK_COPY, POLL_MS, POLL_MAX_MS, MAX_PER_TICK, since_id, CURSOR_ENABLED,
     )
 
+    idle_ms: float = POLL_MS
     try:
         while not stop_evt.is_set():
+            fetched = 0
+            _wake.clear()  # this tick sees every row committed before now
             try:
-                # ✅ Wrap blocking Supabase .execute() inside a thread
-                rows: List[Dict[str, Any]] = await asyncio.to_thread(
-                    lambda: (
-                        sb.table(TABLE_COPY)
-                        .select("*")
-                        .gt(PK_COPY, since_id)
-                        .order(PK_COPY, desc=False)
-                        .limit(MAX_PER_TICK)
-                        .execute()
-                        .data
-                        or []
+                rows = await db.fetch(POLL_ROWS, since_id, MAX_PER_TICK)
+                fetched = len(rows)
+
+                if rows:
+                    items = []
+                    for r in rows:
+                        evt = _map_row(dict(r))
+                        # cursor value doubles as the SSE event id (Last-Event-ID replay)
+                        items.append((evt, _coerce_int(r[PK_COPY])))
+                    await bus.publish_many(items)
+                    record_kpis([evt for evt, _ in items])
+
+                    max_id = _coerce_int(rows[-1][PK_COPY], since_id)
+                    await _write_cursor(db, max_id)
+                    since_id = max(since_id, max_id)
+
+                    log.debug(
+                        "poll: fetched=%d burst_capped=%s advanced_cursor=%s",
+                        fetched, fetched >= MAX_PER_TICK, since_id,
                     )
-                )
-
-                if not rows:
-                    log.debug("idle: no new rows > %s; sleep=%sms", since_id, POLL_MS)
-                    await asyncio.sleep(POLL_MS / 1000.0)
-                    continue
-
-                # Map & emit
-                for r in rows:
-                    evt = _map_row(r)
-                    await bus.publish(evt)
-                    record_kpi(evt)
-
-                max_id = _coerce_int(rows[-1].get(PK_COPY), since_id)
-                burst_capped = len(rows) == MAX_PER_TICK
-
-                # ✅ Wrap cursor write in to_thread as well
-                await asyncio.to_thread(lambda: asyncio.run(_write_cursor(sb, max_id)))
-                since_id = max(since_id, max_id)
-
-                log.info(
-                    "poll: fetched=%d burst_capped=%s advanced_cursor=%s sleep=%sms",
-                    len(rows), burst_capped, since_id, POLL_MS,
-                )
 
             except Exception as e:
                 log.exception("[DB_STREAM] tick error: %r", e)
 
-            await asyncio.sleep(POLL_MS / 1000.0)
+            sleep_ms, idle_ms = _next_sleep_ms(fetched, idle_ms)
+            if sleep_ms <= 0:
+                await asyncio.sleep(0)  # yield to SSE writers between bursts
+                continue
+            await _sleep(sleep_ms / 1000.0)
 
     finally:
         # Best-effort flush; since_id already held the max we emitted.
         try:
-            await _write_cursor(sb, since_id)
+            await _write_cursor(db, since_id)
             log.info("db_stream stop: cursor flushed since_id=%s", since_id)
         except Exception as e:
             log.warning("cursor flush failed on shutdown: %r", e)
@@ -1,6 +1,7 @@
 # backend/app/services/execution_score.py
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional, Sequence
+import numpy as np
 
 def clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
@@ -123,3 +124,154 @@ def finalize_score(sub: Dict[str, Optional[float]]) -> Dict[str, Any]:
         score = round(clamp(acc/total_w, 0.0, 100.0), 2)
     status = "READY" if (len(missing)==0 and score is not None) else ("PARTIAL" if score is not None else "FAILED")
     return {"score": score, "status": status, "missing": missing}
+
+
+# ---------------------------------------------------------------------------
+# Batch (column) engine: the same formulas over NumPy arrays, one column per
+# input, NaN = missing. Every expression mirrors the scalar code above
+# operation for operation (same constants, same evaluation order, masked
+# terms added as +0.0), so each row scores bit-for-bit like
+# finalize_score(compute_subscores(row, baselines)). Keep both in sync.
+# ---------------------------------------------------------------------------
+
+SCORE_INPUTS = (
+    "delta_slots_event", "delta_ms_event", "delta_slots_landed", "delta_ms_landed",
+    "price_drift_pct", "size_similarity", "route_similarity",
+    "copy_roi_pct", "source_roi_pct", "tip_per_cu", "cu_price_micro_lamports",
+)
+SUBSCORES = ("timing", "financial", "cost", "congestion")
+_WEIGHTS = {"timing": 0.40, "financial": 0.35, "cost": 0.15, "congestion": 0.10}
+
+def _column(batch: Mapping[str, Sequence[Any]], name: str, n: int) -> np.ndarray:
+    vals = batch.get(name)
+    if vals is None:
+        return np.full(n, np.nan)
+    return np.array(vals, dtype=np.float64)  # None -> NaN
+
+def _v_norm_t(target: float, maxv: float, x: np.ndarray) -> np.ndarray:
+    xx = np.maximum(0.0, np.minimum(maxv, x))
+    return np.where(xx <= target, 100.0, 100.0 * (maxv - xx) / (maxv - target))
+
+def _baseline(baselines: Mapping[str, Any], key: str, n: int) -> np.ndarray:
+    """Baseline as a per-row array: a scalar is broadcast, None -> NaN."""
+    v = baselines.get(key)
+    if v is None:
+        return np.full(n, np.nan)
+    if np.ndim(v) == 0:
+        return np.full(n, float(v))
+    return np.array(v, dtype=np.float64)  # one value per row, None -> NaN
+
+def _v_norm_inv_to_baseline(x: np.ndarray, p50: np.ndarray) -> np.ndarray:
+    valid = p50 > 0  # NaN (no baseline) compares False
+    out = np.where(valid & ~np.isnan(x), 100.0, np.nan)
+    above = valid & (x > p50)
+    # ratio ** 1.25 through Python's float pow (libm): NumPy's SIMD power
+    # can differ from it in the last bit
+    ratio = x[above] / p50[above]
+    powed = np.fromiter((r ** 1.25 for r in ratio.tolist()), dtype=np.float64, count=ratio.size)
+    out[above] = np.maximum(0.0, np.minimum(100.0, 100.0 * (1.0 / powed)))
+    return out
+
+def _v_pair(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """0.6*a + 0.4*b when both are known, else whichever is known."""
+    has_a, has_b = ~np.isnan(a), ~np.isnan(b)
+    both = 0.6*np.where(has_a, a, 0.0) + 0.4*np.where(has_b, b, 0.0)
+    return np.where(has_a & has_b, both, np.where(has_a, a, b))
+
+def compute_subscores_batch(batch: Mapping[str, Sequence[Any]], baselines: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Column-batch compute_subscores.
+
+    - batch: {input name: values}, one entry per SCORE_INPUTS name (absent
+      names count as all-missing), None = missing
+    - baselines: same keys as for compute_subscores; each value is either
+      one number for the whole batch or a sequence with one entry per row
+      (per-token / per-creator baselines), None = no baseline
+    - returns {subscore: float64 array}, NaN where the scalar returns None
+    """
+    n = max((len(v) for v in batch.values() if v is not None), default=0)
+    col = {k: _column(batch, k, n) for k in SCORE_INPUTS}
+    known = {k: ~np.isnan(v) for k, v in col.items()}
+
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        # Timing
+        s_event = _v_pair(_v_norm_t(2, 12, col["delta_slots_event"]), _v_norm_t(400, 3000, col["delta_ms_event"]))
+        s_landed = _v_pair(_v_norm_t(2, 15, col["delta_slots_landed"]), _v_norm_t(800, 5000, col["delta_ms_landed"]))
+        has_event, has_landed = ~np.isnan(s_event), ~np.isnan(s_landed)
+        timing = np.where(
+            has_event & has_landed,
+            0.7*np.where(has_event, s_event, 0.0) + 0.3*np.where(has_landed, s_landed, 0.0),
+            np.where(has_event, s_event, s_landed),
+        )
+
+        # Financial
+        s_price = _v_norm_t(0.005, 0.05, col["price_drift_pct"])
+        s_size = col["size_similarity"] * 100.0
+        s_route = col["route_similarity"] * 100.0
+        roi_pen = np.maximum(0.0, (col["source_roi_pct"] - col["copy_roi_pct"]))
+        s_roi = np.maximum(0.0, np.minimum(100.0, 100.0 - roi_pen*5.0))
+
+        acc = np.zeros(n)
+        wsum = np.zeros(n)
+        for val, w in ((s_price, 0.6), (s_size, 0.15), (s_route, 0.15), (s_roi, 0.10)):
+            has = ~np.isnan(val)
+            acc = acc + np.where(has, val*w, 0.0)
+            wsum = wsum + np.where(has, w, 0.0)
+        financial = np.where(wsum > 0, acc / np.where(wsum > 0, wsum, 1.0), np.nan)
+
+        # Cost
+        tip_p50 = _baseline(baselines, "tip_per_cu_p50", n)
+        s_tip = _v_norm_inv_to_baseline(col["tip_per_cu"], tip_p50)
+        s_cu_price = _v_norm_inv_to_baseline(col["cu_price_micro_lamports"], _baseline(baselines, "cu_price_p50", n))
+        has_tip, has_cu = ~np.isnan(s_tip), ~np.isnan(s_cu_price)
+        cnt = has_tip.astype(np.float64) + has_cu
+        cost = np.where(
+            cnt > 0,
+            (np.where(has_tip, s_tip, 0.0) + np.where(has_cu, s_cu_price, 0.0)) / np.where(cnt > 0, cnt, 1.0),
+            np.nan,
+        )
+
+        # Congestion (NaN p95 -> NaN cong_factor -> NaN congestion)
+        cong_factor = np.maximum(0.5, np.minimum(2.0, _baseline(baselines, "delta_slots_landed_p95", n)/6.0))
+        s_land_again = _v_norm_t(2, 15, col["delta_slots_landed"])
+        congestion = np.maximum(0.0, np.minimum(100.0, s_land_again * cong_factor))
+        tip = col["tip_per_cu"]
+        overpay = (
+            known["tip_per_cu"] & (tip != 0)
+            & ~np.isnan(tip_p50) & (tip_p50 != 0)
+            & (cong_factor < 0.8) & (tip > 3.0 * tip_p50)
+        )
+        congestion = np.where(overpay, np.maximum(0.0, np.minimum(100.0, congestion - 15.0)), congestion)
+
+    return {"timing": timing, "financial": financial, "cost": cost, "congestion": congestion}
+
+def finalize_score_batch(sub: Mapping[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    Column-batch finalize_score.
+
+    - score: float64 array (NaN = None), rounded with Python's round() per
+      row, since np.round can differ from round() in the last digit
+    - status: list of READY / PARTIAL / FAILED
+    - missing: bool array (rows x SUBSCORES), True = subscore missing
+    """
+    n = len(next(iter(sub.values()))) if sub else 0
+    acc = np.zeros(n)
+    total_w = np.zeros(n)
+    for k, w in _WEIGHTS.items():
+        v = sub.get(k, np.full(n, np.nan))
+        has = ~np.isnan(v)
+        acc = acc + np.where(has, v*w, 0.0)
+        total_w = total_w + np.where(has, w, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        raw = np.where(total_w > 0, np.maximum(0.0, np.minimum(100.0, acc / np.where(total_w > 0, total_w, 1.0))), np.nan)
+    score = np.array([round(v, 2) for v in raw.tolist()], dtype=np.float64)
+
+    # a score exists iff at least one subscore does
+    missing = np.column_stack([
+        np.isnan(sub[k]) if k in sub else np.ones(n, dtype=bool) for k in _WEIGHTS
+    ]) if n else np.zeros((0, len(_WEIGHTS)), dtype=bool)
+    n_missing = missing.sum(axis=1)
+    status = np.where(
+        n_missing == 0, "READY", np.where(n_missing == len(_WEIGHTS), "FAILED", "PARTIAL")
+    ).tolist()
+    return {"score": score, "status": status, "missing": missing}
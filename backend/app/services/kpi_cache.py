@@ -1,42 +1,218 @@
 # app/services/kpi_cache.py
+"""
+Incremental KPI aggregates over the live trade stream.
+
+Every recorded event is folded into running sums as it arrives and
+subtracted again as it falls out, so reads never rescan events:
+
+  - count window: the last MAX_BUF events (the original /v1/kpis view)
+  - time windows: 15s / 1m / 5m / 1h, fed from one-second buckets; each
+    window keeps refs to the buckets it covers and retires them as the
+    clock moves past the window edge
+  - per-creator / per-wallet sub-aggregates inside every window, whose
+    event counts double as the refcounts behind active_creators/wallets
+"""
 from collections import deque
 from time import time
-from typing import Deque, Dict, Any
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 MAX_BUF = 1000
-_T: Deque[Dict[str, Any]] = deque(maxlen=MAX_BUF)
+TPS_WINDOW = "15s"
 
-def record(evt: Dict[str, Any]) -> None:
-    e = dict(evt)
-    e["_t"] = time()
-    _T.appendleft(e)
+WINDOWS: Dict[str, int] = {"15s": 15, "1m": 60, "5m": 300, "1h": 3600}
+BREAKDOWNS = ("creator", "wallet")
+
+
+class _Agg:
+    """Running n / buys / sum(blocks) / sum(score)."""
+
+    __slots__ = ("n", "buys", "blocks", "score")
 
-def current_kpis() -> Dict[str, Any]:
-    if not _T:
+    def __init__(self) -> None:
+        self.n = 0
+        self.buys = 0
+        self.blocks = 0
+        self.score = 0
+
+    def add(self, buy: int, blocks: int, score: int, sign: int = 1) -> None:
+        self.n += sign
+        self.buys += sign * buy
+        self.blocks += sign * blocks
+        self.score += sign * score
+
+    def merge(self, other: "_Agg", sign: int = 1) -> None:
+        self.n += sign * other.n
+        self.buys += sign * other.buys
+        self.blocks += sign * other.blocks
+        self.score += sign * other.score
+
+    def view(self) -> Dict[str, Any]:
+        n = self.n
         return {
-            "active_creators": 0,
-            "buy_pct": 0.0,
-            "avg_blocks": 0.0,
-            "avg_score": 0.0,
-            "tps": 0.0,
-            "window": 0,
+            "events": n,
+            "buy_pct": (self.buys / n) * 100.0 if n else 0.0,
+            "avg_blocks": self.blocks / n if n else 0.0,
+            "avg_score": self.score / n if n else 0.0,
         }
-    total = len(_T)
-    creators = {e.get("creator", "") for e in _T}
-    buys = sum(1 for e in _T if e.get("action") == "BUY")
-    deltas = [(e.get("copy_slot", 0) - e.get("source_slot", 0)) for e in _T]
-    avg_blocks = sum(deltas) / total
-    avg_score = sum(int(e.get("execution_score", 0)) for e in _T) / total
 
+
+class _Group:
+    """An _Agg total plus per-creator / per-wallet _Aggs."""
+
+    __slots__ = ("total", "by_creator", "by_wallet")
+
+    def __init__(self) -> None:
+        self.total = _Agg()
+        self.by_creator: Dict[str, _Agg] = {}
+        self.by_wallet: Dict[str, _Agg] = {}
+
+    def add(self, creator: str, wallet: str, buy: int, blocks: int, score: int) -> None:
+        self.total.add(buy, blocks, score)
+        _keyed(self.by_creator, creator).add(buy, blocks, score)
+        _keyed(self.by_wallet, wallet).add(buy, blocks, score)
+
+    def merge(self, other: "_Group", sign: int = 1) -> None:
+        self.total.merge(other.total, sign)
+        _merge_keyed(self.by_creator, other.by_creator, sign)
+        _merge_keyed(self.by_wallet, other.by_wallet, sign)
+
+
+def _keyed(m: Dict[str, _Agg], key: str) -> _Agg:
+    agg = m.get(key)
+    if agg is None:
+        agg = m[key] = _Agg()
+    return agg
+
+
+def _merge_keyed(dst: Dict[str, _Agg], src: Dict[str, _Agg], sign: int) -> None:
+    for key, agg in src.items():
+        d = _keyed(dst, key)
+        d.merge(agg, sign)
+        if d.n <= 0:
+            del dst[key]  # refcount hit zero: no longer active
+
+
+class _TimeWindow:
+    def __init__(self, seconds: int) -> None:
+        self.seconds = seconds
+        self.group = _Group()
+        self._buckets: Deque[Tuple[int, _Group]] = deque()
+
+    def attach(self, sec: int, bucket: _Group) -> None:
+        self._buckets.append((sec, bucket))
+
+    def expire(self, now_sec: int) -> None:
+        edge = now_sec - self.seconds
+        while self._buckets and self._buckets[0][0] <= edge:
+            _, bucket = self._buckets.popleft()
+            self.group.merge(bucket, -1)
+
+
+class KpiAggregator:
+    def __init__(self, max_events: int = MAX_BUF, windows: Optional[Dict[str, int]] = None) -> None:
+        self.max_events = max_events
+        # count window: compact (creator, wallet, buy, blocks, score) tuples
+        self._events: Deque[Tuple[str, str, int, int, int]] = deque()
+        self._last = _Group()
+        self._windows = {name: _TimeWindow(sec) for name, sec in (windows or WINDOWS).items()}
+        self._bucket_sec: Optional[int] = None
+        self._bucket: Optional[_Group] = None
+
+    def _advance(self, now_sec: int) -> None:
+        for w in self._windows.values():
+            w.expire(now_sec)
+
+    def record(self, evt: Dict[str, Any], now: Optional[float] = None) -> None:
+        creator = evt.get("creator", "")
+        wallet = evt.get("wallet", "")
+        buy = 1 if evt.get("action") == "BUY" else 0
+        blocks = evt.get("copy_slot", 0) - evt.get("source_slot", 0)
+        score = int(evt.get("execution_score", 0))
+
+        # count window
+        if len(self._events) >= self.max_events:
+            c, w, b, bl, s = self._events.popleft()
+            self._last.total.add(b, bl, s, -1)
+            for m, key in ((self._last.by_creator, c), (self._last.by_wallet, w)):
+                agg = m[key]
+                agg.add(b, bl, s, -1)
+                if agg.n <= 0:
+                    del m[key]
+        self._events.append((creator, wallet, buy, blocks, score))
+        self._last.add(creator, wallet, buy, blocks, score)
+
+        # time windows
+        now_sec = int(now if now is not None else time())
+        self._advance(now_sec)
+        if self._bucket_sec != now_sec:
+            self._bucket_sec = now_sec
+            self._bucket = _Group()
+            for w in self._windows.values():
+                w.attach(now_sec, self._bucket)
+        self._bucket.add(creator, wallet, buy, blocks, score)
+        for w in self._windows.values():
+            w.group.add(creator, wallet, buy, blocks, score)
+
+    def _tps(self) -> float:
+        w = self._windows.get(TPS_WINDOW)
+        return (w.group.total.n / w.seconds) if w else 0.0
+
+    def current(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """The original /v1/kpis payload: last MAX_BUF events + 15s TPS."""
+        self._advance(int(now if now is not None else time()))
+        v = self._last.total.view()
+        return {
+            "active_creators": len(self._last.by_creator),
+            "buy_pct": v["buy_pct"],
+            "avg_blocks": v["avg_blocks"],
+            "avg_score": v["avg_score"],
+            "tps": self._tps(),
+            "window": v["events"],
+        }
+
+    def window(
+        self,
+        name: str,
+        breakdown: Optional[str] = None,
+        top: int = 20,
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        w = self._windows[name]
+        w.expire(int(now if now is not None else time()))
+        g = w.group
+        out: Dict[str, Any] = {
+            "window": name,
+            "window_sec": w.seconds,
+            **g.total.view(),
+            "active_creators": len(g.by_creator),
+            "active_wallets": len(g.by_wallet),
+            "tps": g.total.n / w.seconds,
+        }
+        if breakdown:
+            out["breakdown"] = _breakdown(g.by_creator if breakdown == "creator" else g.by_wallet, top)
+        return out
+
+
+def _breakdown(m: Dict[str, _Agg], top: int) -> List[Dict[str, Any]]:
+    ranked = sorted(m.items(), key=lambda kv: kv[1].n, reverse=True)[: max(top, 0)]
+    return [{"key": k, **agg.view()} for k, agg in ranked]
+
+
+# Singleton aggregator for the API process
+_KPIS = KpiAggregator()
+
+
+def record(evt: Dict[str, Any]) -> None:
+    _KPIS.record(evt)
+
+
+def record_many(evts: List[Dict[str, Any]]) -> None:
     now = time()
-    recent = sum(1 for e in _T if now - e["_t"] <= 15.0)
-    tps = recent / 15.0
-
-    return {
-        "active_creators": len(creators),
-        "buy_pct": (buys / total) * 100.0,
-        "avg_blocks": avg_blocks,
-        "avg_score": avg_score,
-        "tps": tps,
-        "window": total,
-    }
+    for evt in evts:
+        _KPIS.record(evt, now=now)
+
+
+def current_kpis(window: Optional[str] = None, breakdown: Optional[str] = None, top: int = 20) -> Dict[str, Any]:
+    if window is None:
+        return _KPIS.current()
+    return _KPIS.window(window, breakdown=breakdown, top=top)
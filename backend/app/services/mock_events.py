@@ -30,9 +30,12 @@ def _sample_trade() -> dict:
 
 async def run_mock_event_loop(hz: float, stop_event: asyncio.Event):
     delay = 1.0 / max(hz, 0.1)
+    # ms-based ids stay monotonic across restarts, like the db cursor
+    event_id = int(time.time() * 1000)
     while not stop_event.is_set():
         # ✅ generate one trade and reuse for both bus + KPI
         trade = _sample_trade()
-        await bus.publish(trade)
+        event_id = max(event_id + 1, int(time.time() * 1000))
+        await bus.publish(trade, event_id=event_id)
         record_kpi(trade)
         await asyncio.sleep(delay)
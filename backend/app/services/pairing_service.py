@@ -1,30 +1,22 @@
 # app/services/pairing_service.py
-import time
 from asyncpg import Pool
 from typing import Optional, Dict, Any
 from ..core.config import settings
 from ..db.sql import fetch_compare_row, call_nearest_source
 from . import pairing_store  # now implemented
+from . import rebuild_jobs
+from .compare_cache import compare_cache, invalidate as invalidate_compare
 
-# simple in-memory cache (trade_id -> (ts_ms, payload or awaiting))
-_CACHE: Dict[int, Dict[str, Any]] = {}
+async def compare_for_trade(db: Pool, copy_trade_id: int) -> Dict[str, Any]:
+    cached = compare_cache.get(copy_trade_id)
+    if cached is not None:
+        return cached
 
-def _now_ms() -> int:
-    return int(time.time() * 1000)
-
-def _fresh(entry_ts: int) -> bool:
-    return (_now_ms() - entry_ts) <= settings.COMPARE_CACHE_TTL_MS
-
-def compare_for_trade(copy_trade_id: int) -> Dict[str, Any]:
-    cached = _CACHE.get(copy_trade_id)
-    if cached and _fresh(cached["ts"]):
-        return cached["payload"]
-
-    row = fetch_compare_row(copy_trade_id)
+    row = await fetch_compare_row(db, copy_trade_id)
     if not row:
         # Do NOT call DB RPC here. Workers will pair asynchronously.
         payload = {"status": "AWAITING_MATCH", "message": "Awaiting worker pairing…", "confidence": "LOW"}
-        CACHE[copy_trade_id] = {"ts": _now_ms(), "payload": payload}
+        compare_cache.set(copy_trade_id, payload, settings.COMPARE_CACHE_AWAITING_TTL_MS)
         return payload
 
 
@@ -79,21 +71,29 @@ def compare_for_trade(copy_trade_id: int) -> Dict[str, Any]:
         "diagnostics": row.get("diagnostics") or {"cause": None, "detail": None},
         "confidence": (row.get("confidence") or "NONE"),
     }
-    _CACHE[copy_trade_id] = {"ts": _now_ms(), "payload": payload}
+    compare_cache.set(copy_trade_id, payload, settings.COMPARE_CACHE_TTL_MS)
     return payload
 
-def force_pair(copy_trade_id: int) -> Dict[str, Any]:
+async def force_pair(db: Pool, copy_trade_id: int) -> Dict[str, Any]:
     """
     Force a pairing attempt (upsert). Clears cache entry for this trade.
     """
-    res = pairing_store.pair_one(copy_trade_id)
-    _CACHE.pop(copy_trade_id, None)
+    res = await pairing_store.pair_one(db, copy_trade_id)
+    invalidate_compare([copy_trade_id])
     return res
 
-def rebuild_pairs(limit: int, since_iso: Optional[str], until_iso: Optional[str]) -> Dict[str, Any]:
-    res = pairing_store.rebuild(limit=limit, since_iso=since_iso, until_iso=until_iso)
-    _CACHE.clear()
-    return res
+async def rebuild_pairs(db: Pool, limit: int, since_iso: Optional[str], until_iso: Optional[str]) -> Dict[str, Any]:
+    """
+    Start a background rebuild job (one at a time per process) and return
+    its first snapshot. Cache entries are dropped chunk by chunk.
+    """
+    job = rebuild_jobs.running()
+    if job is not None:
+        return {"started": False, "reason": "ALREADY_RUNNING", **job.snapshot()}
+    job = rebuild_jobs.submit(
+        db, limit=limit, since_iso=since_iso, until_iso=until_iso, on_chunk=invalidate_compare
+    )
+    return {"started": True, **job.snapshot()}
 
 async def get_pair(db: Pool, copy_trade_id: int) -> Optional[Dict[str, Any]]:
     row = await db.fetchrow("select * from trade_pairs where copy_trade_id = $1", copy_trade_id)
@@ -1,7 +1,9 @@
 # app/services/pairing_store.py
 from __future__ import annotations
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, List, Sequence, Union
 from datetime import datetime
+from asyncpg import Pool
 from ..core.config import settings
 from ..db.sql import (
     fetch_copy_trade,
@@ -10,12 +12,17 @@ from ..db.sql import (
     upsert_trade_pair,
 )
 
-def _ms_delta(copy_ts: Optional[str], source_ts: Optional[str]) -> Optional[int]:
+def _as_dt(v: Union[str, datetime]) -> datetime:
+    if isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(v.replace("Z", "+00:00"))
+
+def _ms_delta(copy_ts: Optional[Union[str, datetime]], source_ts: Optional[Union[str, datetime]]) -> Optional[int]:
     if not copy_ts or not source_ts:
         return None
     try:
-        c = datetime.fromisoformat(copy_ts.replace("Z", "+00:00"))
-        s = datetime.fromisoformat(source_ts.replace("Z", "+00:00"))
+        c = _as_dt(copy_ts)
+        s = _as_dt(source_ts)
         return int((c - s).total_seconds() * 1000)
     except Exception:
         return None
@@ -54,18 +61,18 @@ def _confidence_from_deltas(delta_ms: Optional[int], delta_slots: Optional[int])
         return "MED"
     return "LOW"
 
-def pair_one(copy_trade_id: int) -> Dict[str, Any]:
+async def pair_one(db: Pool, copy_trade_id: int) -> Dict[str, Any]:
     """
     Pair one copy trade to its nearest source and upsert into trade_pairs.
     Returns a small result for logs.
     """
-    copy = fetch_copy_trade(copy_trade_id)
+    copy = await fetch_copy_trade(db, copy_trade_id)
     if not copy:
         return {"paired": False, "reason": "COPY_NOT_FOUND", "copy_trade_id": copy_trade_id}
 
     # Find nearest source (via RPC; if not registered, this returns None)
     win_s = settings.PAIR_WINDOW_MS // 1000
-    source_id = nearest_source_for_copy(copy_trade_id, win_s)
+    source_id = await nearest_source_for_copy(db, copy_trade_id, win_s)
     if not source_id:
         # nothing we can do right now
         payload = {
@@ -75,10 +82,10 @@ def pair_one(copy_trade_id: int) -> Dict[str, Any]:
             "side": (copy.get("side") or "").upper(),
             "paired_at": datetime.utcnow().isoformat() + "Z",
         }
-        ok, err = upsert_trade_pair(payload)
+        ok, err = await upsert_trade_pair(db, payload)
         return {"paired": False, "reason": "NO_SOURCE", "error": err, "copy_trade_id": copy_trade_id}
 
-    source = fetch_source_trade(source_id)
+    source = await fetch_source_trade(db, source_id)
     if not source:
         return {"paired": False, "reason": "SOURCE_NOT_FOUND", "copy_trade_id": copy_trade_id, "source_id": source_id}
 
@@ -88,7 +95,7 @@ def pair_one(copy_trade_id: int) -> Dict[str, Any]:
 
     # Prices
     copy_price = _copy_effective_price(copy.get("invested_sol"), copy.get("received_qty"))
-    source_price = source.get("price")
+    source_price = float(source["price"]) if source.get("price") is not None else None
     drift_pct = _price_drift(copy_price, source_price)
 
     # Confidence (v1)
@@ -108,7 +115,7 @@ def pair_one(copy_trade_id: int) -> Dict[str, Any]:
         # keep diagnostics flexible (v2 can add detail)
         "diagnostics": None,
     }
-    ok, err = upsert_trade_pair(payload)
+    ok, err = await upsert_trade_pair(db, payload)
     return {
         "paired": bool(ok),
         "copy_trade_id": copy_trade_id,
@@ -120,21 +127,39 @@ def pair_one(copy_trade_id: int) -> Dict[str, Any]:
         "price_drift_pct": drift_pct,
     }
 
-def rebuild(limit: int = 500, since_iso: Optional[str] = None, until_iso: Optional[str] = None) -> Dict[str, Any]:
-    """
-    Pair recent copy trades in bulk (idempotent upsert).
-    """
-    from ..db.sql import select_recent_copy_ids
-    ids = select_recent_copy_ids(limit=limit, since_iso=since_iso, until_iso=until_iso)
+def _tally(results: List[Dict[str, Any]]) -> Dict[str, int]:
     paired, awaiting, errors = 0, 0, 0
-    results = []
-    for tid in ids:
-        res = pair_one(tid)
-        results.append(res)
+    for res in results:
         if res.get("paired"):
             paired += 1
         elif res.get("reason") in ("NO_SOURCE",):
             awaiting += 1
         if res.get("error"):
             errors += 1
-    return {"scanned": len(ids), "paired": paired, "awaiting": awaiting, "errors": errors}
+    return {"scanned": len(results), "paired": paired, "awaiting": awaiting, "errors": errors}
+
+async def pair_many(db: Pool, copy_trade_ids: Sequence[int], concurrency: int = 1) -> Dict[str, int]:
+    """
+    pair_one over a set of ids with at most `concurrency` in flight
+    (each holds a pool connection per statement). Returns counters.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(tid: int) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return await pair_one(db, tid)
+            except Exception as e:
+                return {"paired": False, "reason": "EXCEPTION", "error": str(e), "copy_trade_id": tid}
+
+    results = await asyncio.gather(*(_one(tid) for tid in copy_trade_ids))
+    return _tally(results)
+
+async def rebuild(db: Pool, limit: int = 500, since_iso: Optional[str] = None, until_iso: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pair recent copy trades in bulk (idempotent upsert), inline.
+    The API runs this as a chunked background job (services/rebuild_jobs).
+    """
+    from ..db.sql import select_recent_copy_ids
+    ids = await select_recent_copy_ids(db, limit=limit, since_iso=since_iso, until_iso=until_iso)
+    return await pair_many(db, ids)
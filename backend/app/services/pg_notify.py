@@ -0,0 +1,90 @@
+# app/services/pg_notify.py
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+log = logging.getLogger("pg_notify")
+
+# Channels emitted by public.tg_oculus_notify() (migration 0004)
+CH_TRADES_LEDGER = "oculus_trades_ledger"
+CH_SOURCE_TRADES = "oculus_source_trades"
+CH_TRADE_PAIRS = "oculus_trade_pairs"
+
+KEEPALIVE_SEC = 15.0
+MAX_RECONNECT_SEC = 30.0
+
+Callback = Callable[[str, str], None]  # (channel, payload)
+
+
+class PgNotifyListener:
+    """
+    LISTEN on a dedicated asyncpg connection and fan notifications out to
+    plain callbacks (typically WorkerLoop.wake / an asyncio.Event.set).
+
+    LISTEN needs a session, so the DSN must bypass pgBouncer transaction
+    pooling (direct 5432 / session pooler). The connection is kept alive
+    with a periodic `select 1` and re-established with back-off; after a
+    reconnect every callback fires once so nothing missed stays asleep
+    until the polling sweep.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._handlers: Dict[str, List[Callback]] = {}
+        self.received = 0
+        self.connected = False
+
+    def on(self, channel: str, cb: Callback) -> None:
+        self._handlers.setdefault(channel, []).append(cb)
+
+    def _dispatch(self, conn, pid: int, channel: str, payload: str) -> None:
+        self.received += 1
+        for cb in self._handlers.get(channel, []):
+            try:
+                cb(channel, payload)
+            except Exception as e:
+                log.warning("notify handler for %s raised: %r", channel, e)
+
+    def _fire_all(self, payload: str) -> None:
+        for channel in self._handlers:
+            self._dispatch(None, 0, channel, payload)
+
+    async def _session(self, stop_evt: asyncio.Event) -> None:
+        conn = await asyncpg.connect(self.dsn, statement_cache_size=0)
+        try:
+            for channel in self._handlers:
+                await conn.add_listener(channel, self._dispatch)
+            self.connected = True
+            log.info("[NOTIFY] listening on %s", ", ".join(self._handlers) or "<none>")
+            self._fire_all("reconnect")
+
+            while not stop_evt.is_set():
+                try:
+                    await asyncio.wait_for(stop_evt.wait(), timeout=KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    await conn.execute("select 1")
+        finally:
+            self.connected = False
+            try:
+                await conn.close(timeout=2.0)
+            except Exception:
+                conn.terminate()
+
+    async def run(self, stop_evt: Optional[asyncio.Event] = None) -> None:
+        stop_evt = stop_evt or asyncio.Event()
+        delay = 1.0
+        while not stop_evt.is_set():
+            try:
+                await self._session(stop_evt)
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("[NOTIFY] listener connection lost: %r; retry in %.0fs", e, delay)
+                try:
+                    await asyncio.wait_for(stop_evt.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2.0, MAX_RECONNECT_SEC)
@@ -0,0 +1,251 @@
+# app/services/rebuild_jobs.py
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from asyncpg import Pool
+
+from ..core.config import settings
+from ..db.sql import select_recent_copy_ids
+from . import pairing_store
+
+log = logging.getLogger("rebuild_jobs")
+
+MAX_JOBS = 20  # finished jobs kept for status polling
+
+# job states
+PENDING = "pending"
+RUNNING = "running"
+CANCELLED = "cancelled"
+DONE = "done"
+FAILED = "failed"
+
+OnChunk = Callable[[Sequence[int]], None]
+
+
+class RebuildJob:
+    """
+    Background /v1/pairs/rebuild run.
+
+    The target ids are selected once (same filters as the old inline
+    rebuild), sorted and cut into id-range chunks. Chunks run in order;
+    ids inside a chunk are paired with bounded concurrency. `next_chunk`
+    is the resume point: cancel stops at the next chunk boundary and
+    resume() picks up from the first chunk not yet completed.
+    """
+
+    def __init__(
+        self,
+        db: Pool,
+        *,
+        limit: int,
+        since_iso: Optional[str] = None,
+        until_iso: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        on_chunk: Optional[OnChunk] = None,
+    ):
+        self.id = f"rb_{uuid.uuid4().hex[:12]}"
+        self.db = db
+        self.limit = limit
+        self.since_iso = since_iso
+        self.until_iso = until_iso
+        self.chunk_size = max(1, chunk_size or settings.REBUILD_CHUNK_SIZE)
+        self.concurrency = max(1, concurrency or settings.REBUILD_CONCURRENCY)
+        self.on_chunk = on_chunk
+
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.chunks: List[List[int]] = []
+        self.next_chunk = 0
+        self.total = 0
+        self.scanned = 0
+        self.paired = 0
+        self.awaiting = 0
+        self.errors = 0
+
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._busy_sec = 0.0  # summed over runs, so rows/sec survives resume
+        self._run_started: Optional[float] = None
+
+        self._cancel = False
+        self._task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+        self._version = 0
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+    @property
+    def active(self) -> bool:
+        return self.state in (PENDING, RUNNING)
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._cancel = False
+        self.state = PENDING
+        self.error = None
+        self.finished_at = None
+        self._task = asyncio.create_task(self._run(), name=self.id)
+
+    def cancel(self) -> None:
+        """Stop after the chunk in flight (upserts are idempotent either way)."""
+        if self.active:
+            self._cancel = True
+
+    def resume(self) -> bool:
+        if self.active or self.state == DONE:
+            return False
+        self.start()
+        return True
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Work
+    # ------------------------------------------------------------------
+    async def _select(self) -> None:
+        ids = await select_recent_copy_ids(
+            self.db, limit=self.limit, since_iso=self.since_iso, until_iso=self.until_iso
+        )
+        ids.sort()
+        self.chunks = [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+        self.total = len(ids)
+
+    async def _run(self) -> None:
+        self.state = RUNNING
+        self._run_started = time.perf_counter()
+        await self._notify()
+        try:
+            if not self.chunks and self.next_chunk == 0:
+                await self._select()
+                await self._notify()
+
+            while self.next_chunk < len(self.chunks):
+                if self._cancel:
+                    self.state = CANCELLED
+                    break
+                chunk = self.chunks[self.next_chunk]
+                res = await pairing_store.pair_many(self.db, chunk, self.concurrency)
+                self.scanned += res["scanned"]
+                self.paired += res["paired"]
+                self.awaiting += res["awaiting"]
+                self.errors += res["errors"]
+                self.next_chunk += 1
+                if self.on_chunk is not None:
+                    try:
+                        self.on_chunk(chunk)
+                    except Exception as e:
+                        log.warning("[REBUILD] %s on_chunk raised: %r", self.id, e)
+                await self._notify()
+            else:
+                self.state = DONE
+        except asyncio.CancelledError:
+            self.state = CANCELLED
+            raise
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            log.warning("[REBUILD] %s failed at chunk %d: %r", self.id, self.next_chunk, e)
+        finally:
+            self._busy_sec += time.perf_counter() - (self._run_started or time.perf_counter())
+            self._run_started = None
+            self.finished_at = time.time()
+            log.info(
+                "[REBUILD] %s %s scanned=%d/%d paired=%d awaiting=%d errors=%d",
+                self.id, self.state, self.scanned, self.total, self.paired, self.awaiting, self.errors,
+            )
+            await self._notify()
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        busy = self._busy_sec
+        if self._run_started is not None:
+            busy += time.perf_counter() - self._run_started
+        rate = (self.scanned / busy) if busy > 0 else 0.0
+        remaining = max(self.total - self.scanned, 0)
+        chunk = self.chunks[self.next_chunk] if self.next_chunk < len(self.chunks) else None
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "error": self.error,
+            "limit": self.limit,
+            "since": self.since_iso,
+            "until": self.until_iso,
+            "total": self.total,
+            "scanned": self.scanned,
+            "paired": self.paired,
+            "awaiting": self.awaiting,
+            "errors": self.errors,
+            "chunks_total": len(self.chunks),
+            "chunks_done": self.next_chunk,
+            "next_chunk_ids": [chunk[0], chunk[-1]] if chunk else None,
+            "rows_per_sec": rate,
+            "eta_sec": (remaining / rate) if rate > 0 and self.active else None,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def progress(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a snapshot now and after every change until the job stops."""
+        while True:
+            seen = self._version
+            yield self.snapshot()
+            if not self.active:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._version != seen)
+
+
+# ----------------------------------------------------------------------
+# Registry (per API process)
+# ----------------------------------------------------------------------
+_JOBS: "OrderedDict[str, RebuildJob]" = OrderedDict()
+
+
+def get(job_id: str) -> Optional[RebuildJob]:
+    return _JOBS.get(job_id)
+
+
+def running() -> Optional[RebuildJob]:
+    for job in _JOBS.values():
+        if job.active:
+            return job
+    return None
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    return [job.snapshot() for job in reversed(_JOBS.values())]
+
+
+def submit(db: Pool, **kwargs: Any) -> RebuildJob:
+    job = RebuildJob(db, **kwargs)
+    _JOBS[job.id] = job
+    while len(_JOBS) > MAX_JOBS:
+        oldest = next(iter(_JOBS.values()))
+        if oldest.active:
+            break
+        _JOBS.popitem(last=False)
+    job.start()
+    return job
+
+
+async def shutdown() -> None:
+    for job in list(_JOBS.values()):
+        job.cancel()
+    for job in list(_JOBS.values()):
+        await job.wait()
@@ -0,0 +1,232 @@
+# app/services/source_index.py
+import os
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from asyncpg import Pool
+
+log = logging.getLogger("source_index")
+
+# Full re-warm cadence; catches slot backfills written by other processes
+REWARM_SEC = float(os.getenv("SOURCE_INDEX_REWARM_SEC", "300"))
+# The delta re-reads this far behind the newest created_at seen: created_at
+# is set at transaction start, so a row can commit after newer ones were
+# loaded. Re-reading a loaded row is a no-op.
+DELTA_LAG_SEC = float(os.getenv("SOURCE_INDEX_DELTA_LAG_SEC", "60"))
+
+# Source slot = landed tx slot when known, else the event slot (0 is a placeholder)
+WARM_SOURCES = """
+select
+  st.id                                       as source_id,
+  st.token_mint                               as token_mint,
+  st.side::text                               as side,
+  coalesce(tr.slot, nullif(st.event_slot, 0)) as source_slot,
+  st.created_at                               as created_at
+from source_trades st
+left join trades_transactions tr
+  on tr.tx_signature = st.tx_signature
+"""
+
+DELTA_SOURCES = WARM_SOURCES + """
+where st.created_at > coalesce($1::timestamptz, '-infinity') - make_interval(secs => $2)
+"""
+
+Key = Tuple[str, str]
+
+
+class SourceIndex:
+    """
+    In-process index of source trades per (token_mint, side), kept as
+    parallel slot-sorted arrays so nearest-slot lookup is a bisect instead
+    of an `order by abs(slot - $x)` scan over the mint's whole history.
+
+    - warm(db):    full load from source_trades; each key's arrays are
+                   built once (sorted per key) in a worker thread and
+                   swapped in, so the event loop is not held
+    - refresh(db): pull rows created since the last load, overlapping it
+                   by SOURCE_INDEX_DELTA_LAG_SEC (full re-warm every
+                   SOURCE_INDEX_REWARM_SEC)
+    - add(...):    incremental hook for writers in this process
+                   (NormalizerCreator, slot backfills)
+    """
+
+    def __init__(self) -> None:
+        self._slots: Dict[Key, List[int]] = {}
+        self._ids: Dict[Key, List[Any]] = {}
+        # sources with no slot yet; only used when a key has nothing slotted
+        self._unslotted: Dict[Key, Any] = {}
+        # source_id -> (key, slot) so a re-add (e.g. slot backfill) moves the entry
+        self._where: Dict[Any, Tuple[Key, Optional[int]]] = {}
+        self._watermark: Any = None
+        self._warmed_at: float = 0.0
+        self._lock = asyncio.Lock()
+        # add() calls made while a warm is building; replayed onto the new arrays
+        self._replay: Optional[List[Tuple[Any, Optional[str], Optional[str], Optional[int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def warmed(self) -> bool:
+        return self._warmed_at > 0.0
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+    def _remove(self, source_id: Any) -> None:
+        prev = self._where.pop(source_id, None)
+        if prev is None:
+            return
+        key, slot = prev
+        if slot is None:
+            if self._unslotted.get(key) == source_id:
+                self._unslotted.pop(key, None)
+            return
+        slots = self._slots.get(key, [])
+        ids = self._ids.get(key, [])
+        i = bisect_left(slots, slot)
+        while i < len(slots) and slots[i] == slot:
+            if ids[i] == source_id:
+                del slots[i]
+                del ids[i]
+                return
+            i += 1
+
+    def add(self, source_id: Any, token_mint: Optional[str], side: Optional[str], slot: Optional[int]) -> None:
+        """Insert or move one source trade. O(log n) search + list insert."""
+        if source_id is None or not token_mint or not side:
+            return
+        if self._replay is not None:
+            self._replay.append((source_id, token_mint, side, slot))
+        key: Key = (token_mint, str(side).upper())
+        if slot is not None and slot <= 0:
+            slot = None
+
+        prev = self._where.get(source_id)
+        if prev is not None and prev == (key, slot):
+            return
+        self._remove(source_id)
+        self._where[source_id] = (key, slot)
+
+        if slot is None:
+            self._unslotted.setdefault(key, source_id)
+            return
+
+        slots = self._slots.setdefault(key, [])
+        ids = self._ids.setdefault(key, [])
+        i = bisect_left(slots, slot)
+        slots.insert(i, slot)
+        ids.insert(i, source_id)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def nearest(
+        self, token_mint: Optional[str], side: Optional[str], slot: Optional[int]
+    ) -> Optional[Tuple[Any, Optional[int]]]:
+        """
+        Return (source_id, source_slot) of the slot-nearest source for the
+        given mint/side, or None. Mirrors FIND_SOURCE_FOR_COPY: unslotted
+        sources sort last and ties go to the lower slot.
+        """
+        if not token_mint or not side:
+            return None
+        key: Key = (token_mint, str(side).upper())
+        slots = self._slots.get(key)
+        if not slots:
+            sid = self._unslotted.get(key)
+            return (sid, None) if sid is not None else None
+
+        ids = self._ids[key]
+        if slot is None:
+            return ids[0], slots[0]
+
+        i = bisect_left(slots, slot)
+        if i == 0:
+            return ids[0], slots[0]
+        if i == len(slots):
+            return ids[-1], slots[-1]
+        if slot - slots[i - 1] <= slots[i] - slot:
+            return ids[i - 1], slots[i - 1]
+        return ids[i], slots[i]
+
+    # ------------------------------------------------------------------
+    # DB sync
+    # ------------------------------------------------------------------
+    def _load(self, rows) -> None:
+        for r in rows:
+            self.add(r["source_id"], r["token_mint"], r["side"], r["source_slot"])
+            ts = r["created_at"]
+            if ts is not None and (self._watermark is None or ts > self._watermark):
+                self._watermark = ts
+
+    @staticmethod
+    def _build(rows) -> Tuple[Dict[Key, List[int]], Dict[Key, List[Any]], Dict[Key, Any], Dict[Any, Tuple[Key, Optional[int]]], Any]:
+        """Index structures for a full load: one sort per key instead of a list insert per row."""
+        where: Dict[Any, Tuple[Key, Optional[int]]] = {}
+        watermark = None
+        for r in rows:
+            sid, mint, side = r["source_id"], r["token_mint"], r["side"]
+            ts = r["created_at"]
+            if ts is not None and (watermark is None or ts > watermark):
+                watermark = ts
+            if sid is None or not mint or not side:
+                continue
+            slot = r["source_slot"]
+            if slot is not None and slot <= 0:
+                slot = None
+            where[sid] = ((mint, str(side).upper()), slot)
+
+        slotted: Dict[Key, List[Tuple[int, Any]]] = {}
+        unslotted: Dict[Key, Any] = {}
+        for sid, (key, slot) in where.items():
+            if slot is None:
+                unslotted.setdefault(key, sid)
+            else:
+                slotted.setdefault(key, []).append((slot, sid))
+
+        slots: Dict[Key, List[int]] = {}
+        ids: Dict[Key, List[Any]] = {}
+        for key, entries in slotted.items():
+            entries.sort(key=lambda e: e[0])
+            slots[key] = [e[0] for e in entries]
+            ids[key] = [e[1] for e in entries]
+        return slots, ids, unslotted, where, watermark
+
+    async def warm(self, db: Pool) -> int:
+        """Full (re)load from source_trades."""
+        async with self._lock:
+            t0 = time.perf_counter()
+            rows = await db.fetch(WARM_SOURCES)
+            self._replay = []
+            try:
+                built = await asyncio.to_thread(self._build, rows)
+            finally:
+                replay, self._replay = self._replay, None
+            self._slots, self._ids, self._unslotted, self._where, self._watermark = built
+            for args in replay:
+                self.add(*args)
+            self._warmed_at = time.monotonic()
+            log.info("[SOURCE_INDEX] warmed %d sources in %.2fs", len(self), time.perf_counter() - t0)
+            return len(rows)
+
+    async def refresh(self, db: Pool) -> int:
+        """
+        Bring the index up to date: full warm on first use or when the
+        re-warm interval has elapsed, otherwise only rows created since
+        the last load.
+        """
+        if not self.warmed or (time.monotonic() - self._warmed_at) >= REWARM_SEC:
+            return await self.warm(db)
+        async with self._lock:
+            # no watermark yet (empty table at warm): everything is new
+            rows = await db.fetch(DELTA_SOURCES, self._watermark, DELTA_LAG_SEC)
+            self._load(rows)
+            return len(rows)
+
+
+# Singleton index for the worker process
+source_index = SourceIndex()
@@ -33,6 +33,24 @@ async def upsert_one(db: Pool, sql: str, params: Tuple[Any, ...]) -> Optional[Re
     return await db.fetchrow(sql, *params)
 
 
+async def upsert_many(db: Pool, sql: str, rows: Iterable[Tuple[Any, ...]]) -> int:
+    """
+    Batched counterpart of upsert_one for INSERT/UPDATE/UPSERT statements.
+
+    - Normalizes every row's params (e.g. dict/list -> JSON string)
+    - Sends all rows through a single pipelined executemany inside one
+      transaction, instead of one round trip per row
+    - Returns the number of rows sent
+    """
+    batch = [_normalize_params(tuple(r)) for r in rows]
+    if not batch:
+        return 0
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            await conn.executemany(sql, batch)
+    return len(batch)
+
+
 async def fetch_all(db: Pool, sql: str, *args) -> List[Record]:
     """
     Run a SELECT and return all rows as a list.
@@ -68,3 +86,27 @@ async def update_heartbeat(db: Pool, worker_name: str, backlog: int) -> None:
         worker_name,
         backlog,
     )
+
+
+async def publish_worker_stats(db: Pool, process_name: str, stats: List[Dict[str, Any]]) -> None:
+    """
+    Store a worker process's scheduler counters in system_worker_heartbeats.
+
+    - process_name: one row per worker process (e.g. 'worker_manager:<id>')
+    - stats: WorkerScheduler.stats(), kept as jsonb for /v1/system/status
+    """
+    await db.execute(
+        """
+        insert into system_worker_heartbeats (worker_name, last_ok_at, backlog_count, stats)
+        values ($1, now(), $2, $3::jsonb)
+        on conflict (worker_name)
+        do update set
+          last_ok_at    = excluded.last_ok_at,
+          backlog_count = excluded.backlog_count,
+          stats         = excluded.stats,
+          updated_at    = now()
+        """,
+        process_name,
+        sum(int(s.get("last_items") or 0) for s in stats),
+        json.dumps(stats),
+    )
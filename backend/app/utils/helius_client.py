@@ -1,23 +1,39 @@
 import os
-import time
 import random
+import asyncio
 from typing import Any, Dict, Optional, List
 import httpx
 
+from .tx_cache import get_cache
+
 # Environment configuration
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY", "")
 HELIUS_REST_BASE = os.getenv("HELIUS_REST_BASE", "")
 HELIUS_RPC_URL = os.getenv("HELIUS_RPC_URL", "")
 DEFAULT_TIMEOUT = 20.0
 
+# Requests in flight per endpoint (shared by every worker using the client)
+TX_CONCURRENCY = int(os.getenv("HELIUS_TX_CONCURRENCY", "8"))
+ADDRESS_CONCURRENCY = int(os.getenv("HELIUS_ADDRESS_CONCURRENCY", "4"))
+BLOCK_CONCURRENCY = int(os.getenv("HELIUS_BLOCK_CONCURRENCY", "4"))
+
+# tx_cache kinds (signatures and finalized blocks are immutable)
+CACHE_TX = "helius_tx"
+CACHE_BLOCK = "helius_block"
+
 
 class HeliusClient:
     """
-    Minimal, retrying Helius REST client:
+    Minimal, retrying async Helius REST client:
       - by signature
       - by address (creator) window
       - blocks/slot neighborhood
 
+    One pooled httpx.AsyncClient; each endpoint has its own concurrency
+    limit, and back-off sleeps yield to the event loop instead of blocking
+    the co-scheduled workers. Transactions and blocks are read through the
+    persistent tx cache; address windows seed it with the txs they return.
+
     This version prefers HELIUS_REST_BASE (https://api.helius.xyz) for /v0/* endpoints
     and falls back to HELIUS_RPC_URL if HELIUS_REST_BASE is not configured.
     """
@@ -40,27 +56,59 @@ class HeliusClient:
         base = base.split("?", 1)[0].rstrip("/")
         self.base_url = base
 
-        self._client = httpx.Client(timeout=DEFAULT_TIMEOUT)
+        limit = TX_CONCURRENCY + ADDRESS_CONCURRENCY + BLOCK_CONCURRENCY
+        self._client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+        )
+        self._tx_sem = asyncio.Semaphore(TX_CONCURRENCY)
+        self._address_sem = asyncio.Semaphore(ADDRESS_CONCURRENCY)
+        self._block_sem = asyncio.Semaphore(BLOCK_CONCURRENCY)
 
-    def _sleep_backoff(self, attempt: int):
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        cache = get_cache()
+        local = cache.stats() if cache is not None else {}
+        return {"cache": {k: local.get(k) for k in (CACHE_TX, CACHE_BLOCK)}}
+
+    async def _sleep_backoff(self, attempt: int):
         """
         Simple exponential backoff with jitter.
         """
-        time.sleep(min(2 ** attempt + random.random(), 8.0))
+        await asyncio.sleep(min(2 ** attempt + random.random(), 8.0))
+
+    async def _get(self, sem: asyncio.Semaphore, url: str) -> httpx.Response:
+        # hold the slot for the request only, not for the back-off
+        async with sem:
+            return await self._client.get(url)
 
-    def tx_by_signature(self, signature: str) -> Optional[Dict[str, Any]]:
+    async def tx_by_signature(self, signature: str) -> Optional[Dict[str, Any]]:
         """
-        Resolve a single transaction by signature via Helius v0/transactions.
+        Resolve a single transaction by signature via Helius v0/transactions
+        (tx cache first).
 
         Returns:
             - dict for the transaction (if found)
             - None on failure or not found
         """
+        cache = get_cache()
+        if cache is not None:
+            hit = await cache.get(CACHE_TX, signature)
+            if hit is not None:
+                return hit
+        tx = await self._fetch_tx(signature)
+        if cache is not None and tx is not None:
+            await cache.put(CACHE_TX, signature, tx)
+        return tx
+
+    async def _fetch_tx(self, signature: str) -> Optional[Dict[str, Any]]:
         url = f"{self.base_url}/v0/transactions/?tx={signature}&api-key={self.api_key}"
 
         for attempt in range(4):
             try:
-                r = self._client.get(url)
+                r = await self._get(self._tx_sem, url)
                 if r.status_code == 200:
                     data = r.json()
                     # Helius may return a list or a single dict
@@ -70,11 +118,11 @@ class HeliusClient:
                         return data
             except Exception:
                 pass
-            self._sleep_backoff(attempt)
+            await self._sleep_backoff(attempt)
 
         return None
 
-    def address_txs_window(
+    async def address_txs_window(
         self,
         address: str,
         limit: int = 25,
@@ -105,14 +153,16 @@ class HeliusClient:
 
             for attempt in range(4):
                 try:
-                    r = self._client.get(url)
+                    r = await self._get(self._address_sem, url)
                     if r.status_code == 200:
                         data = r.json()
                         # Helius typically returns a list here
                         if isinstance(data, list):
+                            await self._seed_txs(data)
                             return data
                         # If it's a dict for some reason, wrap it
                         if isinstance(data, dict):
+                            await self._seed_txs([data])
                             return [data]
                         return []
                     else:
@@ -123,28 +173,90 @@ class HeliusClient:
                                 )
                 except Exception as e:
                     print(f"[HELIUS] address_txs_window error on attempt {attempt}: {e}")
-                self._sleep_backoff(attempt)
+                await self._sleep_backoff(attempt)
 
             return []
 
 
-    def block_by_slot(self, slot: int) -> Optional[Dict[str, Any]]:
+    async def address_txs_page(
+        self,
+        address: str,
+        limit: int = 100,
+        before: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        One page of an address's history, newest first, via
+        /v0/addresses/{address}/transactions with signature cursors:
+          - before: only txs older than this signature
+          - until:  stop at this signature (exclusive)
+
+        Returns:
+            - list of txs (empty at the end of history)
+            - None on failure, so callers never advance a cursor past a gap
+        """
+        qs = f"limit={limit}"
+        if before:
+            qs += f"&before={before}"
+        if until:
+            qs += f"&until={until}"
+        url = f"{self.base_url}/v0/addresses/{address}/transactions?{qs}&api-key={self.api_key}"
+
+        for attempt in range(4):
+            try:
+                r = await self._get(self._address_sem, url)
+                if r.status_code == 200:
+                    data = r.json()
+                    if isinstance(data, dict):
+                        data = [data]
+                    if isinstance(data, list):
+                        await self._seed_txs(data)
+                        return data
+                    return []
+                print(f"[HELIUS] address_txs_page HTTP {r.status_code} for address={address}")
+            except Exception as e:
+                print(f"[HELIUS] address_txs_page error on attempt {attempt}: {e}")
+            await self._sleep_backoff(attempt)
+
+        return None
+
+    @staticmethod
+    async def _seed_txs(txs: List[Dict[str, Any]]) -> None:
+        # same shape as v0/transactions: later tx_by_signature calls are free
+        cache = get_cache()
+        if cache is not None:
+            await cache.put_many(CACHE_TX, {
+                tx["signature"]: tx for tx in txs if isinstance(tx, dict) and tx.get("signature")
+            })
+
+    async def block_by_slot(self, slot: int) -> Optional[Dict[str, Any]]:
         """
-        Fetch a block by slot using /v0/blocks/{slot}.
+        Fetch a block by slot using /v0/blocks/{slot} (tx cache first).
 
         Returns:
             - dict with block data on success
             - None on failure
         """
+        cache = get_cache()
+        if cache is not None:
+            hit = await cache.get(CACHE_BLOCK, slot)
+            if hit is not None:
+                return hit
+        block = await self._fetch_block(slot)
+        if cache is not None and block is not None:
+            await cache.put(CACHE_BLOCK, slot, block)
+        return block
+
+    async def _fetch_block(self, slot: int) -> Optional[Dict[str, Any]]:
         url = f"{self.base_url}/v0/blocks/{slot}?api-key={self.api_key}"
 
         for attempt in range(4):
             try:
-                r = self._client.get(url)
+                r = await self._get(self._block_sem, url)
                 if r.status_code == 200:
                     return r.json()
             except Exception:
                 pass
-            self._sleep_backoff(attempt)
+            await self._sleep_backoff(attempt)
 
         return None
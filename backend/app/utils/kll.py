@@ -0,0 +1,93 @@
+# backend/app/utils/kll.py
+"""
+KLL streaming quantile sketch (Karnin, Lang, Liberty 2016).
+
+- update(x): O(1) amortised; memory stays O(k) whatever the stream length
+- merge(other): sketches built separately (per process, per scope) combine
+  into one with the same error guarantee
+- quantile(q): nearest-rank value, like Postgres percentile_disc; exact
+  until the first compaction (about k items)
+
+Items live in levels ("compactors"); an item at level h stands for 2**h
+stream items. A full level is sorted and every other item (random offset)
+is promoted one level up, which keeps the rank error unbiased.
+"""
+
+import math
+import random
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+
+class KllSketch:
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels: List[List[float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._rng = random.Random(seed)
+        self._sorted: Optional[Tuple[List[float], List[int]]] = None  # (values, cumulative weights) for quantile()
+        self._grow()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self) -> None:
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        for h in range(len(self.levels)):
+            level = self.levels[h]
+            if len(level) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.levels):
+                self._grow()
+            level.sort()
+            keep = [level.pop()] if len(level) % 2 else []
+            self.levels[h + 1].extend(level[self._rng.random() < 0.5::2])
+            self.levels[h] = keep
+            self._size = sum(len(lv) for lv in self.levels)
+            if self._size < self._max_size:
+                break
+
+    def update(self, x: float) -> None:
+        self.levels[0].append(float(x))
+        self.n += 1
+        self._size += 1
+        self._sorted = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: "KllSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.n += other.n
+        self._size = sum(len(lv) for lv in self.levels)
+        self._sorted = None
+        while self._size >= self._max_size:
+            self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Smallest value whose (weighted) cumulative share reaches q; None if empty."""
+        if not self.n:
+            return None
+        if self._sorted is None:
+            items = sorted((v, 1 << h) for h, level in enumerate(self.levels) for v in level)
+            values, cum, acc = [], [], 0
+            for v, w in items:
+                acc += w
+                values.append(v)
+                cum.append(acc)
+            self._sorted = (values, cum)
+        values, cum = self._sorted
+        i = bisect_left(cum, q * cum[-1])
+        return values[min(i, len(values) - 1)]
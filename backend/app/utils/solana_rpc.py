@@ -0,0 +1,318 @@
+# backend/app/utils/solana_rpc.py
+"""
+Shared async Solana JSON-RPC fetcher (Helius) for the backfill workers.
+
+- one long-lived httpx.AsyncClient per process: pooled keep-alive
+  connections, HTTP/2 when the `h2` package is installed
+- bounded concurrency (HELIUS_RPC_CONCURRENCY requests in flight)
+- token-bucket rate limit (HELIUS_RPC_RPS sustained, HELIUS_RPC_BURST burst)
+  so throughput tracks the Helius plan instead of single-request latency
+- retries on 429 / 5xx / transport errors with exponential back-off and
+  full jitter, honouring Retry-After
+- found transactions go through the persistent tx cache (utils/tx_cache):
+  a signature already seen costs no RPC credit
+- batch mode (HELIUS_RPC_BATCH_SIZE): N getTransaction calls per POST as a
+  JSON-RPC array, demultiplexed by id; only the entries that failed
+  individually are re-queued into the next round
+"""
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.utils.tx_cache import get_cache
+
+log = logging.getLogger("solana_rpc")
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+CACHE_KIND = "rpc_tx"
+TX_CONFIG = {"encoding": "json", "maxSupportedTransactionVersion": 0}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# JSON-RPC error codes worth retrying: provider rate limiting, node busy /
+# behind, internal error
+RETRY_RPC_CODES = {-32429, -32005, -32004, -32603}
+BACKOFF_BASE_SEC = 0.25
+BACKOFF_MAX_SEC = 8.0
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/sec, at most `burst` banked."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(burst or rate, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # a batch costs one token per entry; one larger than the bucket is
+        # paid in capacity-sized pieces, so it still costs its full size
+        remaining = max(tokens, 1.0)
+        async with self._lock:
+            while remaining > 0:
+                need = min(remaining, self.capacity)
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= need:
+                    self._tokens -= need
+                    remaining -= need
+                    continue
+                await asyncio.sleep((need - self._tokens) / self.rate)
+
+
+class RpcError(Exception):
+    """Non-retryable JSON-RPC error response."""
+
+
+class SolanaRpcFetcher:
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        rps: Optional[float] = None,
+        burst: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        timeout: float = 20.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = url if url is not None else settings.HELIUS_RPC_URL
+        self.concurrency = max(1, concurrency or settings.HELIUS_RPC_CONCURRENCY)
+        self.max_retries = settings.HELIUS_RPC_MAX_RETRIES if max_retries is None else max_retries
+        self.batch_size = settings.HELIUS_RPC_BATCH_SIZE if batch_size is None else batch_size
+        self.bucket = TokenBucket(
+            rps or settings.HELIUS_RPC_RPS,
+            burst or settings.HELIUS_RPC_BURST or None,
+        )
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._client = client or httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self._id = 0
+
+        # counters
+        self.requests = 0   # HTTP POSTs
+        self.calls = 0      # JSON-RPC calls (batch entries count individually)
+        self.retries = 0
+        self.failures = 0
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _next_id(self) -> int:
+        self._id += 1
+        return self._id
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SEC)
+            except ValueError:
+                pass
+        # full jitter: uniform(0, base * 2^attempt)
+        return random.uniform(0, min(BACKOFF_BASE_SEC * (2 ** attempt), BACKOFF_MAX_SEC))
+
+    async def _post(self, payload: Any, cost: int = 1) -> Any:
+        """
+        POST one JSON-RPC request (dict) or batch (list) and return the
+        decoded body. Retries the whole POST on 429 / 5xx / transport errors,
+        and a single request on a rate-limit error response.
+        """
+        if not self.url:
+            raise RuntimeError("HELIUS_RPC_URL is not set")
+        label = payload.get("method") if isinstance(payload, dict) else f"batch[{cost}]"
+
+        attempt = 0
+        while True:
+            retry_after: Optional[str] = None
+            async with self._sem:
+                await self.bucket.acquire(cost)
+                self.requests += 1
+                self.calls += cost
+                try:
+                    resp = await self._client.post(self.url, json=payload)
+                except httpx.TransportError as e:
+                    log.debug("%s transport error: %r", label, e)
+                else:
+                    if resp.status_code in RETRY_STATUS:
+                        retry_after = resp.headers.get("retry-after")
+                    else:
+                        resp.raise_for_status()
+                        data = resp.json()
+                        err = data.get("error") if isinstance(data, dict) else None
+                        if err is None or err.get("code") not in RETRY_RPC_CODES:
+                            return data
+
+            if attempt >= self.max_retries:
+                self.failures += 1
+                raise RpcError(f"{label}: gave up after {attempt + 1} attempts")
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    async def call(self, method: str, params: List[Any]) -> Any:
+        """
+        One JSON-RPC call with rate limiting, bounded concurrency and retries.
+        Returns `result` (may be None, e.g. unknown signature).
+        """
+        payload = {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params}
+        data = await self._post(payload)
+        err = data.get("error")
+        if err is not None:
+            raise RpcError(f"{method}: {err}")
+        return data.get("result")
+
+    async def _get_transaction(self, sig: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.call("getTransaction", [sig, TX_CONFIG])
+        except Exception as e:
+            log.warning("getTransaction failed for sig=%s: %r", sig, e)
+            return None
+
+    async def get_transaction(self, sig: str) -> Optional[Dict[str, Any]]:
+        """getTransaction (cache first); None if not found or it ultimately failed."""
+        return (await self.get_transactions([sig])).get(sig)
+
+    async def _batch(self, sigs: List[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        One batched POST of getTransaction calls.
+        Returns (answered sig -> result, sigs to re-queue).
+        """
+        ids = {}
+        payload = []
+        for sig in sigs:
+            rid = self._next_id()
+            ids[rid] = sig
+            payload.append({"jsonrpc": "2.0", "id": rid, "method": "getTransaction", "params": [sig, TX_CONFIG]})
+
+        try:
+            data = await self._post(payload, cost=len(payload))
+        except Exception as e:
+            log.warning("getTransaction batch of %d failed: %r", len(sigs), e)
+            return {}, list(sigs)
+        if not isinstance(data, list):
+            # whole batch rejected (e.g. batch too large / not supported)
+            log.warning("getTransaction batch of %d rejected: %s", len(sigs), data)
+            return {}, list(sigs)
+
+        done: Dict[str, Any] = {}
+        for item in data:
+            rid = item.get("id") if isinstance(item, dict) else None
+            sig = ids.get(rid)
+            if sig is None:
+                continue
+            err = item.get("error")
+            if err is not None and err.get("code") in RETRY_RPC_CODES:
+                continue  # retryable: stays in `ids`
+            del ids[rid]
+            if err is None:
+                done[sig] = item.get("result")  # None = unknown signature (final)
+            else:
+                log.warning("getTransaction failed for sig=%s: %s", sig, err)
+                done[sig] = None
+        # retryable errors plus entries the server dropped from the response
+        return done, list(ids.values())
+
+    async def get_transactions(
+        self,
+        sigs: Iterable[str],
+        batch_size: Optional[int] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch many signatures concurrently (bounded by the semaphore / bucket);
+        signatures already in the tx cache are served from it. With batch_size > 1 (default HELIUS_RPC_BATCH_SIZE) they go out as
+        JSON-RPC batches; signatures that fail individually are re-queued
+        into later rounds, up to max_retries, then reported as None.
+        """
+        uniq = list(dict.fromkeys(s for s in sigs if s))
+        cache = get_cache()
+        cached = await cache.get_many(CACHE_KIND, uniq) if cache is not None else {}
+        todo = [s for s in uniq if s not in cached]
+
+        fetched = await self._fetch_transactions(todo, batch_size) if todo else {}
+        if cache is not None:
+            await cache.put_many(CACHE_KIND, fetched)
+        return {s: cached[s] if s in cached else fetched.get(s) for s in uniq}
+
+    async def _fetch_transactions(
+        self,
+        uniq: List[str],
+        batch_size: Optional[int],
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        size = self.batch_size if batch_size is None else batch_size
+        if size <= 1:
+            results = await asyncio.gather(*(self._get_transaction(s) for s in uniq))
+            return dict(zip(uniq, results))
+
+        out: Dict[str, Optional[Dict[str, Any]]] = {}
+        pending = uniq
+        attempt = 0
+        while pending:
+            rounds = await asyncio.gather(
+                *(self._batch(pending[i:i + size]) for i in range(0, len(pending), size))
+            )
+            pending = []
+            for done, failed in rounds:
+                out.update(done)
+                pending.extend(failed)
+            if not pending:
+                break
+            if attempt >= self.max_retries:
+                self.failures += len(pending)
+                log.warning("getTransaction gave up on %d signatures", len(pending))
+                break
+            self.retries += len(pending)
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+        return {s: out.get(s) for s in uniq}
+
+    def stats(self) -> Dict[str, Any]:
+        cache = get_cache()
+        return {
+            "http2": HTTP2,
+            "concurrency": self.concurrency,
+            "rps": self.bucket.rate,
+            "batch_size": self.batch_size,
+            "requests": self.requests,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "cache": cache.stats().get(CACHE_KIND) if cache is not None else None,
+        }
+
+
+_fetcher: Optional[SolanaRpcFetcher] = None
+
+
+def get_fetcher() -> SolanaRpcFetcher:
+    """Process-wide fetcher (shared pool / rate limit across workers)."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = SolanaRpcFetcher()
+    return _fetcher
+
+
+async def close_fetcher() -> None:
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
@@ -0,0 +1,297 @@
+# backend/app/utils/tx_cache.py
+"""
+Persistent cache for immutable chain data (transactions by signature,
+blocks by slot), shared by every process on the host through one SQLite
+file.
+
+- entries keyed by (kind, key): "rpc_tx" (getTransaction JSON),
+  "helius_tx" (Helius /v0/transactions), "helius_block" (/v0/blocks)
+- only found objects are stored; a miss is never cached, so a not-yet-
+  visible signature is retried on the next pass
+- bodies are zlib-compressed JSON; when the file's payload exceeds
+  TX_CACHE_MAX_MB the least recently read entries are evicted down to
+  90% of the limit
+- hit / miss / put / eviction counters per kind, kept per process and
+  periodically folded into the file so /v1/system/metrics can report
+  them across workers
+- the public methods are coroutines: every SQLite call runs on one
+  dedicated thread, so a busy file (timeout=5s) never stalls the event
+  loop; read times for eviction are buffered and written in bulk every
+  STATS_FLUSH_SEC or TOUCH_FLUSH_ROWS hits instead of on every hit
+"""
+import os
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+log = logging.getLogger("tx_cache")
+
+STATS_FLUSH_SEC = 10.0
+TOUCH_FLUSH_ROWS = 1000
+
+SCHEMA = """
+create table if not exists entries (
+    kind      text    not null,
+    key       text    not null,
+    body      blob    not null,
+    size      integer not null,
+    accessed  real    not null,
+    primary key (kind, key)
+);
+create index if not exists entries_accessed on entries (accessed);
+create table if not exists counters (
+    kind       text primary key,
+    hits       integer not null default 0,
+    misses     integer not null default 0,
+    puts       integer not null default 0,
+    evictions  integer not null default 0
+);
+"""
+
+_COUNTERS = ("hits", "misses", "puts", "evictions")
+
+
+class TxCache:
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(SCHEMA)
+        self._bytes = self._conn.execute("select coalesce(sum(size), 0) from entries").fetchone()[0]
+
+        # per-process counters; _pending holds the part not yet flushed to the file
+        self._local: Dict[str, Dict[str, int]] = {}
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._flushed_at = time.monotonic()
+        # counters are bumped on the cache thread and read from the loop
+        self._counter_lock = threading.Lock()
+        # (kind, key) -> last read time, not yet written to entries.accessed
+        self._touched: Dict[Tuple[str, str], float] = {}
+
+        # the connection is only ever used from this thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tx_cache")
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def close(self) -> None:
+        self._executor.submit(self._close).result()
+        self._executor.shutdown()
+
+    def _close(self) -> None:
+        self.flush_stats()
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------
+    def _count(self, kind: str, name: str, n: int = 1) -> None:
+        with self._counter_lock:
+            for m in (self._local, self._pending):
+                c = m.get(kind)
+                if c is None:
+                    c = m[kind] = dict.fromkeys(_COUNTERS, 0)
+                c[name] += n
+        if time.monotonic() - self._flushed_at >= STATS_FLUSH_SEC:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        self._flushed_at = time.monotonic()
+        self._flush_touched()
+        if not self._pending:
+            return
+        with self._counter_lock:
+            pending, self._pending = self._pending, {}
+        try:
+            self._conn.executemany(
+                """
+                insert into counters (kind, hits, misses, puts, evictions)
+                values (?, ?, ?, ?, ?)
+                on conflict (kind) do update
+                set hits = hits + excluded.hits,
+                    misses = misses + excluded.misses,
+                    puts = puts + excluded.puts,
+                    evictions = evictions + excluded.evictions
+                """,
+                [(k, c["hits"], c["misses"], c["puts"], c["evictions"]) for k, c in pending.items()],
+            )
+        except sqlite3.Error as e:
+            log.warning("tx_cache stats flush failed: %r", e)
+
+    def _flush_touched(self) -> None:
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        try:
+            self._conn.executemany(
+                "update entries set accessed = max(accessed, ?) where kind = ? and key = ?",
+                [(t, kind, key) for (kind, key), t in touched.items()],
+            )
+        except sqlite3.Error as e:
+            log.warning("tx_cache access-time flush failed: %r", e)
+
+    # ------------------------------------------------------------------
+    # Get / put
+    # ------------------------------------------------------------------
+    async def get(self, kind: str, key: Any) -> Optional[Any]:
+        return (await self.get_many(kind, [key])).get(str(key))
+
+    async def get_many(self, kind: str, keys: Iterable[Any]) -> Dict[str, Any]:
+        """Cached values for the keys present (str(key) -> value)."""
+        wanted = list(dict.fromkeys(str(k) for k in keys))
+        if not wanted:
+            return {}
+        return await self._run(self._get_many, kind, wanted)
+
+    def _get_many(self, kind: str, wanted: List[str]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        try:
+            # stay well under SQLite's bound-parameter limit
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"select key, body from entries where kind = ? and key in ({marks})",
+                    (kind, *chunk),
+                ).fetchall()
+                for key, body in rows:
+                    out[key] = json.loads(zlib.decompress(body))
+            if out:
+                now = time.time()
+                for k in out:
+                    self._touched[(kind, k)] = now
+                if len(self._touched) >= TOUCH_FLUSH_ROWS:
+                    self._flush_touched()
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            log.warning("tx_cache read failed (%s): %r", kind, e)
+        self._count(kind, "hits", len(out))
+        self._count(kind, "misses", len(wanted) - len(out))
+        return out
+
+    async def put(self, kind: str, key: Any, value: Any) -> None:
+        await self.put_many(kind, {key: value})
+
+    async def put_many(self, kind: str, items: Dict[Any, Any]) -> None:
+        """Store found values; None values are skipped (never cache a miss)."""
+        values = [(key, value) for key, value in items.items() if value is not None]
+        if values:
+            await self._run(self._put_many, kind, values)
+
+    def _put_many(self, kind: str, values: List[Tuple[Any, Any]]) -> None:
+        now = time.time()
+        rows = []
+        for key, value in values:
+            body = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 1)
+            rows.append((kind, str(key), body, len(body), now))
+        try:
+            self._conn.executemany(
+                "insert or replace into entries (kind, key, body, size, accessed) values (?, ?, ?, ?, ?)",
+                rows,
+            )
+        except sqlite3.Error as e:
+            log.warning("tx_cache write failed (%s): %r", kind, e)
+            return
+        self._count(kind, "puts", len(rows))
+        self._bytes += sum(r[3] for r in rows)
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        # eviction orders by read time: write the buffered ones first
+        self._flush_touched()
+        # other processes write the same file: re-read the real total first
+        self._bytes = self._conn.execute("select coalesce(sum(size), 0) from entries").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if self._bytes <= target:
+            return
+        try:
+            evicted: Dict[str, int] = {}
+            freed = 0
+            cur = self._conn.execute("select kind, key, size from entries order by accessed")
+            doomed = []
+            for kind, key, size in cur:
+                doomed.append((kind, key))
+                evicted[kind] = evicted.get(kind, 0) + 1
+                freed += size
+                if self._bytes - freed <= target:
+                    break
+            cur.close()
+            self._conn.executemany("delete from entries where kind = ? and key = ?", doomed)
+            self._bytes -= freed
+            for kind, n in evicted.items():
+                self._count(kind, "evictions", n)
+            log.info("tx_cache evicted %d entries (%d bytes)", len(doomed), freed)
+        except sqlite3.Error as e:
+            log.warning("tx_cache eviction failed: %r", e)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _with_rate(c: Dict[str, int]) -> Dict[str, Any]:
+        looked = c["hits"] + c["misses"]
+        return {**c, "hit_rate": (c["hits"] / looked) if looked else 0.0}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of this process."""
+        with self._counter_lock:
+            return {kind: self._with_rate(dict(c)) for kind, c in self._local.items()}
+
+    async def disk_stats(self) -> Dict[str, Any]:
+        """Size of the file's payload and counters flushed by all processes."""
+        return await self._run(self._disk_stats)
+
+    def _disk_stats(self) -> Dict[str, Any]:
+        self.flush_stats()
+        try:
+            entries, size = self._conn.execute(
+                "select count(*), coalesce(sum(size), 0) from entries"
+            ).fetchone()
+            rows = self._conn.execute(
+                "select kind, hits, misses, puts, evictions from counters"
+            ).fetchall()
+        except sqlite3.Error as e:
+            return {"error": repr(e)}
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "kinds": {r[0]: self._with_rate(dict(zip(_COUNTERS, r[1:]))) for r in rows},
+        }
+
+
+_cache: Optional[TxCache] = None
+_unusable = False
+
+
+def get_cache() -> Optional[TxCache]:
+    """Process-wide cache, or None when TX_CACHE_ENABLED is off / unusable."""
+    global _cache, _unusable
+    if _cache is None and settings.TX_CACHE_ENABLED and not _unusable:
+        try:
+            _cache = TxCache(settings.TX_CACHE_PATH, int(settings.TX_CACHE_MAX_MB * 1024 * 1024))
+        except (OSError, sqlite3.Error) as e:
+            log.warning("tx_cache disabled: cannot open %s: %r", settings.TX_CACHE_PATH, e)
+            _unusable = True
+    return _cache
+
+
+def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
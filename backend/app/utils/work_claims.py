@@ -0,0 +1,65 @@
+# backend/app/utils/work_claims.py
+"""
+Work claiming shared by the pipeline workers, so N worker processes (or N
+loops of one process) split the backlog instead of racing for the same rows.
+
+- short stages lock their batch with `for no key update ... skip locked`
+  and write inside the same transaction (no helper needed beyond SHARD)
+- network-bound stages lease each item in work_leases (migration 0009):
+  the slot backfills and the creator-intel job runner in their selecting
+  statement (skip locked candidates + insert into work_leases),
+  normalizer_creator per creator via claim();
+  a lease is released once the item is written and left to expire on
+  failure (which doubles as a retry delay)
+- optional hash sharding: WORKER_SHARD_COUNT / WORKER_SHARD_INDEX restrict
+  a process to keys with oculus_shard(key, count) = index
+"""
+
+import os
+import socket
+from typing import Iterable, Set
+
+from asyncpg import Pool
+
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_SEC = float(os.getenv("WORK_LEASE_SEC", "120"))
+SHARD_COUNT = max(1, int(os.getenv("WORKER_SHARD_COUNT", "1")))
+SHARD_INDEX = int(os.getenv("WORKER_SHARD_INDEX", "0")) % SHARD_COUNT
+
+# (count, index) as passed to the workers' `oculus_shard(key, $n) = $m` filters
+SHARD = (SHARD_COUNT, SHARD_INDEX)
+
+# Only keys nobody holds (or whose lease has expired) are taken; a
+# conflicting live lease yields no row, so concurrent claimers get
+# disjoint sets.
+CLAIM_LEASES = """
+insert into work_leases (stage, item_key, owner, expires_at)
+select $1, k, $2, now() + make_interval(secs => $4)
+from (select distinct k from unnest($3::text[]) as k where k is not null) keys
+on conflict (stage, item_key) do update
+set owner = excluded.owner,
+    expires_at = excluded.expires_at
+where work_leases.expires_at <= now()
+returning item_key
+"""
+
+RELEASE_LEASES = """
+delete from work_leases
+where stage = $1 and owner = $2 and item_key = any($3::text[])
+"""
+
+
+async def claim(db: Pool, stage: str, keys: Iterable[str], ttl: float = LEASE_SEC) -> Set[str]:
+    """Lease as many of `keys` as are free; returns the ones now held."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    rows = await db.fetch(CLAIM_LEASES, stage, WORKER_ID, keys, float(ttl))
+    return {r["item_key"] for r in rows}
+
+
+async def release(db: Pool, stage: str, keys: Iterable[str]) -> None:
+    """Drop this process's leases on `keys` (items that are done)."""
+    keys = list(keys)
+    if keys:
+        await db.execute(RELEASE_LEASES, stage, WORKER_ID, keys)
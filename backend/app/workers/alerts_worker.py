@@ -57,12 +57,14 @@ class AlertsWorker:
         self.batch = settings.ALERTS_BATCH_SIZE
 
     # ------------------------------------------------------------------
-    async def run_once(self):
+    async def run_once(self) -> int:
         """
         Run one alert batch:
         1. Fetch candidates
         2. Insert alerts
         3. Update heartbeat
+
+        Returns the number of candidates handled (0 on error).
         """
         try:
             async with self.db_pool.acquire() as conn:
@@ -74,13 +76,15 @@ class AlertsWorker:
 
 
             if backlog == 0:
-                return
+                return 0
 
             for row in rows:
                 await self._insert_alert(row)
+            return backlog
 
         except Exception as e:
             print(f"[ALERTS] Worker error: {repr(e)}")
+            return 0
 
     # ------------------------------------------------------------------
     async def _insert_alert(self, row: Dict[str, Any]):
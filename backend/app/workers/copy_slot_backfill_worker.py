@@ -8,9 +8,11 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import asyncpg
-import httpx
 
 from app.core.config import settings
+from app.utils.solana_rpc import SolanaRpcFetcher, get_fetcher, close_fetcher
+from app.utils.tx_cache import close_cache
+from app.utils.work_claims import SHARD, WORKER_ID, LEASE_SEC, release
 
 log = logging.getLogger("copy_slot_backfill")
 
@@ -21,89 +23,114 @@ logging.basicConfig(
 )
 
 DB_DSN = os.getenv("DATABASE_URL")
-HELIUS_RPC_URL: str = os.getenv("HELIUS_RPC_URL", "")
 
 # Tunables
 BATCH_SIZE = int(os.getenv("COPY_BACKFILL_BATCH_SIZE", "50"))
 IDLE_SLEEP_SECONDS = float(os.getenv("COPY_BACKFILL_SLEEP_SECONDS", "10.0"))
 
+# work_leases stage; signatures are leased for the getTransaction round trip
+# (literal in fetch_needing_backfill)
+STAGE = "copy_slot_backfill"
+
 
 async def fetch_needing_backfill(pool: asyncpg.Pool) -> list[asyncpg.Record]:
     """
-    Find copy trades that:
+    Find and lease copy trades that:
       - belong to an ACTIVE copy wallet
       - have a non-null tx_signature
       - do NOT yet have a row in trades_transactions
+      - are in this process's shard and not leased by another worker
+    Candidates are picked with skip locked and leased in the same statement,
+    so concurrent backfill processes never select the same signatures.
     """
     async with pool.acquire() as conn:
         rows = await conn.fetch(
             """
-            select
-              tl.id          as copy_id,
-              tl.tx_signature as tx_signature
-            from trades_ledger tl
-            join copy_wallets cw
-              on cw.id = tl.wallet_owned_id
-            where cw.status = 'ACTIVE'
-              and tl.tx_signature is not null
-              and not exists (
-                select 1
-                from trades_transactions tx
-                where tx.tx_signature = tl.tx_signature
-              )
-            order by tl.id
-            limit $1
+            with candidates as (
+              select
+                tl.id          as copy_id,
+                tl.tx_signature as tx_signature
+              from trades_ledger tl
+              join copy_wallets cw
+                on cw.id = tl.wallet_owned_id
+              where cw.status = 'ACTIVE'
+                and tl.tx_signature is not null
+                and not exists (
+                  select 1
+                  from trades_transactions tx
+                  where tx.tx_signature = tl.tx_signature
+                )
+                and oculus_shard(tl.token_mint, $2) = $3
+                and not exists (
+                  select 1
+                  from work_leases wl
+                  where wl.stage = 'copy_slot_backfill'
+                    and wl.item_key = tl.tx_signature
+                    and wl.expires_at > now()
+                )
+              order by tl.id
+              limit $1
+              for no key update of tl skip locked
+            ),
+            leased as (
+              insert into work_leases (stage, item_key, owner, expires_at)
+              select 'copy_slot_backfill', tx_signature, $4, now() + make_interval(secs => $5)
+              from candidates
+              on conflict (stage, item_key) do update
+              set owner = excluded.owner,
+                  expires_at = excluded.expires_at
+              where work_leases.expires_at <= now()
+              returning item_key
+            )
+            select c.copy_id, c.tx_signature
+            from candidates c
+            join leased l on l.item_key = c.tx_signature
+            order by c.copy_id
             """,
             BATCH_SIZE,
+            *SHARD,
+            WORKER_ID,
+            LEASE_SEC,
         )
     return rows
 
 
-async def fetch_tx_via_rpc(
-    sig: str,
-    client: httpx.AsyncClient,
-) -> Optional[dict]:
-    """
-    Call Helius RPC getTransaction for a given signature.
-    We only need slot + blockTime (and we keep the full JSON as raw).
-    """
-    if not HELIUS_RPC_URL:
-        log.error("[COPY_SLOT] HELIUS_RPC_URL is not set; cannot fetch transactions.")
-        return None
-
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [
-            sig,
-            {
-                "encoding": "json",
-                # This is safe even if you're on v0-only txs
-                "maxSupportedTransactionVersion": 0,
-            },
-        ],
-    }
-
-    try:
-        resp = await client.post(HELIUS_RPC_URL, json=payload, timeout=20.0)
-        resp.raise_for_status()
-    except Exception as e:
-        log.warning("[COPY_SLOT] RPC HTTP error for sig=%s: %r", sig, e)
-        return None
-
-    data = resp.json()
-    result = data.get("result")
-    if not result:
-        log.warning("[COPY_SLOT] getTransaction returned no result for sig=%s raw=%s", sig, data)
-        return None
-
-    return result
-
-
-async def process_batch(pool: asyncpg.Pool) -> int:
+UPSERT_TX = """
+insert into trades_transactions (
+    tx_signature,
+    slot,
+    block_time,
+    priority_fee_lamports,
+    cu_used,
+    tip_lamports,
+    raw
+)
+values ($1, $2, $3, $4, $5, $6, $7)
+on conflict (tx_signature) do update
+set slot                   = excluded.slot,
+    block_time             = excluded.block_time,
+    priority_fee_lamports  = coalesce(
+        excluded.priority_fee_lamports,
+        trades_transactions.priority_fee_lamports
+    ),
+    cu_used                = coalesce(
+        excluded.cu_used,
+        trades_transactions.cu_used
+    ),
+    tip_lamports           = coalesce(
+        excluded.tip_lamports,
+        trades_transactions.tip_lamports
+    ),
+    raw                    = excluded.raw
+"""
+
+
+async def process_batch(pool: asyncpg.Pool, fetcher: Optional[SolanaRpcFetcher] = None) -> int:
     """
     Process one batch of copy trades that need chain enrichment.
+    All getTransaction calls go out concurrently through the shared
+    fetcher (rate-limited to the Helius plan); the results are written
+    in one transaction.
     Returns number of rows scanned in this batch.
     """
     rows = await fetch_needing_backfill(pool)
@@ -111,89 +138,54 @@ async def process_batch(pool: asyncpg.Pool) -> int:
         log.info("[COPY_SLOT] No more copy trades needing backfill.")
         return 0
 
-    async with httpx.AsyncClient() as client:
-        enriched = 0
-
-        for row in rows:
-            copy_id: int = row["copy_id"]
-            sig: str = row["tx_signature"]
-
-            if not sig:
-                log.info("[COPY_SLOT] Skip copy_id=%s: tx_signature is NULL.", copy_id)
-                continue
-
-            tx = await fetch_tx_via_rpc(sig, client)
-            if not tx:
-                log.info("[COPY_SLOT] Skip copy_id=%s: getTransaction returned no data.", copy_id)
-                continue
+    fetcher = fetcher or get_fetcher()
+    txs = await fetcher.get_transactions(row["tx_signature"] for row in rows)
+
+    params = []
+    for row in rows:
+        copy_id: int = row["copy_id"]
+        sig: str = row["tx_signature"]
+
+        if not sig:
+            log.info("[COPY_SLOT] Skip copy_id=%s: tx_signature is NULL.", copy_id)
+            continue
+
+        tx = txs.get(sig)
+        if not tx:
+            log.info("[COPY_SLOT] Skip copy_id=%s: getTransaction returned no data.", copy_id)
+            continue
+
+        slot = tx.get("slot")
+        block_time = tx.get("blockTime")
+        block_ts = (
+            datetime.fromtimestamp(block_time, tz=timezone.utc)
+            if block_time
+            else None
+        )
 
-            slot = tx.get("slot")
-            block_time = tx.get("blockTime")
-            block_ts = (
-                datetime.fromtimestamp(block_time, tz=timezone.utc)
-                if block_time
-                else None
-            )
+        meta = tx.get("meta") or {}
+        cu_used = meta.get("computeUnitsConsumed")
+        # You can extend this later if you want to pull priority/tips.
+        priority_fee_lamports = None
+        tip_lamports = None
 
-            meta = tx.get("meta") or {}
-            cu_used = meta.get("computeUnitsConsumed")
-            # You can extend this later if you want to pull priority/tips.
-            priority_fee_lamports = None
-            tip_lamports = None
-
-            raw_json = json.dumps(tx)
-
-            async with pool.acquire() as conn:
-                await conn.execute(
-                    """
-                    insert into trades_transactions (
-                        tx_signature,
-                        slot,
-                        block_time,
-                        priority_fee_lamports,
-                        cu_used,
-                        tip_lamports,
-                        raw
-                    )
-                    values ($1, $2, $3, $4, $5, $6, $7)
-                    on conflict (tx_signature) do update
-                    set slot                   = excluded.slot,
-                        block_time             = excluded.block_time,
-                        priority_fee_lamports  = coalesce(
-                            excluded.priority_fee_lamports,
-                            trades_transactions.priority_fee_lamports
-                        ),
-                        cu_used                = coalesce(
-                            excluded.cu_used,
-                            trades_transactions.cu_used
-                        ),
-                        tip_lamports           = coalesce(
-                            excluded.tip_lamports,
-                            trades_transactions.tip_lamports
-                        ),
-                        raw                    = excluded.raw
-                    """,
-                    sig,
-                    slot,
-                    block_ts,
-                    priority_fee_lamports,
-                    cu_used,
-                    tip_lamports,
-                    raw_json,
-                )
+        params.append(
+            (sig, slot, block_ts, priority_fee_lamports, cu_used, tip_lamports, json.dumps(tx))
+        )
+        log.info("[COPY_SLOT] Enriched copy_id=%s sig=%s slot=%s", copy_id, sig, slot)
 
-            enriched += 1
-            log.info(
-                "[COPY_SLOT] Enriched copy_id=%s sig=%s slot=%s",
-                copy_id,
-                sig,
-                slot,
-            )
+    if params:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(UPSERT_TX, params)
+    # unresolved signatures keep their lease until it expires (retry delay)
+    await release(pool, STAGE, [p[0] for p in params])
 
     log.info(
-        "[COPY_SLOT] Batch complete. rows=%s enriched=%s",
+        "[COPY_SLOT] Batch complete. rows=%s enriched=%s rpc=%s",
         len(rows),
-        enriched,
+        len(params),
+        fetcher.stats(),
     )
     return len(rows)
 
@@ -219,6 +211,8 @@ async def main() -> None:
             else:
                 await asyncio.sleep(1.0)
     finally:
+        await close_fetcher()
+        close_cache()
         await pool.close()
         log.info("[COPY_SLOT] Pool closed, shutting down.")
 
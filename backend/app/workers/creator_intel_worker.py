@@ -1,58 +1,99 @@
 # backend/app/workers/creator_intel_worker.py
 import os
 from asyncpg import Pool
-from ..utils.db_helpers import fetch_all, upsert_one, update_heartbeat
-
-BATCH = int(os.getenv("CREATOR_INTEL_BATCH_SIZE", "200"))
-
-AGG_ROWS = """
--- Aggregate execution_score per creator over the last 7 days
-select
-  c.source_wallet_pubkey           as creator_pubkey,
-  avg(p.execution_score)           as exec_score_avg,
-  count(*)                         as trade_count
-from creators c
-join source_trades st
-  on st.source_wallet_pubkey = c.source_wallet_pubkey
-join trade_pairs p
-  on p.source_trade_id = st.id
-where p.paired_at >= now() - interval '7 days'
-group by c.source_wallet_pubkey
-order by c.source_wallet_pubkey
-limit $1
-"""
+from ..jobs import creator_intel_worker as intel_jobs
+from ..utils.db_helpers import update_heartbeat
+from ..utils.work_claims import SHARD
+
+# The watermark trails the pass's start by this much: paired_at and
+# exec_ready_at are set at transaction start, so a pair can commit after
+# later ones were seen. Pairs in the overlap are seen twice, which is
+# harmless (re-enqueueing a queued creator only bumps its version).
+WATERMARK_LAG_SEC = float(os.getenv("CREATOR_INTEL_WATERMARK_LAG_SEC", "60"))
 
-UPSERT_INTEL_DAILY = """
-insert into creator_intel_daily (
-  creator_pubkey,
-  day,
-  exec_score_avg,
-  trade_count
+# One statement per pass (migration 0012):
+# - recent: pairs paired or (re-)scored since the oculus_cursor watermark
+#   (both columns indexed); every pair on the first pass
+# - touched: their creators, in this process's shard
+# - queued: those creators go to the creator-intel job queue (migration
+#   0011, app/jobs/creator_intel_worker.py), whose recompute_creator is the
+#   only writer of creator_intel_daily; duplicates coalesce per creator
+# - mark: the watermark moves to now() - lag, never back
+ENQUEUE_TOUCHED = """
+with cur as (
+  select coalesce(
+    (select last_seen_at from oculus_cursor where stream_key = $1),
+    '-infinity'::timestamptz
+  ) as since
+),
+recent as (
+  select p.source_trade_id
+  from trade_pairs p, cur
+  where p.paired_at > cur.since
+  union
+  select p.source_trade_id
+  from trade_pairs p, cur
+  where p.exec_ready_at > cur.since
+),
+touched as (
+  select distinct st.source_wallet_pubkey as creator_pubkey
+  from recent r
+  join source_trades st
+    on st.id = r.source_trade_id
+  where oculus_shard(st.source_wallet_pubkey, $3) = $4
+),
+queued as (
+  insert into jobs_creator_intel_queue (creator_pubkey, reason)
+  select creator_pubkey, 'pairs'
+  from touched
+  order by creator_pubkey
+  on conflict (creator_pubkey) do update set
+    version = jobs_creator_intel_queue.version + 1,
+    reason  = excluded.reason
+  returning 1
+),
+mark as (
+  insert into oculus_cursor (stream_key, last_seen_at, updated_at)
+  values ($1, now() - make_interval(secs => $2), now())
+  on conflict (stream_key) do update set
+    last_seen_at = greatest(oculus_cursor.last_seen_at, excluded.last_seen_at),
+    updated_at   = now()
 )
-values ($1, current_date, $2, $3)
-on conflict (creator_pubkey, day) do update set
-  exec_score_avg = excluded.exec_score_avg,
-  trade_count    = excluded.trade_count
+select count(*) from queued
 """
 
 class CreatorIntelWorker:
+    def __init__(self, db: Pool):
+        self.db = db
+        # one watermark per shard layout, so shards advance independently
+        self.stream_key = "creator_intel:%d:%d" % SHARD
+
+    async def run_once(self) -> int:
+        """
+        Enqueue every creator with pairs paired or scored since the last
+        pass for a creator-intel recompute, in one insert ... select.
+        Returns the number of creators enqueued.
+        """
+        n = await self.db.fetchval(
+            ENQUEUE_TOUCHED, self.stream_key, WATERMARK_LAG_SEC, *SHARD,
+        )
+        await update_heartbeat(self.db, "creator_intel_worker", n)
+        return n
+
+
+class CreatorIntelJobs:
+    """
+    Consumer side of the queue CreatorIntelWorker fills: each pass is one
+    app.jobs.creator_intel_worker.run_once (claim, recompute, acknowledge),
+    so worker_manager runs it next to the enqueuer. The standalone
+    `python -m app.jobs.creator_intel_worker` runner uses the same queue and
+    leases, so both can run at once without double work.
+    """
+
     def __init__(self, db: Pool):
         self.db = db
 
     async def run_once(self) -> int:
-        rows = await fetch_all(self.db, AGG_ROWS, BATCH)
-        done = 0
-        for r in rows:
-            await upsert_one(
-                self.db,
-                UPSERT_INTEL_DAILY,
-                (
-                    r["creator_pubkey"],
-                    r["exec_score_avg"],
-                    r["trade_count"],
-                ),
-            )
-            done += 1
-
-        await update_heartbeat(self.db, "creator_intel_worker", len(rows))
-        return done
+        n = await intel_jobs.run_once(self.db)
+        await update_heartbeat(self.db, "creator_intel_jobs", n)
+        return n
@@ -0,0 +1,345 @@
+# backend/app/workers/csv_ingest.py
+"""
+Bulk CSV ingest: copy_trade.csv -> trades_ledger
+------------------------------------------------
+Streams the export through a generator pipeline
+
+  read (csv.DictReader, .csv or .csv.gz) -> validate / normalize -> chunk
+
+and loads each chunk with COPY (asyncpg copy_records_to_table) into a
+temp staging table created inside the chunk's transaction (`on commit
+drop`, so it is safe behind pgBouncer transaction pooling), then merges
+it set-based:
+
+  - missing tokens / creators are created first (ledger FKs)
+  - rows with a signature: one `insert ... select ... on conflict
+    (tx_signature) do update` (migration 0007's unique index)
+  - rows without one: inserted unless an identical ledger row exists
+
+Memory stays constant in the file size: only one chunk is ever held.
+
+  cd backend
+  DATABASE_URL=postgresql://... python -m app.workers.csv_ingest path/to/copy_trade.csv
+"""
+
+import os
+import sys
+import csv
+import gzip
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.config import settings
+
+log = logging.getLogger("csv_ingest")
+
+logging.basicConfig(
+    level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
+DB_DSN = os.getenv("DATABASE_URL")
+
+CHUNK_ROWS = int(os.getenv("CSV_INGEST_CHUNK_ROWS", "20000"))
+MAX_LOGGED_REJECTS = 20
+
+# canonical column -> accepted CSV headers (case-insensitive)
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    "ts": ("timestamp", "ts", "ts_iso", "time", "date"),
+    "tx_signature": ("tx_signature", "signature", "sig", "tx"),
+    "copy_wallet": ("copy_wallet", "copy_wallet_pubkey", "wallet", "wallet_label"),
+    "source_wallet": ("source_wallet", "source_wallet_pubkey", "creator", "target_wallet"),
+    "token_mint": ("token_mint", "mint", "token"),
+    "side": ("side", "action", "type"),
+    "invested_sol": ("invested_sol", "sol_invested", "invested"),
+    "received_qty": ("received_qty", "qty", "amount", "received"),
+    "pnl_value_sol": ("pnl_value_sol", "pnl_sol", "pnl"),
+    "pnl_percent": ("pnl_percent", "pnl_pct"),
+    "percent_sold": ("percent_sold", "sold_pct"),
+    "reason": ("reason",),
+}
+
+STAGE = "csv_ingest_stage"
+STAGE_COLUMNS = (
+    "line", "ts", "tx_signature", "copy_wallet", "source_wallet", "token_mint", "side",
+    "invested_sol", "received_qty", "pnl_value_sol", "pnl_percent", "percent_sold", "reason",
+)
+
+CREATE_STAGE = f"""
+create temp table {STAGE} (
+  line           int8,
+  ts             timestamptz not null,
+  tx_signature   text,
+  copy_wallet    text,
+  source_wallet  text,
+  token_mint     text,
+  side           text not null,
+  invested_sol   numeric,
+  received_qty   numeric,
+  pnl_value_sol  numeric,
+  pnl_percent    numeric,
+  percent_sold   numeric,
+  reason         text
+) on commit drop
+"""
+
+ENSURE_TOKENS = f"""
+insert into tokens (token_mint)
+select distinct token_mint from {STAGE} where token_mint is not null
+on conflict do nothing
+"""
+
+ENSURE_CREATORS = f"""
+insert into creators (source_wallet_pubkey)
+select distinct source_wallet from {STAGE} where source_wallet is not null
+on conflict do nothing
+"""
+
+# copy wallet may be given by pubkey or label
+_LEDGER_SELECT = """
+select s.ts, cw.id, s.source_wallet, s.token_mint, s.side::trade_side,
+       s.invested_sol, s.received_qty, s.pnl_value_sol, s.pnl_percent, s.percent_sold,
+       s.reason, $1::text, s.tx_signature
+from {src} s
+left join lateral (
+  select id from copy_wallets
+  where pubkey = s.copy_wallet or label = s.copy_wallet
+  limit 1
+) cw on true
+"""
+
+_LEDGER_COLUMNS = """
+  timestamp, wallet_owned_id, wallet_target_id, token_mint, side,
+  invested_sol, received_qty, pnl_value_sol, pnl_percent, percent_sold,
+  reason, source_identifier, tx_signature
+"""
+
+# last row wins for a signature repeated inside one chunk
+MERGE_SIGNED = f"""
+with src as (
+  select distinct on (tx_signature) *
+  from {STAGE}
+  where tx_signature is not null
+  order by tx_signature, line desc
+),
+up as (
+  insert into trades_ledger ({_LEDGER_COLUMNS})
+  {_LEDGER_SELECT.format(src="src")}
+  on conflict (tx_signature) where tx_signature is not null do update set
+    timestamp        = excluded.timestamp,
+    wallet_owned_id  = coalesce(excluded.wallet_owned_id, trades_ledger.wallet_owned_id),
+    wallet_target_id = coalesce(excluded.wallet_target_id, trades_ledger.wallet_target_id),
+    token_mint       = coalesce(excluded.token_mint, trades_ledger.token_mint),
+    side             = excluded.side,
+    invested_sol     = excluded.invested_sol,
+    received_qty     = excluded.received_qty,
+    pnl_value_sol    = excluded.pnl_value_sol,
+    pnl_percent      = excluded.pnl_percent,
+    percent_sold     = excluded.percent_sold,
+    reason           = excluded.reason
+  returning (xmax = 0) as inserted
+)
+select count(*) filter (where inserted) as inserted,
+       count(*) filter (where not inserted) as updated
+from up
+"""
+
+INSERT_UNSIGNED = f"""
+insert into trades_ledger ({_LEDGER_COLUMNS})
+{_LEDGER_SELECT.format(src=STAGE)}
+where s.tx_signature is null
+  and not exists (
+    select 1 from trades_ledger t
+    where t.tx_signature is null
+      and t.timestamp = s.ts
+      and t.side = s.side::trade_side
+      and t.token_mint is not distinct from s.token_mint
+      and t.wallet_target_id is not distinct from s.source_wallet
+      and t.received_qty is not distinct from s.received_qty
+      and t.invested_sol is not distinct from s.invested_sol
+  )
+"""
+
+
+class RowError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Pipeline stages
+# ----------------------------------------------------------------------
+def read_rows(path: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """(line number, raw dict) for every data row; streams, never loads the file."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames:
+            return
+        headers = {h.strip().lower(): h for h in reader.fieldnames if h}
+        mapping = {}
+        for col, names in ALIASES.items():
+            for n in names:
+                if n in headers:
+                    mapping[col] = headers[n]
+                    break
+        missing = [c for c in ("ts", "side") if c not in mapping]
+        if missing:
+            raise RuntimeError(f"{path}: required columns missing: {missing} (headers: {reader.fieldnames})")
+        log.info("[CSV_INGEST] column mapping: %s", mapping)
+        for row in reader:
+            yield reader.line_num, {col: row.get(src) for col, src in mapping.items()}
+
+
+def _text(v: Optional[str]) -> Optional[str]:
+    v = (v or "").strip()
+    return v or None
+
+
+def _ts(v: Optional[str]) -> datetime:
+    v = _text(v)
+    if v is None:
+        raise RowError("missing timestamp")
+    try:
+        n = float(v)
+    except ValueError:
+        try:
+            dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+        except ValueError:
+            raise RowError(f"bad timestamp {v!r}")
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    # epoch seconds or milliseconds
+    return datetime.fromtimestamp(n / 1000.0 if n > 1e11 else n, tz=timezone.utc)
+
+
+def _num(v: Optional[str], name: str, lo: Optional[float] = None, hi: Optional[float] = None) -> Optional[Decimal]:
+    v = _text(v)
+    if v is None:
+        return None
+    try:
+        d = Decimal(v.replace(",", "").rstrip("%"))
+    except InvalidOperation:
+        raise RowError(f"bad {name} {v!r}")
+    if not d.is_finite() or (lo is not None and d < lo) or (hi is not None and d > hi):
+        raise RowError(f"{name} out of range: {v!r}")
+    return d
+
+
+def _side(v: Optional[str]) -> str:
+    s = (_text(v) or "").upper()
+    if s in ("BUY", "B"):
+        return "BUY"
+    if s in ("SELL", "S"):
+        return "SELL"
+    raise RowError(f"bad side {v!r}")
+
+
+def validate(rows: Iterable[Tuple[int, Dict[str, str]]], stats: Dict[str, Any]) -> Iterator[Tuple]:
+    """Normalize rows into staging records; rejects are counted and sampled in the log."""
+    for line, r in rows:
+        stats["read"] += 1
+        try:
+            yield (
+                line,
+                _ts(r.get("ts")),
+                _text(r.get("tx_signature")),
+                _text(r.get("copy_wallet")),
+                _text(r.get("source_wallet")),
+                _text(r.get("token_mint")),
+                _side(r.get("side")),
+                _num(r.get("invested_sol"), "invested_sol"),
+                _num(r.get("received_qty"), "received_qty"),
+                _num(r.get("pnl_value_sol"), "pnl_value_sol"),
+                _num(r.get("pnl_percent"), "pnl_percent", -99999, 99999),  # numeric(9,4)
+                _num(r.get("percent_sold"), "percent_sold", 0, 100),
+                _text(r.get("reason")),
+            )
+        except RowError as e:
+            stats["rejected"] += 1
+            if stats["rejected"] <= MAX_LOGGED_REJECTS:
+                log.warning("[CSV_INGEST] line %s rejected: %s", line, e)
+
+
+def chunked(it: Iterable[Tuple], n: int) -> Iterator[List[Tuple]]:
+    buf: List[Tuple] = []
+    for rec in it:
+        buf.append(rec)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+# ----------------------------------------------------------------------
+# Load
+# ----------------------------------------------------------------------
+async def ingest(
+    pool: asyncpg.Pool,
+    path: str,
+    chunk_rows: int = CHUNK_ROWS,
+    source_identifier: Optional[str] = None,
+) -> Dict[str, Any]:
+    """COPY + merge `path` chunk by chunk. Returns counters."""
+    source_identifier = source_identifier or f"csv:{os.path.basename(path)}"
+    stats: Dict[str, Any] = {"read": 0, "rejected": 0, "loaded": 0,
+                             "inserted": 0, "updated": 0, "unsigned_inserted": 0}
+    t0 = time.perf_counter()
+
+    async with pool.acquire() as conn:
+        for chunk in chunked(validate(read_rows(path), stats), max(1, chunk_rows)):
+            async with conn.transaction():
+                await conn.execute(CREATE_STAGE)
+                await conn.copy_records_to_table(STAGE, records=chunk, columns=STAGE_COLUMNS)
+                await conn.execute(ENSURE_TOKENS)
+                await conn.execute(ENSURE_CREATORS)
+                merged = await conn.fetchrow(MERGE_SIGNED, source_identifier)
+                status = await conn.execute(INSERT_UNSIGNED, source_identifier)
+            stats["loaded"] += len(chunk)
+            stats["inserted"] += merged["inserted"]
+            stats["updated"] += merged["updated"]
+            stats["unsigned_inserted"] += int(status.split()[-1])
+
+            elapsed = time.perf_counter() - t0
+            log.info(
+                "[CSV_INGEST] %s rows loaded (%s rejected) %.0f rows/s",
+                stats["loaded"], stats["rejected"], stats["loaded"] / elapsed if elapsed else 0.0,
+            )
+
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["read"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+async def main(path: str, chunk_rows: int, source_identifier: Optional[str]) -> None:
+    if not DB_DSN:
+        raise RuntimeError("DATABASE_URL not set in environment.")
+
+    pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=1, statement_cache_size=0)
+    try:
+        stats = await ingest(pool, path, chunk_rows, source_identifier)
+    finally:
+        await pool.close()
+    log.info("[CSV_INGEST] done: %s", stats)
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Bulk-load a copy_trade.csv export into trades_ledger")
+    p.add_argument("path", help="CSV file (.csv or .csv.gz)")
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                   help="Rows per COPY + merge transaction (default: %(default)s)")
+    p.add_argument("--source-id", default=None,
+                   help="trades_ledger.source_identifier (default: csv:<file name>)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = _parse_args(sys.argv[1:])
+    asyncio.run(main(args.path, args.chunk_rows, args.source_id))
@@ -6,6 +6,7 @@ from typing import Optional
 from asyncpg import Pool
 
 from ..utils.db_helpers import update_heartbeat
+from ..utils.work_claims import SHARD
 
 log = logging.getLogger("ladder_worker")
 
@@ -13,7 +14,7 @@ log = logging.getLogger("ladder_worker")
 BATCH = int(os.getenv("LADDER_BATCH_SIZE", "200"))
 
 # ---------------------------------------------------------------------------
-# SQL: find pairs that need ladder snapshots
+# SQL: find (and lock, skip locked) pairs that need ladder snapshots
 # ---------------------------------------------------------------------------
 
 PAIRS_NEEDING_LADDER = """
@@ -39,8 +40,10 @@ where tp.source_trade_id is not null
   and cp_tx.slot is not null
   -- and we have at least some source slot info
   and coalesce(st.landed_slot, st.event_slot) is not null
+  and oculus_shard(cp.token_mint, $2) = $3
 order by tp.copy_trade_id
-limit $1;
+limit $1
+for no key update of tp skip locked;
 """
 
 
@@ -120,52 +123,57 @@ class LadderWorker:
 
         Returns the number of snapshots written/updated.
         """
-        rows = await self.db.fetch(PAIRS_NEEDING_LADDER, BATCH)
+        # Claim + write in one transaction: concurrent ladder loops /
+        # processes skip pairs another one holds
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(PAIRS_NEEDING_LADDER, BATCH, *SHARD)
+
+                params = []
+                for r in rows:
+                    pair_id: int = r["pair_id"]
+                    source_slot: Optional[int] = r["source_landed_slot"] or r["source_event_slot"]
+                    copy_slot: Optional[int] = r["copy_slot"]
+
+                    if source_slot is None or copy_slot is None:
+                        log.info(
+                            "[LADDER] Skip pair_id=%s: insufficient slot data "
+                            "(source_slot=%s copy_slot=%s)",
+                            pair_id,
+                            source_slot,
+                            copy_slot,
+                        )
+                        continue
+
+                    delta_slots = copy_slot - source_slot
+
+                    # Minimal snapshot: only set core fields; everything else NULL for now.
+                    params.append((
+                        pair_id,          # $1 pair_id
+                        source_slot,      # $2 event_slot
+                        copy_slot,        # $3 copy_landed_slot
+                        delta_slots,      # $4 delta_slots
+                        None,             # $5 crowd_ahead
+                        None,             # $6 crowd_at_event
+                        None,             # $7 crowd_behind
+                        None,             # $8 tip_p50
+                        None,             # $9 tip_p66
+                        None,             # $10 tip_p90
+                        None,             # $11 cu_p50
+                        None,             # $12 cu_p66
+                        None,             # $13 cu_p90
+                        None,             # $14 tip_grade
+                        None,             # $15 cu_grade
+                        None,             # $16 hist
+                        "OK",             # $17 status
+                    ))
+                if params:
+                    await conn.executemany(UPSERT_LADDER, params)
+
         if not rows:
             await update_heartbeat(self.db, "ladder_worker", 0)
             return 0
-
-        written = 0
-
-        for r in rows:
-            pair_id: int = r["pair_id"]
-            source_slot: Optional[int] = r["source_landed_slot"] or r["source_event_slot"]
-            copy_slot: Optional[int] = r["copy_slot"]
-
-            if source_slot is None or copy_slot is None:
-                log.info(
-                    "[LADDER] Skip pair_id=%s: insufficient slot data "
-                    "(source_slot=%s copy_slot=%s)",
-                    pair_id,
-                    source_slot,
-                    copy_slot,
-                )
-                continue
-
-            delta_slots = copy_slot - source_slot
-
-            # Minimal snapshot: only set core fields; everything else NULL for now.
-            await self.db.execute(
-                UPSERT_LADDER,
-                pair_id,          # $1 pair_id
-                source_slot,      # $2 event_slot
-                copy_slot,        # $3 copy_landed_slot
-                delta_slots,      # $4 delta_slots
-                None,             # $5 crowd_ahead
-                None,             # $6 crowd_at_event
-                None,             # $7 crowd_behind
-                None,             # $8 tip_p50
-                None,             # $9 tip_p66
-                None,             # $10 tip_p90
-                None,             # $11 cu_p50
-                None,             # $12 cu_p66
-                None,             # $13 cu_p90
-                None,             # $14 tip_grade
-                None,             # $15 cu_grade
-                None,             # $16 hist
-                "OK",             # $17 status
-            )
-            written += 1
+        written = len(params)
 
         # Backlog ≈ "how many still need ladder" → we don't know total here,
         # but len(rows) is a useful approximation for monitoring.
@@ -1,83 +1,127 @@
 import os
+import json
+import asyncio
 from typing import Optional, List, Dict, Any
 from asyncpg import Pool
 from ..utils.helius_client import HeliusClient
-from ..utils.db_helpers import fetch_all, upsert_one, update_heartbeat
+from ..utils.db_helpers import update_heartbeat
+from ..utils.work_claims import SHARD
 
 PAIR_BATCH = int(os.getenv("NORMALIZER_COPY_BATCH", "300"))
 
-COPY_RAW_QUERY = """
-select id, tx_signature, copy_wallet_pubkey, source_wallet_pubkey, token_mint, side,
-       received_qty, invested_sol, ts_iso, raw_json
-from trades_ledger_raw
-where processed_at is null
-order by id
-limit $1
+# One statement, one transaction per batch:
+#   claim    - unprocessed raw rows, skipping rows another worker holds
+#   ensure   - creators / tokens the ledger FKs need
+#   promote  - insert ... select into trades_ledger; a signature already in
+#              the ledger (migration 0007 index) is not inserted twice
+#   mark     - processed_at on exactly the claimed rows
+# Promotion and mark commit together, so a crash can never leave a row
+# promoted but unmarked (or the reverse).
+PROMOTE_BATCH = """
+with claimed as (
+  select id, nullif(btrim(tx_signature), '') as tx_signature, source_wallet_pubkey,
+         token_mint, upper(side::text)::trade_side as side,
+         received_qty::numeric as received_qty, invested_sol::numeric as invested_sol,
+         ts_iso::timestamptz as ts_iso
+  from trades_ledger_raw
+  where processed_at is null
+    and oculus_shard(token_mint, $2) = $3
+  order by id
+  limit $1
+  for update skip locked
+),
+creators_ins as (
+  insert into creators (source_wallet_pubkey)
+  select distinct source_wallet_pubkey from claimed where source_wallet_pubkey is not null
+  on conflict do nothing
+),
+tokens_ins as (
+  insert into tokens (token_mint)
+  select distinct token_mint from claimed where token_mint is not null
+  on conflict do nothing
+),
+promoted as (
+  insert into trades_ledger (
+    wallet_target_id,                -- creator pubkey if known
+    token_mint,
+    side,
+    received_qty,
+    invested_sol,
+    timestamp,
+    tx_signature
+  )
+  select distinct on (coalesce(tx_signature, id::text))
+         source_wallet_pubkey, token_mint, side, received_qty, invested_sol, ts_iso, tx_signature
+  from claimed
+  order by coalesce(tx_signature, id::text), id
+  on conflict (tx_signature) where tx_signature is not null do nothing
+  returning id
+),
+marked as (
+  update trades_ledger_raw r
+  set processed_at = now()
+  from claimed c
+  where r.id = c.id
+  returning r.id
+)
+select
+  (select count(*) from marked)   as claimed,
+  (select count(*) from promoted) as promoted,
+  coalesce(
+    (select array_agg(distinct tx_signature) from claimed where tx_signature is not null),
+    '{}'
+  ) as signatures
 """
 
-MARK_COPY_RAW_DONE = "update trades_ledger_raw set processed_at = now() where id = $1"
-
 UPSERT_TRADES_TX = """
 insert into trades_transactions (tx_signature, slot, block_time)
-values ($1, $2, $3)
-on conflict (tx_signature) do update set slot = excluded.slot, block_time = excluded.block_time
-returning tx_signature
-"""
-
-UPSERT_TRADES_LEDGER = """
-insert into trades_ledger (
-  -- keep your existing column set; we avoid tx_signature because it's often empty
-  wallet_target_id,                -- creator pubkey if known
-  token_mint,
-  side,
-  received_qty,
-  invested_sol,
-  timestamp
-)
-values ($1, $2, $3, $4, $5, $6)
-returning id
+select t.tx_signature, t.slot, to_timestamp(t.block_time)
+from jsonb_to_recordset($1::jsonb) as t(tx_signature text, slot int8, block_time float8)
+on conflict (tx_signature) do update
+set slot = coalesce(excluded.slot, trades_transactions.slot),
+    block_time = coalesce(excluded.block_time, trades_transactions.block_time)
 """
 
 class NormalizerCopy:
+    """
+    Promotes trades_ledger_raw into trades_ledger in batches.
+
+    - stage 1: claim + promote + mark in one set-based statement
+      (exactly-once; concurrent loops claim disjoint rows)
+    - stage 2: enrich the batch's signatures concurrently via Helius
+      (tx cache first) and upsert trades_transactions in one statement;
+      a failed lookup is left to copy_slot_backfill
+    """
+
     def __init__(self, db: Pool, helius: Optional[HeliusClient] = None):
         self.db = db
         self.helius = helius or HeliusClient()
 
-    async def _normalize_row(self, row) -> None:
-        # tx_signature may be empty in your CSV; we still try to fetch Helius if present
-        sig = row["tx_signature"]
-        slot = None
-        block_time = None
-        if sig:
-            tx = self.helius.tx_by_signature(sig)
-            if tx:
-                slot = tx.get("slot")
-                block_time = tx.get("blockTime")
-
-                # Persist tx linkage
-                await upsert_one(self.db, UPSERT_TRADES_TX, (sig, slot, block_time))
-
-        # Insert canonical copy trade (we do not depend on tx_signature here)
-        # Using creator hint if present (source_wallet_pubkey) into wallet_target_id
-        await upsert_one(
-            self.db,
-            UPSERT_TRADES_LEDGER,
-            (
-                row["source_wallet_pubkey"],        # wallet_target_id (creator pubkey)
-                row["token_mint"],
-                row["side"],
-                row["received_qty"],
-                row["invested_sol"],
-                row["ts_iso"],
-            ),
-        )
+    async def _promote(self) -> Dict[str, Any]:
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(PROMOTE_BATCH, PAIR_BATCH, *SHARD)
+        return dict(row)
 
-        # Mark raw processed
-        await self.db.execute(MARK_COPY_RAW_DONE, row["id"])
+    async def _enrich(self, signatures: List[str]) -> int:
+        txs = await asyncio.gather(*(self.helius.tx_by_signature(sig) for sig in signatures))
+        rows = []
+        for sig, tx in zip(signatures, txs):
+            if not tx:
+                continue
+            rows.append({
+                "tx_signature": sig,
+                "slot": tx.get("slot"),
+                # RPC-style blockTime or Helius-enhanced timestamp (epoch seconds)
+                "block_time": tx.get("blockTime") or tx.get("timestamp"),
+            })
+        if rows:
+            await self.db.execute(UPSERT_TRADES_TX, json.dumps(rows))
+        return len(rows)
 
     async def run_once(self) -> int:
-        rows = await fetch_all(self.db, COPY_RAW_QUERY, PAIR_BATCH)
-        for r in rows:
-            await self._normalize_row(r)
-        await update_heartbeat(self.db, "normalizer_copy", len(rows))
-        return len(rows)
+        batch = await self._promote()
+        if batch["signatures"]:
+            await self._enrich(list(batch["signatures"]))
+        await update_heartbeat(self.db, "normalizer_copy", batch["claimed"])
+        return batch["claimed"]
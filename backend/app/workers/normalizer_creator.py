@@ -1,94 +1,196 @@
 import os
-from typing import Optional
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from asyncpg import Pool
 from ..utils.helius_client import HeliusClient
 from ..utils.db_helpers import fetch_all, fetch_one, upsert_one, update_heartbeat
+from ..utils.work_claims import SHARD, claim, release
+from ..services.source_index import source_index
+from ..services.creator_history import CreatorHistoryScanner
 
 BATCH = int(os.getenv("NORMALIZER_CREATOR_BATCH", "300"))
 PAIR_WINDOW_SLOTS = int(os.getenv("PAIRING_SEARCH_SLOTS", "50"))
+# Creators scanned concurrently within a batch (Helius calls are further
+# capped per endpoint by HeliusClient)
+PARALLEL = int(os.getenv("NORMALIZER_CREATOR_PARALLEL", "8"))
+# work_leases stage: a creator is resolved by one worker at a time
+STAGE = "normalizer_creator"
 
 UNPAIRED_COPIES = """
 select t.id as copy_id, t.token_mint, t.side, tr.tx_signature, tr.slot, tr.block_time,
        t.wallet_target_id as source_wallet_pubkey
 from trades_ledger t
 left join trade_pairs p on p.copy_trade_id = t.id
-left join trades_transactions tr on tr.tx_signature = (select tx_signature from trades_transactions tt where tt.tx_signature = tr.tx_signature)
+join trades_transactions tr on tr.tx_signature = t.tx_signature   -- no slot, nothing to match
 where p.copy_trade_id is null
+  and tr.slot is not null
   and t.wallet_target_id is not null                          -- we need creator pubkey hint
+  and oculus_shard(t.wallet_target_id, $2) = $3
+  and not exists (                                            -- creator leased by another worker
+    select 1 from work_leases wl
+    where wl.stage = 'normalizer_creator'
+      and wl.item_key = t.wallet_target_id
+      and wl.expires_at > now()
+  )
 order by t.id
 limit $1
 """
 
 UPSERT_SOURCE_TRADE = """
 insert into source_trades (
-  tx_signature, source_wallet_pubkey, token_mint, side, event_ts, tip_lamports,
+  tx_signature, source_wallet_pubkey, token_mint, side, event_slot, event_ts, tip_lamports,
   cu_price_micro_lamports, route
 )
-values ($1, $2, $3, $4, $5, $6, $7, $8)
+values ($1, $2, $3, $4, $5, $6, $7, $8, $9)
 on conflict (tx_signature) do update set
   source_wallet_pubkey = excluded.source_wallet_pubkey,
   token_mint = excluded.token_mint,
   side = excluded.side,
+  event_slot = excluded.event_slot,
   event_ts = excluded.event_ts,
   tip_lamports = excluded.tip_lamports,
   cu_price_micro_lamports = excluded.cu_price_micro_lamports,
   route = excluded.route
-returning tx_signature
+returning id, tx_signature
 """
 
+def _block_dt(tx: Dict[str, Any]) -> Optional[datetime]:
+    """Block time as an aware datetime: RPC blockTime, Helius timestamp or a history entry's block_time (epoch seconds)."""
+    v = tx.get("blockTime") or tx.get("timestamp") or tx.get("block_time")
+    if v is None:
+        return None
+    return datetime.fromtimestamp(float(v), tz=timezone.utc)
+
+
+def _token_delta(tx: Dict[str, Any], owner: str, mint: str) -> Optional[float]:
+    """
+    Net change of `owner`'s `mint` balance in the tx, or None when the tx
+    does not move that mint for them.
+
+    - Helius-enhanced txs: tokenTransfers (from/toUserAccount)
+    - RPC txs: meta pre/postTokenBalances
+    """
+    moved = False
+    delta = 0.0
+    for t in tx.get("tokenTransfers") or []:
+        if t.get("mint") != mint:
+            continue
+        amount = float(t.get("tokenAmount") or 0)
+        if t.get("toUserAccount") == owner:
+            delta += amount
+            moved = True
+        if t.get("fromUserAccount") == owner:
+            delta -= amount
+            moved = True
+
+    meta = tx.get("meta") or {}
+    for key, sign in (("postTokenBalances", 1.0), ("preTokenBalances", -1.0)):
+        for b in meta.get(key) or []:
+            if b.get("mint") == mint and b.get("owner") == owner:
+                ui = (b.get("uiTokenAmount") or {}).get("uiAmount") or 0
+                delta += sign * float(ui)
+                moved = True
+    return delta if moved else None
+
+
 class NormalizerCreator:
     def __init__(self, db: Pool, helius: Optional[HeliusClient] = None):
         self.db = db
         self.helius = helius or HeliusClient()
+        self.history = CreatorHistoryScanner(db, self.helius)
 
-    def _closest_match(self, creator_txs, copy_slot: Optional[int], mint: str, side: str):
-        best = None
-        best_delta = None
-        for tx in creator_txs:
-            # Filter: token_mint/side if present in meta (best effort; adjust to your parsing)
-            slot = tx.get("slot")
-            if copy_slot is not None and slot is not None:
-                delta = abs(slot - copy_slot)
-                if best_delta is None or delta < best_delta:
-                    best = tx; best_delta = delta
-        return best
-
-    async def _create_source_row_from_helius(self, creator_pubkey: str, mint: str, side: str, copy_slot: Optional[int]):
-        before = copy_slot + PAIR_WINDOW_SLOTS if copy_slot else None
-        after  = copy_slot - PAIR_WINDOW_SLOTS if copy_slot else None
-        window = self.helius.address_txs_window(creator_pubkey, limit=50, before_slot=before, after_slot=after)
-        match = self._closest_match(window, copy_slot, mint, side)
-        if not match:
-            return None
-
-        # Extract fields defensively
-        sig = match.get("signature")
-        slot = match.get("slot")
-        block_time = match.get("blockTime")
-        meta = match.get("meta") or {}
+    async def _closest_match(self, creator_pubkey: str, creator_txs, copy_slot: int, mint: str, side: str):
+        """
+        Slot-nearest history entry (ties to the lower slot) whose full tx
+        moves `mint` in the copy's direction for the creator (BUY: balance
+        up, SELL: down). Returns (index entry, full tx) or None. Full txs
+        come from the tx cache, seeded by the history scan.
+        """
+        for entry in sorted(creator_txs, key=lambda tx: (abs(tx["slot"] - copy_slot), tx["slot"])):
+            tx = await self.helius.tx_by_signature(entry["signature"])
+            if not tx:
+                continue
+            delta = _token_delta(tx, creator_pubkey, mint)
+            if delta is None or delta == 0:
+                continue
+            if (delta > 0) == (str(side).upper() == "BUY"):
+                return entry, tx
+        return None
+
+    async def _create_source_row(self, creator_pubkey: str, mint: str, side: str, entry, tx):
+        # Extract fields defensively; the index entry has the slot / time
+        # when the full tx lacks them
+        sig = entry["signature"]
+        slot = tx.get("slot") or entry["slot"]
+        event_ts = _block_dt(tx) or _block_dt(entry)
+        if event_ts is None:
+            return None  # event_ts is required; retried next pass
+        meta = tx.get("meta") or {}
         # Tip/CU extraction are service/provider dependent; store what we can safely
         tip = meta.get("fee")                    # placeholder if tip split not exposed
         cu_price = None                          # optional if not directly available
         route = None
 
         # Persist source trade
-        await upsert_one(
+        row = await upsert_one(
             self.db, UPSERT_SOURCE_TRADE,
-            (sig, creator_pubkey, mint, side, block_time, tip, cu_price, route)
+            (sig, creator_pubkey, mint, side, slot, event_ts, tip, cu_price, route)
         )
+
+        # Keep the pairing-side index current without waiting for a refresh
+        if row:
+            source_index.add(row["id"], mint, side, slot)
         return sig
 
-    async def run_once(self) -> int:
-        rows = await fetch_all(self.db, UNPAIRED_COPIES, BATCH)
+    async def _resolve_creator(self, creator_pubkey: str, copies) -> int:
+        """One history scan serves every pending copy of this creator."""
+        slots = [r["slot"] for r in copies]
+        lo, hi = min(slots) - PAIR_WINDOW_SLOTS, max(slots) + PAIR_WINDOW_SLOTS
+        await self.history.scan(creator_pubkey, lo)
+        window = await self.history.history(creator_pubkey, lo, hi)
+
         created = 0
-        for r in rows:
-            creator = r["source_wallet_pubkey"]
-            if not creator:
+        for r in copies:
+            copy_slot = r["slot"]
+            near = [tx for tx in window if abs(tx["slot"] - copy_slot) <= PAIR_WINDOW_SLOTS]
+            match = await self._closest_match(creator_pubkey, near, copy_slot, r["token_mint"], r["side"])
+            if not match:
                 continue
-            sig = await self._create_source_row_from_helius(
-                creator, r["token_mint"], r["side"], r["slot"]
-            )
-            if sig:
+            if await self._create_source_row(creator_pubkey, r["token_mint"], r["side"], *match):
                 created += 1
+        return created
+
+    async def run_once(self) -> int:
+        rows = await fetch_all(self.db, UNPAIRED_COPIES, BATCH, *SHARD)
+
+        # group by creator; copies without a slot have nothing to match against
+        by_creator: Dict[str, List] = {}
+        for r in rows:
+            if r["source_wallet_pubkey"] and r["slot"] is not None:
+                by_creator.setdefault(r["source_wallet_pubkey"], []).append(r)
+
+        # only creators this worker holds a lease on; the rest are being
+        # resolved elsewhere
+        held = await claim(self.db, STAGE, by_creator.keys())
+        sem = asyncio.Semaphore(max(1, PARALLEL))
+
+        async def _one(creator: str, copies) -> int:
+            async with sem:
+                return await self._resolve_creator(creator, copies)
+
+        # let the whole batch settle, then surface the first failure
+        creators = [c for c in by_creator if c in held]
+        results = await asyncio.gather(
+            *(_one(c, by_creator[c]) for c in creators), return_exceptions=True
+        )
+        # failed creators keep their lease until it expires (retry delay)
+        await release(
+            self.db, STAGE, [c for c, res in zip(creators, results) if not isinstance(res, BaseException)]
+        )
+        errors = [e for e in results if isinstance(e, BaseException)]
+        if errors:
+            raise errors[0]
+        created = sum(results)
         await update_heartbeat(self.db, "normalizer_creator", len(rows))
         return created
@@ -1,15 +1,26 @@
 # backend/app/workers/pairing_worker.py
 import os
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from asyncpg import Pool
 from ..utils.db_helpers import fetch_all, fetch_one, upsert_one, update_heartbeat
+from ..utils.work_claims import SHARD
+from ..services.source_index import SourceIndex, source_index
+from ..services.compare_cache import publish_invalidation
 
 BATCH = int(os.getenv("PAIRING_BATCH_SIZE", "300"))
 RPC_FALLBACK = os.getenv("PAIRING_USE_DB_RPC_FALLBACK", "true").lower() == "true"
 
-# 1) Find copy trades that do NOT yet have a row in trade_pairs
+# index | batch | row
+#   index: nearest source from the in-process SourceIndex (bisect), one executemany
+#   batch: resolve sources for the whole batch in one query, write with one executemany
+#   row:   legacy path, one FIND_SOURCE_FOR_COPY + one UPSERT_PAIR per copy
+MODE = os.getenv("PAIRING_MODE", "index").lower()
+
+# 1) Find copy trades that do NOT yet have a row in trade_pairs.
+# The batch is locked (skip locked) for the pass's transaction, so
+# concurrent pairing loops / processes take disjoint copies.
 UNPAIRED = """
 select
   t.id          as copy_id,
@@ -23,8 +34,10 @@ left join trade_pairs p
 left join trades_transactions tr
   on tr.tx_signature = t.tx_signature
 where p.copy_trade_id is null
+  and oculus_shard(t.token_mint, $2) = $3
 order by t.id
 limit $1
+for no key update of t skip locked
 """
 
 # 2) Find the closest source_trade by mint + side + slot distance
@@ -42,6 +55,49 @@ order by abs(tr.slot - $3) asc nulls last
 limit 1
 """
 
+# 1+2) Set-based variant: pick the unpaired batch and resolve the nearest
+# source for every copy in a single statement (LATERAL per (token_mint, side))
+UNPAIRED_WITH_SOURCE = """
+with batch as (
+  select
+    t.id          as copy_id,
+    t.token_mint  as token_mint,
+    t.side        as side,
+    tr.slot       as copy_slot
+  from trades_ledger t
+  left join trade_pairs p
+    on p.copy_trade_id = t.id
+  left join trades_transactions tr
+    on tr.tx_signature = t.tx_signature
+  where p.copy_trade_id is null
+    and oculus_shard(t.token_mint, $2) = $3
+  order by t.id
+  limit $1
+  for no key update of t skip locked
+)
+select
+  b.copy_id,
+  b.token_mint,
+  b.side,
+  b.copy_slot,
+  src.source_id,
+  src.source_slot
+from batch b
+left join lateral (
+  select
+    st.id   as source_id,
+    tr.slot as source_slot
+  from source_trades st
+  left join trades_transactions tr
+    on tr.tx_signature = st.tx_signature
+  where st.token_mint = b.token_mint
+    and st.side       = b.side
+  order by abs(tr.slot - b.copy_slot) asc nulls last
+  limit 1
+) src on true
+order by b.copy_id
+"""
+
 # 3) Insert / update the pairing record
 UPSERT_PAIR = """
 insert into trade_pairs (
@@ -68,9 +124,58 @@ on conflict (copy_trade_id) do update set
   paired_at         = now()
 """
 
+def _pair_params(
+    copy_id: int,
+    token_mint: Optional[str],
+    side: Optional[str],
+    copy_slot: Optional[int],
+    source_id: Optional[Any],
+    source_slot: Optional[int],
+) -> Tuple[Any, ...]:
+    """
+    Compute simple deltas / confidence for one copy and return the
+    UPSERT_PAIR parameter tuple. Shared by the batch and row paths.
+    """
+    delta_slots = None
+    delta_ms = None
+    price_drift = None
+
+    confidence = "LOW"
+    if source_id is not None and source_slot is not None and copy_slot is not None:
+        delta_slots = copy_slot - source_slot
+        confidence = "MED"
+
+    diagnostics: Dict[str, Any] = {
+        "note": "pairing_worker",
+        "has_source": bool(source_id),
+    }
+    diagnostics_str = json.dumps(diagnostics)  # TEXT column expects str
+
+    return (
+        copy_id,           # $1 copy_trade_id
+        source_id,         # $2 source_trade_id
+        token_mint,        # $3 token_mint
+        side,              # $4 side
+        delta_slots,       # $5 delta_slots_event
+        delta_ms,          # $6 delta_ms_event
+        price_drift,       # $7 price_drift
+        confidence,        # $8 confidence
+        diagnostics_str,   # $9 diagnostics (TEXT)
+    )
+
+
 class PairingWorker:
-    def __init__(self, db: Pool):
+    def __init__(
+        self,
+        db: Pool,
+        mode: str = MODE,
+        batch: int = BATCH,
+        index: Optional[SourceIndex] = None,
+    ):
         self.db = db
+        self.mode = mode
+        self.batch = batch
+        self.index = index or source_index
 
     async def _fallback_db_rpc(self, copy_id: int) -> Optional[int]:
         """
@@ -82,61 +187,111 @@ class PairingWorker:
         return None
 
     async def run_once(self) -> int:
-        rows = await fetch_all(self.db, UNPAIRED, BATCH)
+        if self.mode == "row":
+            return await self._run_rows()
+        if self.mode == "batch":
+            return await self._run_batch()
+        return await self._run_indexed()
+
+    async def _run_indexed(self) -> int:
+        """
+        Index pass: one query to claim the unpaired batch, O(log n)
+        in-process nearest-slot lookups, one pipelined executemany for the
+        writes, all in the claiming transaction.
+        """
+        await self.index.refresh(self.db)
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(UNPAIRED, self.batch, *SHARD)
+
+                params: List[Tuple[Any, ...]] = []
+                for r in rows:
+                    hit = self.index.nearest(r["token_mint"], r["side"], r["copy_slot"])
+                    source_id, source_slot = hit if hit else (None, None)
+                    if not source_id:
+                        source_id = await self._fallback_db_rpc(r["copy_id"])
+                    params.append(
+                        _pair_params(
+                            r["copy_id"],
+                            r["token_mint"],
+                            r["side"],
+                            r["copy_slot"],
+                            source_id,
+                            source_slot,
+                        )
+                    )
+                if params:
+                    await conn.executemany(UPSERT_PAIR, params)
+
+        await publish_invalidation(self.db, [r["copy_id"] for r in rows])
+        await update_heartbeat(self.db, "pairing_worker", len(rows))
+        return len(params)
+
+    async def _run_batch(self) -> int:
+        """
+        Set-based pass: one query to claim the batch and resolve every
+        nearest source, one pipelined executemany to write all pairs.
+        """
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(UNPAIRED_WITH_SOURCE, self.batch, *SHARD)
+
+                params: List[Tuple[Any, ...]] = []
+                for r in rows:
+                    source_id = r["source_id"]
+                    if not source_id:
+                        source_id = await self._fallback_db_rpc(r["copy_id"])
+                    params.append(
+                        _pair_params(
+                            r["copy_id"],
+                            r["token_mint"],
+                            r["side"],
+                            r["copy_slot"],
+                            source_id,
+                            r["source_slot"],
+                        )
+                    )
+                if params:
+                    await conn.executemany(UPSERT_PAIR, params)
+
+        await publish_invalidation(self.db, [r["copy_id"] for r in rows])
+        await update_heartbeat(self.db, "pairing_worker", len(rows))
+        return len(params)
+
+    async def _run_rows(self) -> int:
         paired = 0
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await fetch_all(conn, UNPAIRED, self.batch, *SHARD)
+
+                for r in rows:
+                    token_mint = r["token_mint"]
+                    side = r["side"]
+                    copy_slot = r["copy_slot"]
+
+                    # 1) Slot-nearest match in source_trades
+                    src = await fetch_one(
+                        conn,
+                        FIND_SOURCE_FOR_COPY,
+                        token_mint,
+                        side,
+                        copy_slot,
+                    )
+                    source_id: Optional[int] = src["source_id"] if src else None
+                    source_slot: Optional[int] = src["source_slot"] if src else None
+
+                    # 2) Optional RPC / DB function fallback
+                    if not source_id:
+                        source_id = await self._fallback_db_rpc(r["copy_id"])
 
-        for r in rows:
-            token_mint = r["token_mint"]
-            side = r["side"]
-            copy_slot = r["copy_slot"]
-
-            # 1) Slot-nearest match in source_trades
-            src = await fetch_one(
-                self.db,
-                FIND_SOURCE_FOR_COPY,
-                token_mint,
-                side,
-                copy_slot,
-            )
-            source_id: Optional[int] = src["source_id"] if src else None
-            source_slot: Optional[int] = src["source_slot"] if src else None
-
-            # 2) Optional RPC / DB function fallback
-            if not source_id:
-                source_id = await self._fallback_db_rpc(r["copy_id"])
-
-            # 3) Compute simple deltas / confidence
-            delta_slots = None
-            delta_ms = None
-            price_drift = None
-
-            confidence = "LOW"
-            if source_id is not None and source_slot is not None and copy_slot is not None:
-                delta_slots = copy_slot - source_slot
-                confidence = "MED"
-
-            diagnostics: Dict[str, Any] = {
-                "note": "pairing_worker",
-                "has_source": bool(source_id),
-            }
-            diagnostics_str = json.dumps(diagnostics)  # TEXT column expects str
-
-            await upsert_one(
-                self.db,
-                UPSERT_PAIR,
-                (
-                    r["copy_id"],      # $1 copy_trade_id
-                    source_id,         # $2 source_trade_id
-                    token_mint,        # $3 token_mint
-                    side,              # $4 side
-                    delta_slots,       # $5 delta_slots_event
-                    delta_ms,          # $6 delta_ms_event
-                    price_drift,       # $7 price_drift
-                    confidence,        # $8 confidence
-                    diagnostics_str,   # $9 diagnostics (TEXT)
-                ),
-            )
-            paired += 1
+                    # 3) Compute simple deltas / confidence and upsert
+                    await upsert_one(
+                        conn,
+                        UPSERT_PAIR,
+                        _pair_params(r["copy_id"], token_mint, side, copy_slot, source_id, source_slot),
+                    )
+                    paired += 1
 
+        await publish_invalidation(self.db, [r["copy_id"] for r in rows])
         await update_heartbeat(self.db, "pairing_worker", len(rows))
         return paired
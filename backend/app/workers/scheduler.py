@@ -0,0 +1,199 @@
+# backend/app/workers/scheduler.py
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+log = logging.getLogger("worker_scheduler")
+
+
+class WorkerLoop:
+    """
+    Runs one worker's run_once on its own cadence as independent asyncio
+    task(s), so a slow worker never stalls the others.
+
+    Cadence rules after each pass:
+      - full batch (n >= batch_size) -> re-run immediately
+      - some work (0 < n < batch)    -> sleep interval
+      - idle (n == 0) or error       -> sleep interval * backoff, backoff doubles
+                                        up to max_backoff
+    wake() cuts the current sleep short (e.g. on a NOTIFY).
+    """
+
+    def __init__(
+        self,
+        worker: Any,
+        *,
+        interval_ms: int,
+        batch_size: Optional[int] = None,
+        concurrency: int = 1,
+        max_backoff: float = 8.0,
+        name: Optional[str] = None,
+    ):
+        self.worker = worker
+        self.name = name or worker.__class__.__name__
+        self.interval = max(interval_ms, 0) / 1000.0
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.max_backoff = max(1.0, max_backoff)
+
+        self._backoff = 1.0
+        self._wake = asyncio.Event()
+
+        # counters
+        self.passes = 0
+        self.items = 0
+        self.errors = 0
+        self.full_batches = 0
+        self.idle_passes = 0
+        self.busy_sec = 0.0
+        self.last_latency_ms: Optional[float] = None
+        self.max_latency_ms: float = 0.0
+        self.last_items: Optional[int] = None
+        self.last_run_at: Optional[float] = None
+        self._started = time.monotonic()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _next_delay(self, n: Optional[int], failed: bool) -> float:
+        if failed or not n:
+            delay = self.interval * self._backoff
+            self._backoff = min(self._backoff * 2.0, self.max_backoff)
+            return delay
+        self._backoff = 1.0
+        if self.batch_size and n >= self.batch_size:
+            return 0.0
+        return self.interval
+
+    async def run_pass(self) -> int:
+        t0 = time.perf_counter()
+        failed = False
+        n: Optional[int] = None
+        try:
+            n = await self.worker.run_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            failed = True
+            self.errors += 1
+            log.warning("Worker %s raised: %r", self.name, e)
+
+        dt = time.perf_counter() - t0
+        n = int(n or 0)
+        self.passes += 1
+        self.items += n
+        self.busy_sec += dt
+        self.last_latency_ms = dt * 1000.0
+        self.max_latency_ms = max(self.max_latency_ms, self.last_latency_ms)
+        self.last_items = n
+        self.last_run_at = time.time()
+        if n == 0:
+            self.idle_passes += 1
+        elif self.batch_size and n >= self.batch_size:
+            self.full_batches += 1
+        return self._next_delay(n, failed)
+
+    async def _runner(self) -> None:
+        while True:
+            # clear before the pass: a wake() that lands while run_once is
+            # running must cut the following sleep short, not be dropped
+            self._wake.clear()
+            delay = await self.run_pass()
+            if delay <= 0:
+                await asyncio.sleep(0)  # yield, then go again
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                self._backoff = 1.0
+            except asyncio.TimeoutError:
+                pass
+
+    def tasks(self) -> List[asyncio.Task]:
+        return [
+            asyncio.create_task(self._runner(), name=f"{self.name}#{i}")
+            for i in range(self.concurrency)
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        uptime = max(time.monotonic() - self._started, 1e-9)
+        return {
+            "worker": self.name,
+            "interval_ms": int(self.interval * 1000),
+            "concurrency": self.concurrency,
+            "backoff": self._backoff,
+            "passes": self.passes,
+            "items": self.items,
+            "errors": self.errors,
+            "full_batches": self.full_batches,
+            "idle_passes": self.idle_passes,
+            "items_per_sec": self.items / uptime,
+            "avg_latency_ms": (self.busy_sec * 1000.0 / self.passes) if self.passes else None,
+            "last_latency_ms": self.last_latency_ms,
+            "max_latency_ms": self.max_latency_ms,
+            "last_items": self.last_items,
+            "last_run_at": self.last_run_at,
+        }
+
+
+class WorkerScheduler:
+    """
+    Owns one WorkerLoop per enabled worker and exposes their counters.
+
+    Every stats_log_sec the counters are logged and handed to publish_stats
+    (if given), e.g. to persist them where the API can read them.
+    """
+
+    def __init__(
+        self,
+        loops: List[WorkerLoop],
+        stats_log_sec: float = 60.0,
+        publish_stats: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        self.loops = loops
+        self.stats_log_sec = stats_log_sec
+        self.publish_stats = publish_stats
+
+    def get(self, name: str) -> Optional[WorkerLoop]:
+        for lp in self.loops:
+            if lp.name == name:
+                return lp
+        return None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [lp.snapshot() for lp in self.loops]
+
+    async def run_once(self) -> None:
+        """Single concurrent pass over every worker (for --once)."""
+        await asyncio.gather(*(lp.run_pass() for lp in self.loops))
+
+    async def _log_stats(self) -> None:
+        while True:
+            await asyncio.sleep(self.stats_log_sec)
+            stats = self.stats()
+            if self.publish_stats is not None:
+                try:
+                    await self.publish_stats(stats)
+                except Exception as e:
+                    log.warning("Publishing worker stats failed: %r", e)
+            for s in stats:
+                log.info(
+                    "[STATS] %s passes=%d items=%d errors=%d items/s=%.2f avg_ms=%s last_ms=%s backoff=%.1f",
+                    s["worker"], s["passes"], s["items"], s["errors"], s["items_per_sec"],
+                    f"{s['avg_latency_ms']:.1f}" if s["avg_latency_ms"] is not None else "-",
+                    f"{s['last_latency_ms']:.1f}" if s["last_latency_ms"] is not None else "-",
+                    s["backoff"],
+                )
+
+    async def run(self) -> None:
+        tasks: List[asyncio.Task] = []
+        for lp in self.loops:
+            tasks.extend(lp.tasks())
+        if self.stats_log_sec > 0:
+            tasks.append(asyncio.create_task(self._log_stats(), name="worker_stats"))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
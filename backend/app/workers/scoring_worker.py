@@ -1,103 +1,158 @@
 # backend/app/workers/scoring_worker.py
 import os
+import json
+import math
+from typing import Any, Dict, List
 from asyncpg import Pool
-from ..utils.db_helpers import fetch_all, upsert_one, update_heartbeat
+from ..utils.db_helpers import update_heartbeat
+from ..utils.work_claims import SHARD
+from ..services.compare_cache import publish_invalidation
+from ..services.baselines import BASELINE_KEYS, baseline_cache
+from ..services.creator_agg import record_rescored_pairs, record_scored_pairs
+from ..services.execution_score import (
+    SCORE_INPUTS,
+    SUBSCORES,
+    compute_subscores_batch,
+    finalize_score_batch,
+)
 
-BATCH = int(os.getenv("SCORING_BATCH_SIZE", "300"))
+BATCH = int(os.getenv("SCORING_BATCH_SIZE", "2000"))
 
-# We assume your existing compare view already exposes needed fields.
-# If your actual view name differs, adjust 'v_trade_compare' accordingly.
+# Scoring inputs per pair (names match execution_score.SCORE_INPUTS; inputs
+# not selected here, e.g. ROI, count as missing). Copy-side fees come from
+# the copy's trades_transactions row.
+# Unscored pairs are locked (skip locked) for the pass's transaction, so
+# concurrent scoring loops / processes take disjoint pairs. FAILED pairs
+# (no subscore computable) keep a null score but get an exec_status.
+# PARTIAL / FAILED pairs are claimed again once the copy's
+# trades_transactions row changes after they were scored (updated_at,
+# migration 0014), e.g. when fees / CU arrive late.
 COMPARE_ROWS = """
 select
   p.copy_trade_id,
-  p.source_trade_id,
+  p.exec_status                                                     as prev_status,
+  p.execution_score::float8                                         as prev_score,
+  cp.token_mint,
+  cp.wallet_target_id                                               as creator,
   p.delta_slots_event,
   p.delta_ms_event,
-  p.price_drift,
-  -- Placeholder; if your compare view has a real congestion metric, select it instead
-  0 as congestion_proxy
+  p.delta_slots_landed,
+  p.delta_ms_landed,
+  abs(p.price_drift)::float8                                        as price_drift_pct,
+  p.size_similarity::float8                                         as size_similarity,
+  p.route_similarity::float8                                        as route_similarity,
+  tx.tip_lamports::float8 / nullif(tx.cu_used, 0)                   as tip_per_cu,
+  (tx.priority_fee_lamports * 1e6 / nullif(tx.cu_used, 0))::float8  as cu_price_micro_lamports
 from trade_pairs p
-left join v_trade_compare c
-  on c.copy_id = p.copy_trade_id
-where p.execution_score is null
+join trades_ledger cp
+  on cp.id = p.copy_trade_id
+left join trades_transactions tx
+  on tx.tx_signature = cp.tx_signature
+where (
+    (p.execution_score is null and p.exec_status is null)
+    or (p.exec_status <> 'READY' and tx.updated_at > p.exec_ready_at)
+  )
+  and oculus_shard(p.copy_trade_id::text, $2) = $3   -- no per-mint state: shard by pair
 order by p.copy_trade_id
 limit $1
+for no key update of p skip locked
 """
 
-UPSERT_SCORE = """
-update trade_pairs
-set execution_score = $2::numeric,
-    exec_status = 'READY',
-    exec_subscores = jsonb_build_object(
-        'timing',    $3::numeric,
-        'financial', $4::numeric,
-        'cost',      $5::numeric,
-        'congestion',$6::numeric
-    ),
-    exec_inputs = jsonb_build_object(
-       'delta_slots', $7::integer,
-        'delta_ms',    $8::bigint,
-        'price_drift', $9::numeric
-    ),
-    exec_version = 'v1',
+# One statement for the whole batch
+UPDATE_SCORES = """
+update trade_pairs p
+set execution_score = s.score,
+    exec_status = s.status,
+    exec_subscores = s.subscores,
+    exec_inputs = s.inputs,
+    exec_version = 'v2',
     exec_ready_at = now(),
     exec_latency_ms = 0
-where copy_trade_id = $1
+from jsonb_to_recordset($1::jsonb) as s(
+  copy_trade_id int8,
+  score numeric,
+  status text,
+  subscores jsonb,
+  inputs jsonb
+)
+where p.copy_trade_id = s.copy_trade_id
 """
 
 
-def _score(delta_slots, delta_ms, price_drift, congestion_proxy):
-    """
-    Very light placeholder score function following your weighting plan.
-    You can refine this later with real heuristics or ML-based scoring.
-    Returns:
-      total_score, timing_score, financial_score, cost_score, congestion_score
-    """
-    # For now we ignore the inputs and just apply fixed weights
-    timing = 40.0
-    financial = 35.0
-    cost = 15.0
-    congestion = 10.0
-    total = timing + financial + cost + congestion
-    return total, timing, financial, cost, congestion
+def _num(v: float):
+    """NaN (missing) -> None for JSON."""
+    return None if math.isnan(v) else v
 
 
 class ScoringWorker:
     def __init__(self, db: Pool):
         self.db = db
 
+    @staticmethod
+    def _row_baselines(rows) -> Dict[str, List[Any]]:
+        """Per-row baseline columns from baseline_cache (one lookup per token/creator)."""
+        memo: Dict[Any, Dict[str, Any]] = {}
+        cols: Dict[str, List[Any]] = {k: [] for k in BASELINE_KEYS}
+        for r in rows:
+            scope = (r["token_mint"], r["creator"])
+            b = memo.get(scope)
+            if b is None:
+                b = memo[scope] = baseline_cache.get(*scope)
+            for k in BASELINE_KEYS:
+                cols[k].append(b[k])
+        return cols
+
     async def run_once(self) -> int:
         """
-        Pull a batch of unscored pairs from trade_pairs,
-        compute an execution score, and update each row.
+        Claim a batch of unscored pairs from trade_pairs, score the whole
+        batch column-wise (execution_score.compute_subscores_batch) against
+        each pair's token / creator baselines and write it back with one
+        bulk update in the claiming transaction, which also adds the pairs
+        to the per-creator day rollups (creator_agg; re-scored pairs only
+        move their score there). Newly scored pairs then feed the baseline
+        sketches.
         """
-        rows = await fetch_all(self.db, COMPARE_ROWS, BATCH)
-        scored = 0
+        await baseline_cache.warm(self.db)
+        scored: List[Dict[str, Any]] = []
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(COMPARE_ROWS, BATCH, *SHARD)
 
-        for r in rows:
-            total, t, f, c, cg = _score(
-                r["delta_slots_event"],
-                r["delta_ms_event"],
-                r["price_drift"],
-                r["congestion_proxy"],
-            )
+                if rows:
+                    cols = [k for k in SCORE_INPUTS if k in rows[0].keys()]
+                    batch = {k: [r[k] for r in rows] for k in cols}
+                    sub = compute_subscores_batch(batch, self._row_baselines(rows))
+                    final = finalize_score_batch(sub)
+
+                    sub_lists = {k: sub[k].tolist() for k in SUBSCORES}
+                    scores = final["score"].tolist()
+                    payload: List[Dict[str, Any]] = []
+                    for i, r in enumerate(rows):
+                        payload.append({
+                            "copy_trade_id": r["copy_trade_id"],
+                            "score": _num(scores[i]),
+                            "status": final["status"][i],
+                            "subscores": {k: _num(sub_lists[k][i]) for k in SUBSCORES},
+                            "inputs": {k: r[k] for k in cols if r[k] is not None},
+                        })
+                    await conn.execute(UPDATE_SCORES, json.dumps(payload))
+                    await record_scored_pairs(
+                        conn, [r["copy_trade_id"] for r in rows if r["prev_status"] is None]
+                    )
+                    rescored = [r for r in rows if r["prev_status"] is not None]
+                    await record_rescored_pairs(
+                        conn,
+                        [r["copy_trade_id"] for r in rescored],
+                        [r["prev_score"] for r in rescored],
+                    )
+                    # a pair already had its score observed if it had one
+                    scored = [
+                        dict(r) for i, r in enumerate(rows)
+                        if not math.isnan(scores[i]) and r["prev_score"] is None
+                    ]
 
-            await upsert_one(
-                self.db,
-                UPSERT_SCORE,
-                (
-                    r["copy_trade_id"],
-                    total,
-                    t,
-                    f,
-                    c,
-                    cg,
-                    r["delta_slots_event"],
-                    r["delta_ms_event"],
-                    r["price_drift"],
-                ),
-            )
-            scored += 1
+        baseline_cache.observe(scored)
 
+        await publish_invalidation(self.db, [r["copy_trade_id"] for r in rows])
         await update_heartbeat(self.db, "scoring_worker", len(rows))
-        return scored
+        return len(rows)
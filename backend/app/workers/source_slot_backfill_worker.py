@@ -8,9 +8,12 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import asyncpg
-import httpx
 
 from app.core.config import settings
+from app.services.source_index import source_index
+from app.utils.solana_rpc import SolanaRpcFetcher, get_fetcher, close_fetcher
+from app.utils.tx_cache import close_cache
+from app.utils.work_claims import SHARD, WORKER_ID, LEASE_SEC, release
 
 log = logging.getLogger("source_slot_backfill")
 
@@ -20,159 +23,162 @@ logging.basicConfig(
 )
 
 DB_DSN = os.getenv("DATABASE_URL")
-HELIUS_RPC_URL: str = settings.HELIUS_RPC_URL
 
 BATCH_SIZE = int(os.getenv("SOURCE_BACKFILL_BATCH_SIZE", "50"))
 IDLE_SLEEP_SECONDS = float(os.getenv("SOURCE_BACKFILL_SLEEP_SECONDS", "10.0"))
 
-
-async def fetch_tx_via_rpc(sig: str, client: httpx.AsyncClient) -> Optional[dict]:
-    """
-    Same RPC helper as in copy_slot_backfill, shared logic.
-    """
-    if not HELIUS_RPC_URL:
-        log.error("[SOURCE_SLOT] HELIUS_RPC_URL is not set; cannot fetch transactions.")
-        return None
-
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [
-            sig,
-            {
-                "encoding": "json",
-                "maxSupportedTransactionVersion": 0,
-            },
-        ],
-    }
-
-    try:
-        resp = await client.post(HELIUS_RPC_URL, json=payload, timeout=20.0)
-        resp.raise_for_status()
-    except Exception as e:
-        log.warning("[SOURCE_SLOT] RPC HTTP error for sig=%s: %r", sig, e)
-        return None
-
-    data = resp.json()
-    result = data.get("result")
-    if not result:
-        log.warning("[SOURCE_SLOT] getTransaction returned no result for sig=%s raw=%s", sig, data)
-        return None
-
-    return result
+# work_leases stage; signatures are leased for the getTransaction round trip
+# (literal in fetch_needing_backfill)
+STAGE = "source_slot_backfill"
 
 
 async def fetch_needing_backfill(pool: asyncpg.Pool) -> list[asyncpg.Record]:
     """
-    Find source_trades that:
-      - are actually referenced by trade_pairs (so they're real "creators" we care about)
-      - have a non-null tx_signature
+    Find and lease source_trades that:
+      - have a non-null tx_signature (paired or not: an unslotted source
+        is only a last-resort pairing candidate until it has a slot)
       - have event_slot NULL or 0 (placeholder)
+      - are in this process's shard and not leased by another worker
+    Candidates are picked with skip locked and leased in the same statement,
+    so concurrent backfill processes never select the same signatures.
     """
     async with pool.acquire() as conn:
         rows = await conn.fetch(
             """
-            select
-              st.id          as source_id,
-              st.tx_signature as tx_signature
-            from source_trades st
-            join trade_pairs tp
-              on tp.source_trade_id = st.id
-            where st.tx_signature is not null
-              and (st.event_slot is null or st.event_slot = 0)
-            order by st.event_ts
-            limit $1
+            with candidates as (
+              select
+                st.id          as source_id,
+                st.tx_signature as tx_signature,
+                st.token_mint  as token_mint,
+                st.side::text  as side,
+                st.event_ts    as event_ts
+              from source_trades st
+              where st.tx_signature is not null
+                and (st.event_slot is null or st.event_slot = 0)
+                and oculus_shard(st.token_mint, $2) = $3
+                and not exists (
+                  select 1
+                  from work_leases wl
+                  where wl.stage = 'source_slot_backfill'
+                    and wl.item_key = st.tx_signature
+                    and wl.expires_at > now()
+                )
+              order by st.event_ts
+              limit $1
+              for no key update of st skip locked
+            ),
+            leased as (
+              insert into work_leases (stage, item_key, owner, expires_at)
+              select 'source_slot_backfill', tx_signature, $4, now() + make_interval(secs => $5)
+              from candidates
+              on conflict (stage, item_key) do update
+              set owner = excluded.owner,
+                  expires_at = excluded.expires_at
+              where work_leases.expires_at <= now()
+              returning item_key
+            )
+            select c.source_id, c.tx_signature, c.token_mint, c.side
+            from candidates c
+            join leased l on l.item_key = c.tx_signature
+            order by c.event_ts
             """,
             BATCH_SIZE,
+            *SHARD,
+            WORKER_ID,
+            LEASE_SEC,
         )
     return rows
 
 
-async def process_batch(pool: asyncpg.Pool) -> int:
+UPDATE_SOURCE = """
+update source_trades
+set event_slot = coalesce(nullif(event_slot, 0), $2),
+    event_ts   = coalesce(event_ts, $3)
+where id = $1
+"""
+
+# Mirror into trades_transactions for that signature
+UPSERT_TX = """
+insert into trades_transactions (
+    tx_signature,
+    slot,
+    block_time,
+    cu_used,
+    raw
+)
+values ($1, $2, $3, $4, $5)
+on conflict (tx_signature) do update
+set slot       = excluded.slot,
+    block_time = excluded.block_time,
+    cu_used    = coalesce(excluded.cu_used, trades_transactions.cu_used),
+    raw        = excluded.raw
+"""
+
+
+async def process_batch(pool: asyncpg.Pool, fetcher: Optional[SolanaRpcFetcher] = None) -> int:
     rows = await fetch_needing_backfill(pool)
     if not rows:
         log.info("[SOURCE_SLOT] No more source trades needing backfill.")
         return 0
 
-    async with httpx.AsyncClient() as client:
-        updated = 0
-
-        for row in rows:
-            source_id = row["source_id"]
-            sig = row["tx_signature"]
-
-            if not sig:
-                log.info("[SOURCE_SLOT] Skip source_id=%s: tx_signature is NULL.", source_id)
-                continue
-
-            tx = await fetch_tx_via_rpc(sig, client)
-            if not tx:
-                log.info("[SOURCE_SLOT] Skip source_id=%s: getTransaction returned no data.", source_id)
-                continue
-
-            slot = tx.get("slot")
-            block_time = tx.get("blockTime")
-            block_ts = (
-                datetime.fromtimestamp(block_time, tz=timezone.utc)
-                if block_time
-                else None
-            )
-
-            meta = tx.get("meta") or {}
-            cu_used = meta.get("computeUnitsConsumed")
-            raw_json = json.dumps(tx)
-
-            async with pool.acquire() as conn:
-                # 1) Update the source_trades event_slot / event_ts
-                await conn.execute(
-                    """
-                    update source_trades
-                    set event_slot = coalesce(nullif(event_slot, 0), $2),
-                        event_ts   = coalesce(event_ts, $3)
-                    where id = $1
-                    """,
-                    source_id,
-                    slot,
-                    block_ts,
-                )
-
-                # 2) Optionally, also mirror into trades_transactions for that signature
-                await conn.execute(
-                    """
-                    insert into trades_transactions (
-                        tx_signature,
-                        slot,
-                        block_time,
-                        cu_used,
-                        raw
-                    )
-                    values ($1, $2, $3, $4, $5)
-                    on conflict (tx_signature) do update
-                    set slot       = excluded.slot,
-                        block_time = excluded.block_time,
-                        cu_used    = coalesce(excluded.cu_used, trades_transactions.cu_used),
-                        raw        = excluded.raw
-                    """,
-                    sig,
-                    slot,
-                    block_ts,
-                    cu_used,
-                    raw_json,
-                )
+    # all signatures of the batch in flight at once (shared rate limit)
+    fetcher = fetcher or get_fetcher()
+    txs = await fetcher.get_transactions(row["tx_signature"] for row in rows)
+
+    source_params = []
+    tx_params = []
+    resolved = []
+    for row in rows:
+        source_id = row["source_id"]
+        sig = row["tx_signature"]
+
+        if not sig:
+            log.info("[SOURCE_SLOT] Skip source_id=%s: tx_signature is NULL.", source_id)
+            continue
+
+        tx = txs.get(sig)
+        if not tx:
+            log.info("[SOURCE_SLOT] Skip source_id=%s: getTransaction returned no data.", source_id)
+            continue
+
+        slot = tx.get("slot")
+        block_time = tx.get("blockTime")
+        block_ts = (
+            datetime.fromtimestamp(block_time, tz=timezone.utc)
+            if block_time
+            else None
+        )
 
-            updated += 1
-            log.info(
-                "[SOURCE_SLOT] Updated source_id=%s sig=%s slot=%s",
-                source_id,
-                sig,
-                slot,
-            )
+        meta = tx.get("meta") or {}
+        cu_used = meta.get("computeUnitsConsumed")
+
+        source_params.append((source_id, slot, block_ts))
+        tx_params.append((sig, slot, block_ts, cu_used, json.dumps(tx)))
+        resolved.append((row, slot))
+
+    if source_params:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(UPDATE_SOURCE, source_params)
+                await conn.executemany(UPSERT_TX, tx_params)
+    # unresolved signatures keep their lease until it expires (retry delay)
+    await release(pool, STAGE, [p[0] for p in tx_params])
+
+    for row, slot in resolved:
+        # Move the source to its real slot in the pairing-side index
+        source_index.add(row["source_id"], row["token_mint"], row["side"], slot)
+        log.info(
+            "[SOURCE_SLOT] Updated source_id=%s sig=%s slot=%s",
+            row["source_id"],
+            row["tx_signature"],
+            slot,
+        )
 
     log.info(
-        "[SOURCE_SLOT] Batch complete. rows=%s updated=%s",
+        "[SOURCE_SLOT] Batch complete. rows=%s updated=%s rpc=%s",
         len(rows),
-        updated,
+        len(resolved),
+        fetcher.stats(),
     )
     return len(rows)
 
@@ -200,6 +206,8 @@ async def main() -> None:
             else:
                 await asyncio.sleep(1.0)
     finally:
+        await close_fetcher()
+        close_cache()
         await pool.close()
         log.info("[SOURCE_SLOT] Pool closed, shutting down.")
 
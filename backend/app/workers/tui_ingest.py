@@ -0,0 +1,361 @@
+# backend/app/workers/tui_ingest.py
+"""
+Sharp TUI log tailer -> creators / source_trades
+------------------------------------------------
+Follows the Sharp TUI log files (SHARP_TUI_LOG_GLOB, rotated files
+included) and turns creator trade lines into source_trades rows with no
+RPC involved:
+
+  - files are tracked by device/inode, so a rotated (renamed) file is
+    drained from its checkpoint and its successor starts at 0; a file
+    that shrinks (truncate) or whose first bytes changed (inode reuse)
+    is re-read from 0
+  - only complete lines are consumed; a partial last line waits for its
+    newline
+  - lines are parsed with precompiled patterns: `key=value` / `key: value`
+    tokens (creator, mint, side, slot, tip, cu_price, sig, route) plus an
+    optional leading ISO timestamp
+  - each tick's events are upserted in one transaction (creators, tokens,
+    source_trades) together with the new byte offsets, so a restart
+    resumes exactly after the last ingested line
+  - polls every TUI_TAIL_POLL_MS (stat() only while idle); a busy file is
+    re-read immediately
+
+  cd backend
+  DATABASE_URL=postgresql://... SHARP_TUI_LOG_GLOB='/var/log/sharp/*.log*' python -m app.workers.tui_ingest
+"""
+
+import os
+import re
+import glob
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.config import settings
+
+log = logging.getLogger("tui_ingest")
+
+logging.basicConfig(
+    level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+
+DB_DSN = os.getenv("DATABASE_URL")
+
+LOG_GLOB = os.getenv("SHARP_TUI_LOG_GLOB", "./logs/sharp*.log*")
+POLL_MS = int(os.getenv("TUI_TAIL_POLL_MS", "25"))
+READ_CHUNK_BYTES = int(os.getenv("TUI_TAIL_READ_BYTES", str(1 << 20)))
+FINGERPRINT_BYTES = 64
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+# key=value / key: value; a value is never itself the next `key=`
+_KV = re.compile(r"\b([A-Za-z_]+)\s*[=:]\s*\"?(?![A-Za-z_]+\s*[=:])([^\s,|\"]+)")
+_LEADING_TS = re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)")
+_SIDE_WORD = re.compile(r"\b(BUY|SELL)\b", re.IGNORECASE)
+_BASE58 = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,88}$")
+
+# canonical field -> keys accepted in the log line (lower-case)
+_KEYS: Dict[str, Tuple[str, ...]] = {
+    "creator": ("creator", "source", "source_wallet", "leader", "target"),
+    "mint": ("mint", "token", "token_mint"),
+    "side": ("side", "action"),
+    "slot": ("slot", "event_slot"),
+    "tip": ("tip", "tip_lamports", "jito_tip"),
+    # per-CU price only: a priority fee (lamports) or a CU count is not one
+    "cu_price": ("cu_price", "cu_price_micro_lamports"),
+    "sig": ("sig", "signature", "tx", "tx_signature"),
+    "route": ("route", "dex", "venue"),
+    "copy_wallet": ("copy_wallet", "wallet", "bot"),
+}
+_FIELD_BY_KEY = {k: field for field, keys in _KEYS.items() for k in keys}
+
+
+def _int(v: Optional[str]) -> Optional[int]:
+    if not v:
+        return None
+    try:
+        return int(v)
+    except ValueError:
+        return None
+
+
+def _lamports(v: Optional[str]) -> Optional[int]:
+    # integers are lamports; decimals are SOL
+    if not v:
+        return None
+    try:
+        return int(v) if v.isdigit() else int(round(float(v) * 1_000_000_000))
+    except ValueError:
+        return None
+
+
+def parse_line(line: str) -> Optional[Dict[str, Any]]:
+    """A source_trades row for a creator trade line, else None."""
+    fields: Dict[str, str] = {}
+    for key, value in _KV.findall(line):
+        field = _FIELD_BY_KEY.get(key.lower())
+        if field is not None and field not in fields:
+            fields[field] = value
+
+    creator, mint = fields.get("creator"), fields.get("mint")
+    if not creator or not mint or not _BASE58.match(creator) or not _BASE58.match(mint):
+        return None
+    side = fields.get("side")
+    if side is None:
+        m = _SIDE_WORD.search(line)
+        side = m.group(1) if m else None
+    side = side.upper() if side else None
+    if side not in ("BUY", "SELL"):
+        return None
+
+    ts = None
+    m = _LEADING_TS.match(line)
+    if m:
+        try:
+            ts = datetime.fromisoformat(m.group(1).replace("Z", "+00:00").replace(" ", "T"))
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+        except ValueError:
+            ts = None
+    sig = fields.get("sig")
+    sig = sig if sig and _BASE58.match(sig) else None
+    slot = _int(fields.get("slot"))
+    if not slot and sig is None:
+        # no slot and nothing to resolve one from: unpairable
+        return None
+
+    return {
+        "source_wallet_pubkey": creator,
+        "token_mint": mint,
+        "side": side,
+        # 0 = placeholder (signed lines only); source_slot_backfill resolves
+        # it from the signature
+        "event_slot": slot or 0,
+        "event_ts": (ts or datetime.now(timezone.utc)).isoformat(),
+        "tip_lamports": _lamports(fields.get("tip")),
+        "cu_price_micro_lamports": _int(fields.get("cu_price")),
+        "tx_signature": sig,
+        "route": fields.get("route"),
+        "copy_wallet_label": fields.get("copy_wallet"),
+    }
+
+
+# ----------------------------------------------------------------------
+# SQL
+# ----------------------------------------------------------------------
+READ_OFFSETS = "select file_id, fingerprint, byte_offset from tui_log_offsets"
+
+WRITE_OFFSETS = """
+insert into tui_log_offsets (file_id, path, fingerprint, byte_offset)
+select o.file_id, o.path, o.fingerprint, o.byte_offset
+from jsonb_to_recordset($1::jsonb) as o(file_id text, path text, fingerprint text, byte_offset int8)
+on conflict (file_id) do update set
+  path = excluded.path,
+  fingerprint = excluded.fingerprint,
+  byte_offset = excluded.byte_offset,
+  updated_at = now()
+"""
+
+ENSURE_CREATORS = """
+insert into creators (source_wallet_pubkey, last_seen_at)
+select distinct on (e.source_wallet_pubkey) e.source_wallet_pubkey, e.event_ts
+from jsonb_to_recordset($1::jsonb) as e(source_wallet_pubkey text, event_ts timestamptz)
+order by e.source_wallet_pubkey, e.event_ts desc
+on conflict (source_wallet_pubkey) do update
+set last_seen_at = greatest(creators.last_seen_at, excluded.last_seen_at)
+"""
+
+ENSURE_TOKENS = """
+insert into tokens (token_mint)
+select distinct e.token_mint
+from jsonb_to_recordset($1::jsonb) as e(token_mint text)
+on conflict do nothing
+"""
+
+# Signed events are keyed on tx_signature (last one in the batch wins);
+# unsigned ones are plain inserts, made exactly-once by the offset commit.
+UPSERT_SOURCE_TRADES = """
+with e as (
+  select *
+  from jsonb_to_recordset($1::jsonb) as e(
+    n int, source_wallet_pubkey text, token_mint text, side trade_side,
+    event_slot int8, event_ts timestamptz, tip_lamports int8,
+    cu_price_micro_lamports int8, tx_signature text, route text, copy_wallet_label text
+  )
+),
+signed as (
+  select distinct on (tx_signature) * from e
+  where tx_signature is not null
+  order by tx_signature, n desc
+)
+insert into source_trades (
+  source_wallet_pubkey, token_mint, side, event_slot, event_ts, tip_lamports,
+  cu_price_micro_lamports, tx_signature, route, copy_wallet_label
+)
+select source_wallet_pubkey, token_mint, side, event_slot, event_ts, tip_lamports,
+       cu_price_micro_lamports, tx_signature, route, copy_wallet_label
+from (select * from signed union all select * from e where tx_signature is null) x
+on conflict (tx_signature) do update set
+  event_slot = coalesce(nullif(excluded.event_slot, 0), source_trades.event_slot),
+  tip_lamports = coalesce(excluded.tip_lamports, source_trades.tip_lamports),
+  cu_price_micro_lamports = coalesce(excluded.cu_price_micro_lamports, source_trades.cu_price_micro_lamports),
+  route = coalesce(excluded.route, source_trades.route)
+"""
+
+
+# ----------------------------------------------------------------------
+# Tailer
+# ----------------------------------------------------------------------
+class _File:
+    __slots__ = ("file_id", "path", "fingerprint", "offset")
+
+    def __init__(self, file_id: str, path: str, fingerprint: str, offset: int):
+        self.file_id = file_id
+        self.path = path
+        self.fingerprint = fingerprint
+        self.offset = offset
+
+
+def _fingerprint(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(FINGERPRINT_BYTES)
+    except OSError:
+        return None
+    return hashlib.sha1(head).hexdigest() if len(head) == FINGERPRINT_BYTES else None
+
+
+class TuiLogTailer:
+    def __init__(self, pool: asyncpg.Pool, pattern: str = LOG_GLOB):
+        self.pool = pool
+        self.pattern = pattern
+        self.files: Dict[str, _File] = {}
+        self._saved: Dict[str, Tuple[str, int]] = {}
+        self.lines = 0
+        self.events = 0
+
+    async def load_offsets(self) -> None:
+        rows = await self.pool.fetch(READ_OFFSETS)
+        self._saved = {r["file_id"]: (r["fingerprint"], r["byte_offset"]) for r in rows}
+        log.info("[TUI_INGEST] %d checkpoints loaded", len(self._saved))
+
+    def _discover(self) -> List[Tuple[_File, int]]:
+        """(tracked file, current size) for every file with unread bytes."""
+        out = []
+        seen = set()
+        for path in glob.glob(self.pattern):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            file_id = f"{st.st_dev}:{st.st_ino}"
+            f = self.files.get(file_id)
+            if f is None:
+                # wait for enough bytes to fingerprint the file
+                fp = _fingerprint(path)
+                if fp is None:
+                    continue
+                saved_fp, saved_off = self._saved.get(file_id, (None, 0))
+                f = _File(file_id, path, fp, saved_off if saved_fp == fp else 0)
+                self.files[file_id] = f
+            f.path = path
+            seen.add(file_id)
+            if st.st_size < f.offset:
+                log.warning("[TUI_INGEST] %s shrank (%d < %d); re-reading from 0", path, st.st_size, f.offset)
+                f.offset = 0
+                f.fingerprint = _fingerprint(path) or f.fingerprint
+            if st.st_size > f.offset:
+                out.append((f, st.st_size))
+        # rotated out of the glob / deleted
+        for file_id in [k for k in self.files if k not in seen]:
+            del self.files[file_id]
+        return out
+
+    @staticmethod
+    def _read(f: _File) -> Tuple[List[str], int]:
+        """Complete lines from f.offset (up to READ_CHUNK_BYTES) and the new offset."""
+        with open(f.path, "rb") as fh:
+            fh.seek(f.offset)
+            data = fh.read(READ_CHUNK_BYTES)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return [], f.offset
+        return data[: end + 1].decode("utf-8", "replace").splitlines(), f.offset + end + 1
+
+    async def tick(self) -> int:
+        """Ingest everything currently readable. Returns lines consumed."""
+        events: List[Dict[str, Any]] = []
+        moved: List[Tuple[_File, int]] = []
+        consumed = 0
+        for f, _size in self._discover():
+            lines, new_offset = self._read(f)
+            if new_offset == f.offset:
+                continue  # only a partial line so far
+            for line in lines:
+                evt = parse_line(line)
+                if evt is not None:
+                    evt["n"] = len(events)
+                    events.append(evt)
+            consumed += len(lines)
+            moved.append((f, new_offset))
+
+        if not moved:
+            return 0
+
+        offsets = json.dumps([
+            {"file_id": f.file_id, "path": f.path, "fingerprint": f.fingerprint, "byte_offset": off}
+            for f, off in moved
+        ])
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if events:
+                    payload = json.dumps(events)
+                    await conn.execute(ENSURE_CREATORS, payload)
+                    await conn.execute(ENSURE_TOKENS, payload)
+                    await conn.execute(UPSERT_SOURCE_TRADES, payload)
+                await conn.execute(WRITE_OFFSETS, offsets)
+
+        # only advance in memory once the transaction committed
+        for f, off in moved:
+            f.offset = off
+        self.lines += consumed
+        self.events += len(events)
+        if events:
+            log.info("[TUI_INGEST] +%d source trades from %d lines", len(events), consumed)
+        return consumed
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        await self.load_offsets()
+        log.info("[TUI_INGEST] tailing %s (poll %sms)", self.pattern, POLL_MS)
+        while stop is None or not stop.is_set():
+            try:
+                consumed = await self.tick()
+            except Exception as e:
+                log.exception("[TUI_INGEST] tick error: %r", e)
+                consumed = 0
+            if not consumed:
+                await asyncio.sleep(POLL_MS / 1000.0)
+
+
+async def main() -> None:
+    if not DB_DSN:
+        raise RuntimeError("DATABASE_URL not set in environment.")
+
+    pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=2, statement_cache_size=0)
+    try:
+        await TuiLogTailer(pool).run()
+    finally:
+        await pool.close()
+        log.info("[TUI_INGEST] Pool closed, shutting down.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -36,8 +36,16 @@ from .normalizer_creator import NormalizerCreator
 from .pairing_worker import PairingWorker
 from .ladder_worker import LadderWorker
 from .scoring_worker import ScoringWorker
-from .creator_intel_worker import CreatorIntelWorker
+from .creator_intel_worker import CreatorIntelWorker, CreatorIntelJobs
 from .alerts_worker import AlertsWorker
+from .scheduler import WorkerLoop, WorkerScheduler
+from ..services.pg_notify import PgNotifyListener, CH_TRADES_LEDGER, CH_SOURCE_TRADES, CH_TRADE_PAIRS
+from ..utils.helius_client import HeliusClient
+from ..utils.db_helpers import publish_worker_stats
+from ..utils.tx_cache import close_cache
+from ..utils.work_claims import WORKER_ID, SHARD_COUNT, SHARD_INDEX
+from . import normalizer_copy, normalizer_creator, ladder_worker, scoring_worker
+from ..jobs import creator_intel_worker as intel_jobs
 
 log = logging.getLogger("worker_manager")
 logging.basicConfig(
@@ -57,6 +65,60 @@ FEATURE_WORKER_CREATOR_INTEL      = _flag("FEATURE_WORKER_CREATOR_INTEL", True)
 FEATURE_WORKER_ALERTS             = _flag("FEATURE_WORKER_ALERTS", True)
 
 DEFAULT_INTERVAL_SEC = float(getattr(settings, "WORKER_LOOP_INTERVAL_SEC", 2.0))
+MAX_BACKOFF = float(getattr(settings, "WORKER_MAX_BACKOFF", 8.0))
+STATS_LOG_SEC = float(getattr(settings, "WORKER_STATS_LOG_SEC", 60.0))
+
+# Scheduler for the current process (None until run() builds it)
+scheduler: Optional[WorkerScheduler] = None
+
+
+def _interval_ms(name: str, default_sec: float) -> int:
+    return int(getattr(settings, name, None) or default_sec * 1000)
+
+
+def _concurrency(prefix: str) -> int:
+    default = int(getattr(settings, "WORKER_CONCURRENCY", 1))
+    return int(os.getenv(f"{prefix}_CONCURRENCY", default))
+
+
+def _loop(worker, prefix: str, interval_setting: str, batch_size: Optional[int], default_sec: float) -> WorkerLoop:
+    return WorkerLoop(
+        worker,
+        interval_ms=_interval_ms(interval_setting, default_sec),
+        batch_size=batch_size,
+        concurrency=_concurrency(prefix),
+        max_backoff=MAX_BACKOFF,
+    )
+
+
+# Which worker loops each NOTIFY channel wakes
+NOTIFY_WAKES = {
+    CH_TRADES_LEDGER: ("NormalizerCreator", "PairingWorker"),
+    CH_SOURCE_TRADES: ("PairingWorker",),
+    CH_TRADE_PAIRS:   ("LadderWorker", "ScoringWorker", "AlertsWorker", "CreatorIntelWorker"),
+}
+
+
+def _notify_listener(dsn: str, sched: WorkerScheduler) -> PgNotifyListener:
+    listener = PgNotifyListener(dsn)
+    for channel, names in NOTIFY_WAKES.items():
+        for name in names:
+            lp = sched.get(name)
+            if lp is not None:
+                listener.on(channel, lambda _ch, _payload, lp=lp: lp.wake())
+    return listener
+
+
+def stats() -> list:
+    """Per-worker latency / throughput counters for this process."""
+    return scheduler.stats() if scheduler is not None else []
+
+
+def _stats_publisher(db: Pool):
+    """Persists this process's counters to its heartbeat row (migration 0013)."""
+    async def _publish(snapshot: list) -> None:
+        await publish_worker_stats(db, f"worker_manager:{WORKER_ID}", snapshot)
+    return _publish
 
 def _resolve_dsn() -> Optional[str]:
     # Preferred → fallbacks → settings
@@ -96,45 +158,83 @@ async def run(
         db = await asyncpg.create_pool(
             dsn=dsn,
             min_size=1,
-            max_size=5,
+            max_size=int(os.getenv("WORKER_POOL_MAX_SIZE", "10")),  # workers now run concurrently
             statement_cache_size=0,          # <— key line
         )
         created_pool_here = True
         log.info("Worker manager connected to database (pool created).")
 
-    workers = []
-    if FEATURE_WORKER_NORMALIZER_COPY:    workers.append(NormalizerCopy(db))
-    if FEATURE_WORKER_NORMALIZER_CREATOR: workers.append(NormalizerCreator(db))
-    if FEATURE_WORKER_PAIRING:            workers.append(PairingWorker(db))
-    if FEATURE_WORKER_LADDER:             workers.append(LadderWorker(db))
-    if FEATURE_WORKER_SCORING:            workers.append(ScoringWorker(db))
-    if FEATURE_WORKER_CREATOR_INTEL:      workers.append(CreatorIntelWorker(db))
-    if FEATURE_WORKER_ALERTS:             workers.append(AlertsWorker(db))
+    # one pooled Helius client: per-endpoint limits apply across both normalizers
+    helius: Optional[HeliusClient] = None
+    if FEATURE_WORKER_NORMALIZER_COPY or FEATURE_WORKER_NORMALIZER_CREATOR:
+        helius = HeliusClient()
+
+    loops = []
+    if FEATURE_WORKER_NORMALIZER_COPY:
+        loops.append(_loop(NormalizerCopy(db, helius), "NORMALIZER_COPY", "NORMALIZER_COPY_INTERVAL_MS",
+                           normalizer_copy.PAIR_BATCH, interval_sec))
+    if FEATURE_WORKER_NORMALIZER_CREATOR:
+        loops.append(_loop(NormalizerCreator(db, helius), "NORMALIZER_CREATOR", "NORMALIZER_CREATOR_INTERVAL_MS",
+                           normalizer_creator.BATCH, interval_sec))
+    if FEATURE_WORKER_PAIRING:
+        pairing = PairingWorker(db)
+        loops.append(_loop(pairing, "PAIRING", "PAIRING_INTERVAL_MS", pairing.batch, interval_sec))
+    if FEATURE_WORKER_LADDER:
+        loops.append(_loop(LadderWorker(db), "LADDER", "LADDER_INTERVAL_MS",
+                           ladder_worker.BATCH, interval_sec))
+    if FEATURE_WORKER_SCORING:
+        loops.append(_loop(ScoringWorker(db), "SCORING", "SCORING_INTERVAL_MS",
+                           scoring_worker.BATCH, interval_sec))
+    if FEATURE_WORKER_CREATOR_INTEL:
+        loops.append(_loop(CreatorIntelWorker(db), "CREATOR_INTEL", "CREATOR_INTEL_INTERVAL_MS",
+                           None, interval_sec))  # one pass covers every creator with new pairs
+        # drains the queue the pass above fills (recompute_creator per creator)
+        loops.append(_loop(CreatorIntelJobs(db), "CREATOR_INTEL_JOBS", "CREATOR_INTEL_JOBS_INTERVAL_MS",
+                           intel_jobs.JOB_BATCH, interval_sec))
+    if FEATURE_WORKER_ALERTS:
+        alerts = AlertsWorker(db)
+        loops.append(_loop(alerts, "ALERTS", "ALERTS_INTERVAL_MS", alerts.batch, interval_sec))
+
+    global scheduler
+    scheduler = WorkerScheduler(
+        loops,
+        stats_log_sec=STATS_LOG_SEC,
+        publish_stats=None if once else _stats_publisher(db),
+    )
+
+    names = ", ".join(
+        f"{lp.name}({int(lp.interval * 1000)}ms x{lp.concurrency})" for lp in loops
+    ) or "<none>"
+    log.info("Worker manager started (once=%s). Enabled workers: %s", once, names)
+    log.info("Worker id %s, shard %d/%d (WORKER_SHARD_INDEX/WORKER_SHARD_COUNT).",
+             WORKER_ID, SHARD_INDEX, SHARD_COUNT)
 
-    names = ", ".join([w.__class__.__name__ for w in workers]) or "<none>"
-    log.info("Worker manager started (interval=%.2fs, once=%s). Enabled workers: %s",
-             interval_sec, once, names)
+    listener_task: Optional[asyncio.Task] = None
+    notify_dsn = getattr(settings, "NOTIFY_DSN", None) or _resolve_dsn()
+    if not once and getattr(settings, "PIPELINE_NOTIFY_ENABLED", False) and notify_dsn:
+        listener_task = asyncio.create_task(_notify_listener(notify_dsn, scheduler).run())
+        log.info("Pipeline NOTIFY wake-ups enabled; polling remains as fallback sweep.")
 
     try:
-        while True:
-            for w in workers:
-                try:
-                    await w.run_once()
-                except asyncio.CancelledError:
-                    raise
-                except Exception as e:
-                    log.warning("Worker %s raised: %r", w.__class__.__name__, e)
-            if once:
-                break
-            await asyncio.sleep(interval_sec)
+        if once:
+            await scheduler.run_once()
+        else:
+            await scheduler.run()
     finally:
+        if listener_task is not None:
+            listener_task.cancel()
+            await asyncio.gather(listener_task, return_exceptions=True)
+        if helius is not None:
+            await helius.aclose()
+        close_cache()
         if created_pool_here and db is not None:
             await db.close()
             log.info("Worker manager pool closed.")
 
 def _parse_args(argv=None):
     p = argparse.ArgumentParser(description="Oculus Worker Manager")
-    p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SEC, help="Loop interval seconds (default: %(default)s)")
+    p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SEC,
+                   help="Fallback interval seconds for workers without a *_INTERVAL_MS setting (default: %(default)s)")
     p.add_argument("--once", action="store_true", help="Run a single pass and exit")
     return p.parse_args(argv)
 
@@ -0,0 +1,143 @@
+# backend/benchmarks/bench_rpc_batch.py
+"""
+getTransaction fetch benchmark: per-signature vs JSON-RPC batches
+-----------------------------------------------------------------
+Starts a local mock Solana RPC server (plain asyncio HTTP/1.1, keep-alive)
+that charges a fixed round-trip per POST plus a small cost per call, and
+fails a fraction of individual calls with a retryable -32005 error. Then
+fetches the same signatures through SolanaRpcFetcher with different batch
+sizes (1 = one POST per signature, the previous behaviour) and reports
+throughput, POSTs sent and how many signatures were re-queued.
+
+No external RPC or database is touched:
+
+  cd backend
+  DATABASE_URL=postgresql://unused python -m benchmarks.bench_rpc_batch --sigs 2000 --batch-sizes 1,10,50,100
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List
+
+from app.utils.solana_rpc import SolanaRpcFetcher
+
+
+class MockRpc:
+    def __init__(self, rtt_ms: float, per_call_ms: float, fail_rate: float, seed: int = 7):
+        self.rtt = rtt_ms / 1000.0
+        self.per_call = per_call_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.posts = 0
+        self.calls = 0
+
+    def _answer(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        if self.rng.random() < self.fail_rate:
+            return {"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32005, "message": "Node is behind"}}
+        sig = req["params"][0]
+        return {
+            "jsonrpc": "2.0",
+            "id": req["id"],
+            "result": {
+                "slot": 300_000_000 + (hash(sig) & 0xFFFF),
+                "blockTime": 1_735_689_600,
+                "meta": {"computeUnitsConsumed": 52_000, "fee": 5000},
+                "transaction": {"signatures": [sig]},
+            },
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = json.loads(await reader.readexactly(length))
+                self.posts += 1
+                n = len(body) if isinstance(body, list) else 1
+                await asyncio.sleep(self.rtt + self.per_call * n)
+                out = [self._answer(r) for r in body] if isinstance(body, list) else self._answer(body)
+                data = json.dumps(out).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def run(batch_size: int, sigs: List[str], args) -> Dict[str, Any]:
+    mock = MockRpc(args.rtt_ms, args.per_call_ms, args.fail_rate)
+    url = await mock.start()
+    fetcher = SolanaRpcFetcher(
+        url,
+        rps=args.rps,
+        burst=args.rps,
+        concurrency=args.concurrency,
+        max_retries=8,
+        batch_size=batch_size,
+    )
+    try:
+        t0 = time.perf_counter()
+        out = await fetcher.get_transactions(sigs)
+        elapsed = time.perf_counter() - t0
+    finally:
+        await fetcher.aclose()
+        await mock.stop()
+    return {
+        "elapsed": elapsed,
+        "ok": sum(1 for v in out.values() if v),
+        "posts": mock.posts,
+        "calls": mock.calls,
+        "retries": fetcher.retries,
+    }
+
+
+async def main(args) -> None:
+    sigs = [f"sig{i:06d}" + "x" * 80 for i in range(args.sigs)]
+    print(
+        f"{'batch':>5} {'elapsed_s':>9} {'sigs/s':>9} {'ok':>11} "
+        f"{'posts':>6} {'calls':>6} {'requeued':>8}"
+    )
+    for size in args.batch_sizes:
+        r = await run(size, sigs, args)
+        print(
+            f"{size:>5} {r['elapsed']:>9.2f} {len(sigs) / r['elapsed']:>9.0f} "
+            f"{r['ok']:>5}/{len(sigs):<5} {r['posts']:>6} {r['calls']:>6} {r['retries']:>8}"
+        )
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description="getTransaction per-signature vs batch benchmark")
+    p.add_argument("--sigs", type=int, default=2000)
+    p.add_argument("--batch-sizes", default="1,10,50,100",
+                   type=lambda v: [int(x) for x in v.split(",") if x.strip()])
+    p.add_argument("--concurrency", type=int, default=16, help="POSTs in flight")
+    p.add_argument("--rps", type=float, default=100000.0, help="Token bucket (calls/sec)")
+    p.add_argument("--rtt-ms", type=float, default=40.0, help="Mock latency per POST")
+    p.add_argument("--per-call-ms", type=float, default=0.2, help="Mock latency per call in a POST")
+    p.add_argument("--fail-rate", type=float, default=0.02, help="Share of calls failing with -32005")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args(sys.argv[1:])))
@@ -0,0 +1,172 @@
+# backend/benchmarks/bench_sse_fanout.py
+"""
+SSE fan-out benchmark
+---------------------
+Attaches N in-process subscribers to a bus and publishes trade-sized events
+at a fixed rate, measuring:
+
+  - publish_us: time spent inside publish() per event (what db_stream pays)
+  - deliver_ms: publish -> frame handed to the subscriber's response writer
+
+"ring" is the current EventBus (one pre-encoded frame in a shared ring,
+per-client cursors); "queue" is the previous design (one asyncio.Queue per
+subscriber, awaited put per subscriber, per-client framing, 1s wake-ups),
+kept here only for comparison. --slow adds subscribers that stall on every
+chunk, to show the publisher is not held back by them.
+
+  cd backend
+  DATABASE_URL=postgresql://unused python -m benchmarks.bench_sse_fanout --clients 1000 --events 200 --rate 50 --slow 5
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import json
+from typing import AsyncIterator, Dict, List
+
+from app.services.bus import EventBus
+
+
+class QueueBus:
+    """The pre-ring EventBus (Queue per subscriber), for comparison only."""
+
+    def __init__(self, buffer_limit: int = 1000):
+        self._subscribers: Dict[str, asyncio.Queue] = {}
+        self._buffer_limit = buffer_limit
+        self._lock = asyncio.Lock()
+
+    async def publish(self, payload: Dict) -> None:
+        msg = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        for q in list(self._subscribers.values()):
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            await q.put(msg)
+
+    async def sse_stream(self, subscriber_id: str, heartbeat_seconds: int) -> AsyncIterator[bytes]:
+        async with self._lock:
+            q: asyncio.Queue = asyncio.Queue(maxsize=self._buffer_limit)
+            self._subscribers[subscriber_id] = q
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), timeout=1.0)
+                    yield f"data: {msg}\n\n".encode("utf-8")
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            async with self._lock:
+                self._subscribers.pop(subscriber_id, None)
+
+
+def _event(i: int) -> Dict:
+    return {
+        "type": "trade",
+        "wallet": f"Wallet{i % 40}",
+        "action": "BUY" if i % 3 else "SELL",
+        "token": f"MINT{i % 200:04d}xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
+        "creator": f"Creator{i % 60}",
+        "ts": "2025-01-01T00:00:00Z",
+        "execution_score": 50 + i % 50,
+        "source_slot": 300_000_000 + i,
+        "copy_slot": 300_000_003 + i,
+    }
+
+
+async def _subscriber(bus, cid: str, sent_at: List[float], out: List[float], stall: float) -> None:
+    k = 0  # data frames received == seq of the next frame (no lag expected for fast clients)
+    async for chunk in bus.sse_stream(cid, heartbeat_seconds=3600):
+        now = time.perf_counter()
+        n = chunk.count(b"data: ")
+        if chunk.startswith(b"event: lag"):
+            n -= 1
+            k = len(sent_at) - n
+        for j in range(k, k + n):
+            if j < len(sent_at):
+                out.append((now - sent_at[j]) * 1000.0)
+        k += n
+        if stall:
+            await asyncio.sleep(stall)
+
+
+async def run(mode: str, clients: int, events: int, rate: float, slow: int) -> Dict[str, float]:
+    bus = EventBus(buffer_limit=1000) if mode == "ring" else QueueBus(buffer_limit=1000)
+    sent_at: List[float] = []
+    latencies: List[float] = []
+    slow_lat: List[float] = []
+    tasks = [
+        asyncio.create_task(_subscriber(bus, f"c{i}", sent_at, latencies, 0.0))
+        for i in range(clients)
+    ]
+    tasks += [
+        asyncio.create_task(_subscriber(bus, f"s{i}", sent_at, slow_lat, 0.5))
+        for i in range(slow)
+    ]
+    await asyncio.sleep(0.2)  # let everyone subscribe
+
+    publish_us: List[float] = []
+    gap = 1.0 / rate
+    t_start = time.perf_counter()
+    cpu0 = time.process_time()
+    for i in range(events):
+        sent_at.append(time.perf_counter())
+        t0 = time.perf_counter()
+        await bus.publish(_event(i))
+        publish_us.append((time.perf_counter() - t0) * 1e6)
+        next_at = t_start + (i + 1) * gap
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    await asyncio.sleep(0.5)  # drain
+    cpu = time.process_time() - cpu0
+
+    # wait_for() in the queue design can swallow a cancel that races a
+    # delivery, so keep cancelling until every subscriber is gone
+    pending = set(tasks)
+    while pending:
+        for t in pending:
+            t.cancel()
+        _, pending = await asyncio.wait(pending, timeout=1.0)
+
+    s = sorted(latencies) or [0.0]
+    return {
+        "publish_us_p50": statistics.median(publish_us),
+        "publish_us_max": max(publish_us),
+        "deliver_ms_p50": s[len(s) // 2],
+        "deliver_ms_p99": s[min(len(s) - 1, int(len(s) * 0.99))],
+        "delivered": len(latencies),
+        "expected": clients * events,
+        "cpu_s": cpu,
+    }
+
+
+async def main(modes: List[str], clients: int, events: int, rate: float, slow: int) -> None:
+    print(
+        f"{'mode':<6} {'clients':>7} {'pub_us_p50':>10} {'pub_us_max':>10} "
+        f"{'dlv_ms_p50':>10} {'dlv_ms_p99':>10} {'delivered':>12} {'cpu_s':>7}"
+    )
+    for mode in modes:
+        r = await run(mode, clients, events, rate, slow)
+        print(
+            f"{mode:<6} {clients:>7} {r['publish_us_p50']:>10.1f} {r['publish_us_max']:>10.1f} "
+            f"{r['deliver_ms_p50']:>10.2f} {r['deliver_ms_p99']:>10.2f} "
+            f"{r['delivered']:>6}/{r['expected']:<6} {r['cpu_s']:>7.2f}"
+        )
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description="SSE fan-out benchmark")
+    p.add_argument("--clients", type=int, default=1000)
+    p.add_argument("--events", type=int, default=200)
+    p.add_argument("--rate", type=float, default=50.0, help="Events per second")
+    p.add_argument("--slow", type=int, default=0, help="Extra subscribers stalling 500ms per chunk")
+    p.add_argument("--modes", default="queue,ring", help="Comma-separated modes (queue,ring)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = _parse_args(sys.argv[1:])
+    asyncio.run(main([m.strip() for m in args.modes.split(",") if m.strip()],
+                     args.clients, args.events, args.rate, args.slow))
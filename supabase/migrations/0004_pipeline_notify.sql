@@ -0,0 +1,57 @@
+-- Pipeline wake-ups: NOTIFY on writes to the trade tables so workers and the
+-- SSE stream react immediately instead of waiting for their next poll.
+-- Statement-level triggers: one notification per statement, and Postgres
+-- collapses identical payloads within a transaction.
+-- Statements that touched no rows (e.g. an idle promote pass) do not
+-- notify: a trigger only sees its own statement's rows through the
+-- new_rows transition table, and transition tables cover a single event,
+-- hence one insert and one update trigger per table.
+-- Channels: oculus_trades_ledger, oculus_source_trades, oculus_trade_pairs
+
+create or replace function public.tg_oculus_notify()
+returns trigger language plpgsql as $$
+begin
+  if exists (select 1 from new_rows) then
+    perform pg_notify('oculus_' || tg_table_name, lower(tg_op));
+  end if;
+  return null;
+end $$;
+
+drop trigger if exists trg_trades_ledger_notify on public.trades_ledger;
+drop trigger if exists trg_trades_ledger_notify_ins on public.trades_ledger;
+create trigger trg_trades_ledger_notify_ins
+after insert on public.trades_ledger
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
+
+drop trigger if exists trg_trades_ledger_notify_upd on public.trades_ledger;
+create trigger trg_trades_ledger_notify_upd
+after update on public.trades_ledger
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
+
+drop trigger if exists trg_source_trades_notify on public.source_trades;
+drop trigger if exists trg_source_trades_notify_ins on public.source_trades;
+create trigger trg_source_trades_notify_ins
+after insert on public.source_trades
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
+
+drop trigger if exists trg_source_trades_notify_upd on public.source_trades;
+create trigger trg_source_trades_notify_upd
+after update on public.source_trades
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
+
+drop trigger if exists trg_trade_pairs_notify on public.trade_pairs;
+drop trigger if exists trg_trade_pairs_notify_ins on public.trade_pairs;
+create trigger trg_trade_pairs_notify_ins
+after insert on public.trade_pairs
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
+
+drop trigger if exists trg_trade_pairs_notify_upd on public.trade_pairs;
+create trigger trg_trade_pairs_notify_upd
+after update on public.trade_pairs
+referencing new table as new_rows
+for each statement execute function public.tg_oculus_notify();
@@ -0,0 +1,9 @@
+-- Persisted read cursor for the API's DB stream driver (services/db_stream.py).
+-- One row per stream; the driver upserts once per tick and never moves a
+-- cursor backwards.
+
+create table if not exists public.oculus_cursor (
+  stream_key   text primary key,
+  last_seen_id bigint not null default 0,
+  updated_at   timestamptz not null default now()
+);
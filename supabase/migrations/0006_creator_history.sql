@@ -0,0 +1,33 @@
+-- Creator address-history scanner (NormalizerCreator, services/creator_history.py).
+-- creator_scan_state holds the per-creator high-water mark (newest signature
+-- seen) and low-water mark (oldest signature reached when paging back), so a
+-- creator's history is downloaded once and then only incrementally.
+-- A catch-up to the high-water mark that runs out of pages keeps its paging
+-- cursor (catchup_before) and the head it started at (catchup_head_*), so
+-- the next pass resumes it instead of starting over from the head.
+-- creator_history is the compact (signature, slot) index the scanned pages
+-- are matched against; full transactions live in the workers' tx cache.
+
+create table if not exists public.creator_scan_state (
+  creator_pubkey    text primary key,
+  newest_signature  text,
+  newest_slot       int8,
+  oldest_signature  text,
+  oldest_slot       int8,
+  history_complete  boolean not null default false,  -- paged back to the first tx
+  catchup_before          text,   -- unfinished catch-up: page before this signature
+  catchup_head_signature  text,   -- ... and the head it started from
+  catchup_head_slot       int8,
+  updated_at        timestamptz not null default now()
+);
+
+create table if not exists public.creator_history (
+  creator_pubkey  text not null,
+  signature       text not null,
+  slot            int8 not null,
+  block_time      int8,
+  primary key (creator_pubkey, signature)
+);
+
+create index if not exists creator_history_slot_idx
+  on public.creator_history (creator_pubkey, slot);
@@ -0,0 +1,8 @@
+-- One ledger row per copy-trade signature, so bulk CSV ingest
+-- (workers/csv_ingest.py) can merge with `on conflict (tx_signature)`.
+-- Rows without a signature are unaffected. Fails if the ledger already holds
+-- duplicate signatures; resolve those before applying.
+
+create unique index if not exists trades_ledger_tx_signature_uniq
+  on public.trades_ledger (tx_signature)
+  where tx_signature is not null;
@@ -0,0 +1,12 @@
+-- Read checkpoints for the Sharp TUI log tailer (workers/tui_ingest.py).
+-- One row per log file, keyed by device/inode so a rotated (renamed) file
+-- keeps its offset. The offset is committed in the same transaction as the
+-- source_trades it produced, so restarts resume exactly where they stopped.
+
+create table if not exists public.tui_log_offsets (
+  file_id      text primary key,          -- "<dev>:<inode>"
+  path         text not null,             -- last path seen (informational)
+  fingerprint  text not null,             -- hash of the first bytes; detects inode reuse
+  byte_offset  int8 not null default 0,   -- end of the last fully ingested line
+  updated_at   timestamptz not null default now()
+);
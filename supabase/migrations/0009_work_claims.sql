@@ -0,0 +1,31 @@
+-- Work claiming for horizontally scaled workers (utils/work_claims.py).
+--
+-- Stages that finish inside one short transaction (pairing, ladder, scoring,
+-- normalizer_copy) claim with `for update skip locked`. Stages that call
+-- Helius between select and write (slot backfills, normalizer_creator)
+-- cannot hold a transaction that long; they take a time-bounded lease here
+-- instead. A lease that is never released (crashed worker) simply expires.
+
+create table if not exists public.work_leases (
+  stage       text not null,          -- e.g. 'copy_slot_backfill'
+  item_key    text not null,          -- signature / creator pubkey
+  owner       text not null,          -- "<host>:<pid>" of the claiming process
+  expires_at  timestamptz not null,
+  primary key (stage, item_key)
+);
+
+create index if not exists work_leases_expires_idx
+  on public.work_leases (expires_at);
+
+-- Stable shard of a key (token mint / creator pubkey) for
+-- WORKER_SHARD_COUNT > 1; always 0 when sharding is off.
+create or replace function public.oculus_shard(key text, n int)
+returns int
+language sql
+immutable
+as $$
+  select case
+    when n is null or n <= 1 then 0
+    else mod(abs(hashtext(coalesce(key, ''))::int8), n)::int
+  end
+$$;
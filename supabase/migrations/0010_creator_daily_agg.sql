@@ -0,0 +1,305 @@
+-- Per-creator, per-UTC-day rollups behind creator intel (services/creator_agg.py).
+-- 7d / 30d metrics are composed by merging at most 30 day rows instead of
+-- re-reading every pair and source trade of the window.
+--
+-- Two kinds of columns, each with its own writer:
+-- - pair side (pair_count .. exec_sum): copies paired to the creator's
+--   trades, bucketed by the source trade's day. Incremented in the scoring
+--   transaction (ScoringWorker), which sees each pair exactly once. ROI is
+--   kept as (n, mean, M2) and merged with Chan's parallel Welford update.
+--   Pairs scored before this migration are added at the end of it; apply
+--   it before starting a scoring worker that records pairs (the backfill
+--   overwrites the pair side, so re-running the file is harmless).
+-- - source side (buy_* and the token table's buy/sell columns): the
+--   creator's own trades, rebuilt for every (creator, day) touched by an
+--   insert into source_trades, and for both the old and the new bucket of
+--   an update (statement triggers below), so backfills that arrive out of
+--   order or upserts that move a trade are still exact.
+
+create table if not exists public.creator_daily_agg (
+  creator_pubkey  text not null,
+  day             date not null,
+  -- pair side
+  pair_count      int not null default 0,
+  roi_n           int not null default 0,    -- pairs with a copy ROI
+  roi_mean        float8 not null default 0,
+  roi_m2          float8 not null default 0, -- sum of squared deviations
+  roi_wins        int not null default 0,
+  late_n          int not null default 0,    -- pairs with delta_ms_event or price_drift
+  late_hits       int not null default 0,
+  chase_hits      int not null default 0,    -- drift > chase threshold and ROI < 0
+  liq_hits        int not null default 0,    -- drift > 0 and ROI < 0
+  delta_n         int not null default 0,
+  delta_sum       float8 not null default 0,
+  exec_n          int not null default 0,
+  exec_sum        float8 not null default 0,
+  -- source side (BUY sizes)
+  buy_n           int not null default 0,
+  buy_size_mean   float8 not null default 0,
+  buy_size_m2     float8 not null default 0,
+  updated_at      timestamptz not null default now(),
+  primary key (creator_pubkey, day)
+);
+
+-- Per token: pair counts (crowding density) and the creator's position
+-- timing. sells_15m / sells_2h are measured from the token's first BUY of
+-- the same day. A window anchors each token at its first BUY in the
+-- window: sells on earlier days count as <= 15m (like the per-trade rule,
+-- negative offsets included), sells on later days as >= 2h.
+create table if not exists public.creator_daily_token_agg (
+  creator_pubkey  text not null,
+  day             date not null,
+  token_mint      text not null,
+  pair_count      int not null default 0,
+  first_buy_at    timestamptz,
+  last_sell_at    timestamptz,
+  sell_count      int not null default 0,
+  sells_15m       int not null default 0,
+  sells_2h        int not null default 0,
+  primary key (creator_pubkey, day, token_mint)
+);
+
+create or replace function public.tg_creator_daily_source()
+returns trigger language plpgsql as $$
+declare
+  v_creators text[];
+  v_days     date[];
+  v_key      text;
+begin
+  if tg_op = 'UPDATE' then
+    -- updates that leave the trade in place and unchanged rebuild nothing
+    select array_agg(k.creator_pubkey), array_agg(k.day)
+      into v_creators, v_days
+    from (
+      select o.source_wallet_pubkey as creator_pubkey, (o.event_ts at time zone 'utc')::date as day
+      from old_rows o join new_rows n on n.id = o.id
+      where (o.source_wallet_pubkey, o.event_ts, o.token_mint, o.side, o.size)
+            is distinct from (n.source_wallet_pubkey, n.event_ts, n.token_mint, n.side, n.size)
+      union
+      select n.source_wallet_pubkey, (n.event_ts at time zone 'utc')::date
+      from old_rows o join new_rows n on n.id = o.id
+      where (o.source_wallet_pubkey, o.event_ts, o.token_mint, o.side, o.size)
+            is distinct from (n.source_wallet_pubkey, n.event_ts, n.token_mint, n.side, n.size)
+    ) k;
+  else
+    select array_agg(k.creator_pubkey), array_agg(k.day)
+      into v_creators, v_days
+    from (
+      select distinct source_wallet_pubkey as creator_pubkey, (event_ts at time zone 'utc')::date as day
+      from new_rows
+    ) k;
+  end if;
+
+  if v_creators is null then
+    return null;
+  end if;
+
+  -- Concurrent writers touching the same (creator, day) would each rebuild
+  -- it from their own snapshot and the last upsert would drop the other's
+  -- trades. Serialise per key (sorted, so two writers cannot deadlock);
+  -- the rebuild below is a new statement and sees whatever the previous
+  -- holder committed.
+  for v_key in
+    select distinct t.creator_pubkey || '|' || t.day::text
+    from unnest(v_creators, v_days) as t(creator_pubkey, day)
+    where t.creator_pubkey is not null
+    order by 1
+  loop
+    perform pg_advisory_xact_lock(hashtext(v_key));
+  end loop;
+
+  with touched as (
+    select distinct t.creator_pubkey, t.day
+    from unnest(v_creators, v_days) as t(creator_pubkey, day)
+    where t.creator_pubkey is not null
+  ),
+  trades as (
+    select t.creator_pubkey, t.day, st.token_mint, st.side, st.event_ts, coalesce(st.size, 0)::float8 as size
+    from touched t
+    join public.source_trades st
+      on st.source_wallet_pubkey = t.creator_pubkey
+     and st.event_ts >= (t.day::timestamp at time zone 'utc')
+     and st.event_ts <  ((t.day + 1)::timestamp at time zone 'utc')
+  ),
+  per_token as (
+    select creator_pubkey, day, token_mint,
+           min(event_ts) filter (where side = 'BUY')  as first_buy_at,
+           max(event_ts) filter (where side = 'SELL') as last_sell_at
+    from trades
+    group by 1, 2, 3
+  ),
+  tok as (
+    insert into public.creator_daily_token_agg
+      (creator_pubkey, day, token_mint, first_buy_at, last_sell_at, sell_count, sells_15m, sells_2h)
+    select pt.creator_pubkey, pt.day, pt.token_mint, pt.first_buy_at, pt.last_sell_at,
+           count(tr.event_ts),
+           count(tr.event_ts) filter (where tr.event_ts <= pt.first_buy_at + interval '15 minutes'),
+           count(tr.event_ts) filter (where tr.event_ts >= pt.first_buy_at + interval '2 hours')
+    from per_token pt
+    left join trades tr
+      on tr.creator_pubkey = pt.creator_pubkey and tr.day = pt.day
+     and tr.token_mint = pt.token_mint and tr.side = 'SELL'
+    group by pt.creator_pubkey, pt.day, pt.token_mint, pt.first_buy_at, pt.last_sell_at
+    order by 1, 2, 3
+    on conflict (creator_pubkey, day, token_mint) do update set
+      first_buy_at = excluded.first_buy_at,
+      last_sell_at = excluded.last_sell_at,
+      sell_count   = excluded.sell_count,
+      sells_15m    = excluded.sells_15m,
+      sells_2h     = excluded.sells_2h
+  ),
+  -- tokens a moved trade left behind: clear their source columns (the
+  -- row's pair_count belongs to the pair side and stays)
+  emptied as (
+    update public.creator_daily_token_agg a
+    set first_buy_at = null,
+        last_sell_at = null,
+        sell_count   = 0,
+        sells_15m    = 0,
+        sells_2h     = 0
+    from touched t
+    where a.creator_pubkey = t.creator_pubkey
+      and a.day = t.day
+      and (a.first_buy_at is not null or a.last_sell_at is not null or a.sell_count > 0)
+      and not exists (
+        select 1 from per_token pt
+        where pt.creator_pubkey = a.creator_pubkey and pt.day = a.day and pt.token_mint = a.token_mint
+      )
+  )
+  insert into public.creator_daily_agg (creator_pubkey, day, buy_n, buy_size_mean, buy_size_m2)
+  select t.creator_pubkey, t.day,
+         count(tr.size) filter (where tr.side = 'BUY'),
+         coalesce(avg(tr.size) filter (where tr.side = 'BUY'), 0),
+         coalesce(var_pop(tr.size) filter (where tr.side = 'BUY') * count(tr.size) filter (where tr.side = 'BUY'), 0)
+  from touched t
+  left join trades tr
+    on tr.creator_pubkey = t.creator_pubkey and tr.day = t.day
+  group by t.creator_pubkey, t.day
+  order by 1, 2
+  on conflict (creator_pubkey, day) do update set
+    buy_n         = excluded.buy_n,
+    buy_size_mean = excluded.buy_size_mean,
+    buy_size_m2   = excluded.buy_size_m2,
+    updated_at    = now();
+  return null;
+end $$;
+
+-- transition tables cover a single event: one trigger per event
+drop trigger if exists trg_source_trades_creator_daily on public.source_trades;
+create trigger trg_source_trades_creator_daily
+after insert on public.source_trades
+referencing new table as new_rows
+for each statement execute function public.tg_creator_daily_source();
+
+drop trigger if exists trg_source_trades_creator_daily_upd on public.source_trades;
+create trigger trg_source_trades_creator_daily_upd
+after update on public.source_trades
+referencing old table as old_rows new table as new_rows
+for each statement execute function public.tg_creator_daily_source();
+
+-- One-off backfill of the source side for existing trades
+insert into public.creator_daily_agg (creator_pubkey, day, buy_n, buy_size_mean, buy_size_m2)
+select source_wallet_pubkey, (event_ts at time zone 'utc')::date,
+       count(*) filter (where side = 'BUY'),
+       coalesce(avg(coalesce(size, 0)::float8) filter (where side = 'BUY'), 0),
+       coalesce(var_pop(coalesce(size, 0)::float8) filter (where side = 'BUY') * count(*) filter (where side = 'BUY'), 0)
+from public.source_trades
+group by 1, 2
+on conflict (creator_pubkey, day) do update set
+  buy_n         = excluded.buy_n,
+  buy_size_mean = excluded.buy_size_mean,
+  buy_size_m2   = excluded.buy_size_m2;
+
+insert into public.creator_daily_token_agg
+  (creator_pubkey, day, token_mint, first_buy_at, last_sell_at, sell_count, sells_15m, sells_2h)
+select s.creator_pubkey, s.day, s.token_mint, s.first_buy_at, s.last_sell_at,
+       count(*) filter (where st.side = 'SELL'),
+       count(*) filter (where st.side = 'SELL' and st.event_ts <= s.first_buy_at + interval '15 minutes'),
+       count(*) filter (where st.side = 'SELL' and st.event_ts >= s.first_buy_at + interval '2 hours')
+from (
+  select source_wallet_pubkey as creator_pubkey, (event_ts at time zone 'utc')::date as day, token_mint,
+         min(event_ts) filter (where side = 'BUY')  as first_buy_at,
+         max(event_ts) filter (where side = 'SELL') as last_sell_at
+  from public.source_trades
+  group by 1, 2, 3
+) s
+join public.source_trades st
+  on st.source_wallet_pubkey = s.creator_pubkey and st.token_mint = s.token_mint
+ and (st.event_ts at time zone 'utc')::date = s.day
+group by s.creator_pubkey, s.day, s.token_mint, s.first_buy_at, s.last_sell_at
+on conflict (creator_pubkey, day, token_mint) do update set
+  first_buy_at = excluded.first_buy_at,
+  last_sell_at = excluded.last_sell_at,
+  sell_count   = excluded.sell_count,
+  sells_15m    = excluded.sells_15m,
+  sells_2h     = excluded.sells_2h;
+
+-- Pair side for pairs scored before the rollups existed (everything the
+-- scoring worker has claimed: a score or an exec_status). Written as
+-- totals, not increments, so a second run does not double-count.
+alter table public.trade_pairs
+  add column if not exists exec_status text;
+
+insert into public.creator_daily_token_agg (creator_pubkey, day, token_mint, pair_count)
+select st.source_wallet_pubkey, (st.event_ts at time zone 'utc')::date, st.token_mint, count(*)
+from public.trade_pairs p
+join public.source_trades st
+  on st.id = p.source_trade_id
+where p.execution_score is not null or p.exec_status is not null
+group by 1, 2, 3
+on conflict (creator_pubkey, day, token_mint) do update set
+  pair_count = excluded.pair_count;
+
+insert into public.creator_daily_agg (
+  creator_pubkey, day, pair_count,
+  roi_n, roi_mean, roi_m2, roi_wins,
+  late_n, late_hits, chase_hits, liq_hits,
+  delta_n, delta_sum, exec_n, exec_sum
+)
+select
+  creator_pubkey,
+  day,
+  count(*),
+  count(roi),
+  coalesce(avg(roi), 0),
+  coalesce(var_pop(roi) * count(roi), 0),
+  count(*) filter (where roi > 0),
+  count(*) filter (where dms is not null or drift is not null),
+  count(*) filter (where dms > 1500 or drift > 2.0),       -- creator_agg.LATE_ENTRY_*
+  count(*) filter (where drift > 3.0 and roi < 0),         -- creator_agg.CHASE_DRIFT_PCT
+  count(*) filter (where drift > 0 and roi < 0),
+  count(dms),
+  coalesce(sum(dms), 0),
+  count(score),
+  coalesce(sum(score), 0)
+from (
+  select
+    st.source_wallet_pubkey                   as creator_pubkey,
+    (st.event_ts at time zone 'utc')::date    as day,
+    cp.pnl_percent::float8                    as roi,
+    p.delta_ms_event::float8                  as dms,
+    p.price_drift::float8                     as drift,
+    p.execution_score::float8                 as score
+  from public.trade_pairs p
+  join public.source_trades st
+    on st.id = p.source_trade_id
+  join public.trades_ledger cp
+    on cp.id = p.copy_trade_id
+  where p.execution_score is not null or p.exec_status is not null
+) s
+group by 1, 2
+on conflict (creator_pubkey, day) do update set
+  pair_count = excluded.pair_count,
+  roi_n      = excluded.roi_n,
+  roi_mean   = excluded.roi_mean,
+  roi_m2     = excluded.roi_m2,
+  roi_wins   = excluded.roi_wins,
+  late_n     = excluded.late_n,
+  late_hits  = excluded.late_hits,
+  chase_hits = excluded.chase_hits,
+  liq_hits   = excluded.liq_hits,
+  delta_n    = excluded.delta_n,
+  delta_sum  = excluded.delta_sum,
+  exec_n     = excluded.exec_n,
+  exec_sum   = excluded.exec_sum,
+  updated_at = now();
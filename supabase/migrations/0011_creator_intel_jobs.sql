@@ -0,0 +1,43 @@
+-- Creator-intel recompute queue (app/jobs/creator_intel_worker.py).
+--
+-- One queue row per creator: enqueueing a creator that is already queued
+-- only bumps `version`, so duplicate enqueues coalesce into one recompute.
+-- Runners lease queued creators in work_leases (stage 'creator_intel') and
+-- acknowledge in bulk by (creator_pubkey, version): a creator re-enqueued
+-- while its recompute was running keeps its row and runs once more.
+-- Failed recomputes move to jobs_creator_intel_retry with exponential
+-- back-off and are re-queued once next_attempt_at has passed.
+
+create table if not exists public.jobs_creator_intel_queue (
+  creator_pubkey  text not null,
+  reason          text,
+  queued_at       timestamptz not null default now()
+);
+
+alter table public.jobs_creator_intel_queue
+  add column if not exists version int not null default 1;
+
+-- coalesce duplicates left by the old runner (keep the oldest entry)
+delete from public.jobs_creator_intel_queue q
+using public.jobs_creator_intel_queue d
+where q.creator_pubkey = d.creator_pubkey
+  and (q.queued_at, q.ctid) > (d.queued_at, d.ctid);
+
+create unique index if not exists jobs_creator_intel_queue_creator_uq
+  on public.jobs_creator_intel_queue (creator_pubkey);
+
+create index if not exists jobs_creator_intel_queue_queued_idx
+  on public.jobs_creator_intel_queue (queued_at);
+
+create table if not exists public.jobs_creator_intel_retry (
+  creator_pubkey   text primary key,
+  reason           text,
+  attempts         int not null default 0,
+  next_attempt_at  timestamptz,          -- null while re-queued
+  last_error       text,
+  updated_at       timestamptz not null default now()
+);
+
+create index if not exists jobs_creator_intel_retry_due_idx
+  on public.jobs_creator_intel_retry (next_attempt_at)
+  where next_attempt_at is not null;
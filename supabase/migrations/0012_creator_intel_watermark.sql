@@ -0,0 +1,17 @@
+-- CreatorIntelWorker watermark (workers/creator_intel_worker.py): each
+-- pass enqueues the creators with pairs paired or scored after the last
+-- watermark for a creator-intel recompute; the watermark is kept in
+-- oculus_cursor as a timestamp. Scoring runs after pairing, so both
+-- paired_at and exec_ready_at are scanned, each through its own index.
+
+alter table public.oculus_cursor
+  add column if not exists last_seen_at timestamptz;
+
+alter table public.trade_pairs
+  add column if not exists exec_ready_at timestamptz;
+
+create index if not exists idx_trade_pairs_paired_at
+  on public.trade_pairs (paired_at);
+
+create index if not exists idx_trade_pairs_exec_ready_at
+  on public.trade_pairs (exec_ready_at);
@@ -0,0 +1,6 @@
+-- Scheduler counters (workers/scheduler.py) published by each worker
+-- process into its system_worker_heartbeats row ('worker_manager:<id>'),
+-- every WORKER_STATS_LOG_SEC; /v1/system/status returns them.
+
+alter table if exists public.system_worker_heartbeats
+  add column if not exists stats jsonb;
@@ -0,0 +1,43 @@
+-- Re-scoring (workers/scoring_worker.py): a PARTIAL / FAILED pair is
+-- scored again once its copy's trades_transactions row gets fee / CU data
+-- after the pair was scored (updated_at > trade_pairs.exec_ready_at).
+-- Existing rows keep updated_at null, so the migration itself triggers no
+-- re-scoring.
+
+alter table public.trades_transactions
+  add column if not exists updated_at timestamptz;
+
+create or replace function public.tg_trades_transactions_touch()
+returns trigger language plpgsql as $$
+begin
+  new.updated_at := now();
+  return new;
+end $$;
+
+drop trigger if exists trg_trades_transactions_touch_ins on public.trades_transactions;
+create trigger trg_trades_transactions_touch_ins
+before insert on public.trades_transactions
+for each row execute function public.tg_trades_transactions_touch();
+
+-- only the scoring inputs count as a change (slot / block_time backfills do not)
+drop trigger if exists trg_trades_transactions_touch_upd on public.trades_transactions;
+create trigger trg_trades_transactions_touch_upd
+before update on public.trades_transactions
+for each row
+when (
+  old.tip_lamports is distinct from new.tip_lamports
+  or old.cu_used is distinct from new.cu_used
+  or old.priority_fee_lamports is distinct from new.priority_fee_lamports
+)
+execute function public.tg_trades_transactions_touch();
+
+-- scoring status columns the re-score check compares (present wherever the
+-- scoring worker already runs; no-op there)
+alter table public.trade_pairs
+  add column if not exists exec_status text,
+  add column if not exists exec_ready_at timestamptz;
+
+-- re-score candidates: the pairs that did not score READY
+create index if not exists idx_trade_pairs_exec_not_ready
+  on public.trade_pairs (copy_trade_id)
+  where exec_status <> 'READY';
@@ -0,0 +1,7 @@
+-- source_slot_backfill picks every signed source trade still on the
+-- event_slot placeholder (0), paired or not (e.g. TUI log lines without a
+-- slot); this keeps that candidate scan off the full table.
+
+create index if not exists idx_source_trades_slot_placeholder
+  on public.source_trades (event_ts)
+  where tx_signature is not null and (event_slot is null or event_slot = 0);